@@ -1,16 +1,42 @@
+import time
 from datetime import date, datetime
 from typing import Optional, List
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, field_validator
+from starlette.concurrency import run_in_threadpool
 
 from app.db.task_session import db_session
 from app.db.models_urls import Url
 from app.db.models_videos import Video
 from app.db.models_transcripts import Transcript
-from app.workers.pipeline_orchestrator import start_url_pipeline
+from app.db.models_metadata import VideoMetadata
+from app.ingest.bulk_urls import DEFAULT_CHUNK_SIZE, ingest_urls
+from app.ingest.streaming import (
+    SUPPORTED_FORMATS,
+    DuplexStreamingResponse,
+    detect_format,
+    stream_ingest_urls,
+)
+from app.media.storage import CAS_PREFIX, resolve_path, touch_storage_key
+from app.media.telemetry import live_progress
+from app.search.cache import search_cache
+from app.similarity.service import get_similarity_index
+from app.transcription.cache import fingerprint_cache_stats
+from app.transcription.segments import find_hit_offsets
+from app.search.fulltext import (
+    after_cursor,
+    build_tsquery,
+    encode_cursor,
+    headline_expression,
+    match_expression,
+    parse_headline,
+    rank_expression,
+    segment_query_clauses,
+)
+from app.workers.pipeline_orchestrator import dispatch_url_pipelines
 from app.workers.tasks_ingest import process_pending_urls
 
 
@@ -42,6 +68,38 @@ app.add_middleware(
 
 app.mount("/storage", StaticFiles(directory="storage"), name="storage")
 
+# Playback conta como uso do arquivo (LRU da eviction, app/media/lifecycle.py).
+# O player faz vários Range requests por vídeo: no máximo uma escrita por
+# arquivo a cada STORAGE_ACCESS_TOUCH_SECONDS neste processo
+STORAGE_ACCESS_TOUCH_SECONDS = 300
+STORAGE_ACCESS_TRACKED_MAX = 10_000
+_storage_touched_at: dict[str, float] = {}
+
+
+def touch_served_file(storage_key: str) -> None:
+    try:
+        with db_session() as db:
+            touch_storage_key(db, storage_key)
+    except Exception as e:
+        print(f"[storage] aviso: falha ao registrar acesso a {storage_key}: {e}")
+
+
+@app.middleware("http")
+async def track_storage_access(request: Request, call_next):
+    response = await call_next(request)
+
+    path = request.url.path
+    if path.startswith("/storage/") and f"/{CAS_PREFIX}/" in path and response.status_code in (200, 206):
+        storage_key = f"{CAS_PREFIX}/" + path.split(f"/{CAS_PREFIX}/", 1)[1]
+        now = time.monotonic()
+        if now - _storage_touched_at.get(storage_key, float("-inf")) >= STORAGE_ACCESS_TOUCH_SECONDS:
+            if len(_storage_touched_at) >= STORAGE_ACCESS_TRACKED_MAX:
+                _storage_touched_at.clear()
+            _storage_touched_at[storage_key] = now
+            await run_in_threadpool(touch_served_file, storage_key)
+
+    return response
+
 
 # ─────────────────────────────────────────────
 #  Schemas de entrada/saída - URLs (unitário)
@@ -127,17 +185,54 @@ class AdminIngestResponse(BaseModel):
 #  Schemas de saída - Busca de VSLs (Swipe)
 # ─────────────────────────────────────────────
 
+class SnippetHighlight(BaseModel):
+    # Offsets em caracteres dentro de transcript_snippet: [start, end)
+    start: int
+    end: int
+
+
+class SearchHit(BaseModel):
+    # Momento do vídeo em que o trecho que casou com a busca é falado
+    start_seconds: float
+    end_seconds: float
+
+
 class VslSearchResult(BaseModel):
     id: int
     title: str
     video_path: str
     transcript_snippet: str
-    transcript_full: str
+    highlights: List[SnippetHighlight] = []
+    # Em ordem de tempo; vazio para transcrições sem segmentos
+    hits: List[SearchHit] = []
     score: float
 
 
 class SearchResponse(BaseModel):
     results: List[VslSearchResult]
+    # Passar em ?cursor= para buscar a próxima página; None = acabou
+    next_cursor: Optional[str] = None
+
+
+class SimilarVslResult(BaseModel):
+    id: int
+    title: str
+    video_path: str
+    main_category: Optional[str] = None
+    # Cosseno entre os vetores das transcrições (1 = idênticas)
+    score: float
+
+
+class SimilarResponse(BaseModel):
+    results: List[SimilarVslResult]
+
+
+class TranscriptResponse(BaseModel):
+    id: int
+    video_id: int
+    engine: str
+    language: Optional[str]
+    full_text: str
 
 
 # ─────────────────────────────────────────────
@@ -152,6 +247,7 @@ def build_video_url(storage_key: str) -> str:
     - "videos/2025/11/13/abcd.mp4"
     - "storage/videos/2025/11/13/abcd.mp4"
     - "/Users/lanna/vsl_pipeline/storage/videos/2025/11/13/abcd.mp4"
+    - "cas/ab/cd/abcd....mp4" (content-addressed, relativo ao VIDEO_STORAGE_PATH)
 
     O objetivo é sempre retornar algo como:
     http://localhost:8000/storage/videos/2025/11/13/abcd.mp4
@@ -159,7 +255,8 @@ def build_video_url(storage_key: str) -> str:
     if not storage_key:
         return ""
 
-    key = storage_key.replace("\\", "/")
+    # Chaves content-addressed viram o caminho completo no storage
+    key = str(resolve_path(storage_key)).replace("\\", "/")
 
     # Se tiver "storage/..." no meio, pegamos a partir daí
     if "storage/" in key:
@@ -186,13 +283,20 @@ def create_url(request: UrlCreateRequest):
     """
     Cria uma nova URL para processamento e dispara o pipeline Celery.
     (Modo unitário / teste rápido.)
+
+    A URL já entra reservada ('queued' com claimed_at, como no claim do
+    process_pending_urls) e a chain só é publicada depois do commit: o
+    worker nunca recebe um url_id que ainda não existe no banco, e o feeder
+    não a despacha de novo. Se a publicação falhar, o lease devolve a URL
+    para 'pending_ingest' (release_stale_claims).
     """
     with db_session() as db:
         now = datetime.utcnow()
         url = Url(
             raw_url=request.raw_url,
             type=request.type,
-            status="pending_ingest",
+            status="queued",
+            claimed_at=now,
             batch_date=date.today(),
             created_at=now,
             updated_at=now,
@@ -200,12 +304,7 @@ def create_url(request: UrlCreateRequest):
         db.add(url)
         db.flush()
 
-        async_result = start_url_pipeline.delay(url.id)
-
-        url.updated_at = datetime.utcnow()
-        db.add(url)
-
-        return UrlResponse(
+        response = UrlResponse(
             id=url.id,
             raw_url=url.raw_url,
             type=url.type,
@@ -213,9 +312,12 @@ def create_url(request: UrlCreateRequest):
             batch_date=url.batch_date,
             created_at=url.created_at,
             updated_at=url.updated_at,
-            pipeline_final_task_id=async_result.id,
         )
 
+    dispatched = dispatch_url_pipelines([response.id])[0]
+    response.pipeline_final_task_id = dispatched["pipeline_final_task_id"]
+    return response
+
 
 @app.post("/urls/bulk", response_model=UrlBulkResponse)
 def create_urls_bulk(request: UrlBulkCreateRequest):
@@ -226,6 +328,8 @@ def create_urls_bulk(request: UrlBulkCreateRequest):
     - NÃO dispara o pipeline aqui.
     - Apenas insere as URLs com status 'pending_ingest'.
     - Idempotência básica: se a raw_url já existir, marca como 'duplicate'.
+    - Set-based (app/ingest/bulk_urls.py): deduplica em memória e, por chunk,
+      faz uma única query de existência e um único INSERT ... RETURNING.
 
     O processamento dessas URLs será feito depois por uma task Celery
     dedicada (process_pending_urls).
@@ -241,48 +345,21 @@ def create_urls_bulk(request: UrlBulkCreateRequest):
     duplicates_count = 0
 
     with db_session() as db:
-        for raw in urls_input:
-            # Verificar se já existe URL igual no banco (idempotência básica)
-            existing = (
-                db.query(Url)
-                .filter(Url.raw_url == raw)
-                .order_by(Url.id.desc())
-                .first()
-            )
-
-            if existing:
+        # Set-based: uma query de existência + um INSERT por chunk
+        for chunk_results in ingest_urls(db, urls_input, chunk_size=DEFAULT_CHUNK_SIZE):
+            for item in chunk_results:
                 results.append(
                     UrlBulkItemResult(
-                        raw_url=raw,
-                        created=False,
-                        url_id=existing.id,
-                        reason="duplicate",
+                        raw_url=item.raw_url,
+                        created=item.created,
+                        url_id=item.url_id,
+                        reason=None if item.created else "duplicate",
                     )
                 )
-                duplicates_count += 1
-                continue
-
-            now = datetime.utcnow()
-            new_url = Url(
-                raw_url=raw,
-                type="m3u8",            # por enquanto fixo
-                status="pending_ingest",
-                batch_date=date.today(),
-                created_at=now,
-                updated_at=now,
-            )
-            db.add(new_url)
-            db.flush()  # preenche new_url.id
-
-            results.append(
-                UrlBulkItemResult(
-                    raw_url=raw,
-                    created=True,
-                    url_id=new_url.id,
-                    reason=None,
-                )
-            )
-            inserted_count += 1
+                if item.created:
+                    inserted_count += 1
+                else:
+                    duplicates_count += 1
 
     return UrlBulkResponse(
         source=source,
@@ -293,6 +370,47 @@ def create_urls_bulk(request: UrlBulkCreateRequest):
     )
 
 
+@app.post("/urls/stream")
+async def create_urls_stream(
+    request: Request,
+    format: Optional[str] = Query(
+        None, description="'ndjson' ou 'csv'. Se omitido, usamos o Content-Type."
+    ),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=10_000),
+):
+    """
+    Ingestão em stream para listas muito grandes (exports dos scrapers).
+
+    Corpo da requisição:
+    - NDJSON: uma URL por linha, como string JSON ou {"raw_url": "..."}
+    - CSV: coluna raw_url/url (com cabeçalho) ou a 1ª coluna
+    - quebras de linha \\n, \\r\\n ou \\r; linha acima de
+      STREAM_MAX_LINE_CHARS é descartada e conta como inválida
+
+    As URLs são gravadas em chunks de chunk_size conforme o corpo chega,
+    cada chunk na sua própria transação. A resposta é NDJSON: uma linha de
+    progresso por chunk (inserted/duplicates) e uma linha final com
+    "done": true. Se um chunk falhar, a linha final tem "done": false e
+    os totais só dos chunks commitados (chunks_committed). Assim como
+    /urls/bulk, NÃO dispara o pipeline.
+
+    Exemplo:
+        curl -X POST -H 'Content-Type: application/x-ndjson' \\
+             --data-binary @urls.ndjson http://localhost:8000/urls/stream
+    """
+    fmt = detect_format(request.headers.get("content-type"), format)
+    if fmt not in SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato não suportado: {fmt!r}. Use 'ndjson' ou 'csv'.",
+        )
+
+    return DuplexStreamingResponse(
+        stream_ingest_urls(request.stream(), fmt, chunk_size),
+        media_type="application/x-ndjson",
+    )
+
+
 @app.post("/admin/run_ingest_now", response_model=AdminIngestResponse)
 def admin_run_ingest_now(request: AdminIngestRequest):
     """
@@ -302,7 +420,7 @@ def admin_run_ingest_now(request: AdminIngestRequest):
     - Apenas chama a task Celery process_pending_urls, que:
         * busca URLs com status 'pending_ingest'
         * marca como 'queued'
-        * dispara start_url_pipeline para cada uma, em lote.
+        * publica as chains do lote inteiro de uma vez.
 
     batch_size é opcional. Se não for enviado, a task usará o DEFAULT_BATCH_SIZE.
     """
@@ -325,51 +443,245 @@ def admin_run_ingest_now(request: AdminIngestRequest):
     )
 
 
+# Tamanho de página da busca
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Momentos do vídeo devolvidos por resultado (em ordem de tempo)
+MAX_HITS_PER_RESULT = 20
+# VSLs parecidos por consulta; a margem cobre as cópias descartadas
+DEFAULT_SIMILAR_LIMIT = 10
+MAX_SIMILAR_LIMIT = 50
+SIMILAR_COPIES_MARGIN = 10
+
+
 @app.get("/api/search", response_model=SearchResponse)
 def search_vsl(
-    q: str = Query(..., min_length=1, description="Termo de busca nas transcrições")
+    q: str = Query(..., min_length=1, description="Termo de busca nas transcrições"),
+    limit: int = Query(
+        DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT, description="Resultados por página"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="next_cursor devolvido pela página anterior"
+    ),
 ):
     """
-    Busca nas transcrições reais no Postgres.
+    Busca full-text nas transcrições (tsvector + índice GIN no Postgres).
+
+    Aceita termos soltos (todos precisam aparecer), "frases entre aspas",
+    OR e -exclusão. Os resultados vêm ordenados por relevância (ts_rank_cd),
+    que também preenche o campo score.
+
+    Paginação por cursor (keyset em rank DESC, id DESC): cada página traz
+    no máximo `limit` resultados e um next_cursor para a próxima.
+
+    A listagem não carrega o texto completo: cada resultado traz só um
+    trecho em volta dos termos encontrados, com os offsets dos destaques,
+    e em `hits` os momentos do vídeo em que os termos são falados.
+    O texto completo fica em GET /api/transcripts/{id}.
+
+    Respostas ficam em cache (query normalizada + limit + cursor) até
+    entrar uma transcrição nova ou o TTL expirar.
     """
     query = q.strip()
 
     if not query:
         return SearchResponse(results=[])
 
-    like_pattern = f"%{query}%"
+    cached = search_cache.get(query, limit, cursor)
+    if cached is not None:
+        return SearchResponse(**cached)
+
+    tsquery = build_tsquery(query)
+    rank_expr = rank_expression(tsquery)
+    rank = rank_expr.label("rank")
 
     with db_session() as db:
-        rows = (
-            db.query(Transcript, Video, Url)
+        # 1) Página de ids ordenada por relevância (sem tocar em full_text)
+        page_query = (
+            db.query(Transcript.id, Video.storage_key, Url.raw_url, rank)
             .join(Video, Transcript.video_id == Video.id)
             .join(Url, Video.url_id == Url.id)
             .filter(Transcript.status == "ready")
-            .filter(Transcript.full_text.ilike(like_pattern))
+            .filter(match_expression(tsquery))
+        )
+
+        if cursor:
+            try:
+                page_query = page_query.filter(after_cursor(rank_expr, cursor))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        # limit + 1 para saber se existe próxima página
+        rows = (
+            page_query
+            .order_by(rank.desc(), Transcript.id.desc())
+            .limit(limit + 1)
             .all()
         )
 
-        results: List[VslSearchResult] = []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
-        for transcript, video, url in rows:
-            full_text = transcript.full_text or ""
-            snippet = (
-                full_text[:220] + "…"
-                if len(full_text) > 220
-                else full_text
-            )
+        if not rows:
+            return SearchResponse(results=[])
+
+        # 2) Snippets só para os ids desta página
+        headlines = dict(
+            db.query(Transcript.id, headline_expression(tsquery))
+            .filter(Transcript.id.in_([row[0] for row in rows]))
+            .all()
+        )
+
+        # 3) Offsets no vídeo (índice de transcript_segments)
+        hit_offsets = find_hit_offsets(
+            db, segment_query_clauses(query), [row[0] for row in rows], MAX_HITS_PER_RESULT
+        )
 
-            title = url.raw_url
-            video_path = build_video_url(video.storage_key)
+        results: List[VslSearchResult] = []
+
+        for transcript_id, storage_key, raw_url, score in rows:
+            snippet, highlights = parse_headline(headlines.get(transcript_id, ""))
 
             result = VslSearchResult(
-                id=transcript.id,
-                title=title,
-                video_path=video_path,
+                id=transcript_id,
+                title=raw_url,
+                video_path=build_video_url(storage_key),
                 transcript_snippet=snippet,
-                transcript_full=full_text,
-                score=1.0,
+                highlights=[
+                    SnippetHighlight(start=start, end=end) for start, end in highlights
+                ],
+                hits=[
+                    SearchHit(start_seconds=start_ms / 1000, end_seconds=end_ms / 1000)
+                    for start_ms, end_ms in hit_offsets.get(transcript_id, [])
+                ],
+                score=float(score),
             )
             results.append(result)
 
-        return SearchResponse(results=results)
+        next_cursor = None
+        if has_more:
+            last_id, last_score = rows[-1][0], rows[-1][3]
+            next_cursor = encode_cursor(float(last_score), last_id)
+
+        response = SearchResponse(results=results, next_cursor=next_cursor)
+        search_cache.set(query, limit, cursor, response.model_dump())
+
+        return response
+
+
+@app.get("/admin/search_cache/stats")
+def admin_search_cache_stats():
+    """
+    Contadores de hit/miss do cache de busca (deste processo uvicorn),
+    para dimensionar SEARCH_CACHE_MAX_ENTRIES / SEARCH_CACHE_TTL_SECONDS.
+    """
+    return search_cache.stats()
+
+
+@app.get("/admin/transcription/cache_stats")
+def admin_transcription_cache_stats():
+    """
+    Quantas transcrições vieram do cache por impressão digital do áudio
+    (cópias) e quantas passaram pelo motor.
+    """
+    with db_session() as db:
+        return fingerprint_cache_stats(db)
+
+
+@app.get("/admin/media/progress")
+def admin_media_progress():
+    """
+    ffmpeg rodando agora nos workers (download/transcription): tempo de
+    mídia processado, bytes, velocidade. Ver app/media/telemetry.py.
+    """
+    return {"running": live_progress()}
+
+
+@app.get("/api/transcripts/{transcript_id}", response_model=TranscriptResponse)
+def get_transcript(transcript_id: int):
+    """
+    Texto completo de uma transcrição, buscado sob demanda pela tela de
+    detalhes (a busca só devolve snippets).
+    """
+    with db_session() as db:
+        transcript: Optional[Transcript] = (
+            db.query(Transcript).filter(Transcript.id == transcript_id).first()
+        )
+        if not transcript:
+            raise HTTPException(status_code=404, detail="Transcrição não encontrada.")
+
+        return TranscriptResponse(
+            id=transcript.id,
+            video_id=transcript.video_id,
+            engine=transcript.engine,
+            language=transcript.language,
+            full_text=transcript.full_text,
+        )
+
+
+@app.get("/api/transcripts/{transcript_id}/similar", response_model=SimilarResponse)
+def get_similar_vsls(
+    transcript_id: int,
+    k: int = Query(DEFAULT_SIMILAR_LIMIT, ge=1, le=MAX_SIMILAR_LIMIT, description="Quantos VSLs parecidos"),
+):
+    """
+    VSLs parecidos com o desta transcrição, pelo embedding do texto
+    (índice em memória, ver app/similarity). Cópias da mesma transcrição
+    (cache por impressão digital do áudio) ficam de fora.
+
+    404 se a transcrição ainda não foi vetorizada (EMBEDDING_ENABLED e o
+    worker de embedding precisam estar rodando).
+    """
+    neighbors = get_similarity_index().similar(transcript_id, k + SIMILAR_COPIES_MARGIN)
+    if neighbors is None:
+        raise HTTPException(status_code=404, detail="Transcrição ainda sem embedding.")
+
+    scores = {neighbor.id: neighbor.score for neighbor in neighbors}
+    if not scores:
+        return SimilarResponse(results=[])
+
+    with db_session() as db:
+        source = db.query(Transcript.id, Transcript.source_transcript_id).filter(
+            Transcript.id == transcript_id
+        ).first()
+        if not source:
+            raise HTTPException(status_code=404, detail="Transcrição não encontrada.")
+        origin = source.source_transcript_id or source.id
+
+        rows = (
+            db.query(
+                Transcript.id,
+                Transcript.source_transcript_id,
+                Video.storage_key,
+                Url.raw_url,
+                VideoMetadata.main_category,
+            )
+            .join(Video, Transcript.video_id == Video.id)
+            .join(Url, Video.url_id == Url.id)
+            .outerjoin(VideoMetadata, VideoMetadata.video_id == Video.id)
+            .filter(Transcript.id.in_(list(scores)))
+            .all()
+        )
+
+    results = [
+        SimilarVslResult(
+            id=row_id,
+            title=raw_url,
+            video_path=build_video_url(storage_key),
+            main_category=main_category,
+            score=scores[row_id],
+        )
+        for row_id, source_id, storage_key, raw_url, main_category in rows
+        if (source_id or row_id) != origin
+    ]
+    results.sort(key=lambda result: result.score, reverse=True)
+    return SimilarResponse(results=results[:k])
+
+
+@app.get("/admin/similarity/stats")
+def admin_similarity_stats():
+    """
+    Estado do índice de similaridade deste processo uvicorn: vetores,
+    modo (brute_force/ivf), listas, memória.
+    """
+    return get_similarity_index().stats()
@@ -0,0 +1,311 @@
+"""
+Categorização por taxonomia (regras), sem IA.
+
+A taxonomia é um JSON versionado (CATEGORIZATION_TAXONOMY_PATH; padrão:
+app/categorization/taxonomy.json) com:
+
+- categories: categoria principal, com tags e termos
+- subcategories: idem; "parents" opcional restringe a algumas categorias
+- tags: tags avulsas, adicionadas quando os termos aparecem
+- version: vai em VideoMetadata.model_version (a re-categorização compara
+  com ele para saber o que está desatualizado)
+
+Termos:
+- "dieta": palavra inteira
+- "emagrec*": prefixo (emagrecer, emagrecimento...)
+- "bolsa de valores": frase (qualquer espaço entre as palavras)
+- {"term": "...", "weight": 2}: peso diferente de 1
+
+Texto e termos são comparados sem acento e sem caixa. Todos os termos da
+taxonomia viram uma única regex em forma de trie: o texto é percorrido uma
+vez só, não importa quantos termos existam. Na mesma posição vence o termo
+mais longo ("bolsa de valores" antes de "bolsa*").
+
+Pontuação: soma de peso × ocorrências (no máximo max_hits_per_term por
+termo, para um termo repetido não decidir sozinho). Todas as categorias
+são pontuadas; vence a maior (empate: a declarada primeiro), se passar de
+min_score.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+from app.config import settings
+
+
+MODEL_NAME = "taxonomy_matcher"
+
+DEFAULT_TAXONOMY_PATH = Path(__file__).with_name("taxonomy.json")
+
+PREFIX_WILDCARD = "*"
+
+
+class TaxonomyError(ValueError):
+    pass
+
+
+class Target(NamedTuple):
+    # 'category', 'subcategory' ou 'tag'
+    kind: str
+    name: str
+    tags: tuple[str, ...]
+    # Só para subcategorias: categorias onde ela vale (vazio = todas)
+    parents: tuple[str, ...]
+
+
+class TermRule(NamedTuple):
+    target: int
+    weight: float
+
+
+class CategorizationResult(NamedTuple):
+    main_category: str
+    sub_category: Optional[str]
+    tags: list[str]
+    # Pontuação de cada categoria da taxonomia (inclusive as zeradas)
+    scores: dict[str, float]
+
+
+def normalize_text(text: str) -> str:
+    """
+    Sem caixa, sem acento (só ASCII) e com espaços colapsados.
+    """
+    folded = unicodedata.normalize("NFKD", text.casefold()).encode("ascii", "ignore").decode("ascii")
+    return " ".join(folded.split())
+
+
+# ─────────────────────────────────────────────
+#  Regex em trie
+# ─────────────────────────────────────────────
+
+_END = ""
+_WORD_TAIL = r"\w*"
+
+
+def _trie_insert(trie: dict, units: list[str]) -> None:
+    node = trie
+    for unit in units:
+        node = node.setdefault(unit, {})
+    node[_END] = {}
+
+
+def _trie_pattern(node: dict) -> str:
+    optional = _END in node
+    branches = []
+    # Caracteres literais antes do curinga de prefixo: "bolsa de valores"
+    # tem que ser tentado antes de "bolsa*" (\w* pararia no espaço)
+    for unit in sorted((u for u in node if u != _END), key=lambda u: u == _WORD_TAIL):
+        branches.append(unit + _trie_pattern(node[unit]))
+
+    if not branches:
+        return ""
+    if len(branches) == 1 and not optional:
+        return branches[0]
+
+    pattern = "(?:" + "|".join(branches) + ")"
+    return pattern + "?" if optional else pattern
+
+
+def _term_units(term: str) -> list[str]:
+    units = [re.escape(ch) for ch in term.rstrip(PREFIX_WILDCARD)]
+    if term.endswith(PREFIX_WILDCARD):
+        units.append(_WORD_TAIL)
+    return units
+
+
+# ─────────────────────────────────────────────
+#  Taxonomia compilada
+# ─────────────────────────────────────────────
+
+class CompiledTaxonomy:
+    def __init__(self, taxonomy: dict) -> None:
+        version = taxonomy.get("version")
+        if not version:
+            raise TaxonomyError("taxonomia sem 'version'")
+
+        self.version = str(version)
+        self.default_category = taxonomy.get("default_category", "unknown")
+        self.base_tags = tuple(taxonomy.get("base_tags", ()))
+        self.min_score = float(taxonomy.get("min_score", 1))
+        self.max_hits_per_term = int(taxonomy.get("max_hits_per_term", 5))
+
+        self.targets: list[Target] = []
+        # Termo normalizado -> regras; prefixos ("emagrec*") ficam à parte
+        self.exact_terms: dict[str, list[TermRule]] = {}
+        self.prefix_terms: dict[str, list[TermRule]] = {}
+
+        for kind, key in (("category", "categories"), ("subcategory", "subcategories"), ("tag", "tags")):
+            for entry in taxonomy.get(key, ()):
+                self._add_target(kind, entry)
+
+        if not any(target.kind == "category" for target in self.targets):
+            raise TaxonomyError("taxonomia sem categorias")
+
+        trie: dict = {}
+        for term in self.exact_terms:
+            _trie_insert(trie, _term_units(term))
+        for term in self.prefix_terms:
+            _trie_insert(trie, _term_units(term + PREFIX_WILDCARD))
+
+        self.pattern = re.compile(r"\b" + _trie_pattern(trie) + r"\b")
+        self.term_count = len(self.exact_terms) + len(self.prefix_terms)
+
+    def _add_target(self, kind: str, entry: dict) -> None:
+        name = entry.get("name")
+        if not name:
+            raise TaxonomyError(f"{kind} sem 'name': {entry!r}")
+
+        index = len(self.targets)
+        self.targets.append(
+            Target(
+                kind=kind,
+                name=name,
+                tags=tuple(entry.get("tags", (name,) if kind == "tag" else ())),
+                parents=tuple(entry.get("parents", ())),
+            )
+        )
+
+        for item in entry.get("terms", ()):
+            term, weight = (item["term"], item.get("weight", 1)) if isinstance(item, dict) else (item, 1)
+            prefix = term.endswith(PREFIX_WILDCARD)
+            normalized = normalize_text(term.rstrip(PREFIX_WILDCARD))
+            if not normalized:
+                raise TaxonomyError(f"termo vazio em {kind} {name!r}: {term!r}")
+
+            terms = self.prefix_terms if prefix else self.exact_terms
+            terms.setdefault(normalized, []).append(TermRule(index, float(weight)))
+
+    def _term_for(self, matched: str) -> tuple[str, list[TermRule]]:
+        """
+        Termo da taxonomia (e suas regras) que gerou o trecho casado.
+        """
+        rules = self.exact_terms.get(matched)
+        if rules is not None:
+            return matched, rules
+        # Prefixo mais longo que casou
+        for end in range(len(matched), 0, -1):
+            rules = self.prefix_terms.get(matched[:end])
+            if rules is not None:
+                return matched[:end] + PREFIX_WILDCARD, rules
+        return matched, []
+
+    def target_scores(self, text: str) -> list[float]:
+        """
+        Pontuação de cada alvo (categorias, subcategorias e tags, na ordem
+        de self.targets), numa passada pelo texto.
+        """
+        hits: dict[str, int] = {}
+        for match in self.pattern.finditer(normalize_text(text)):
+            matched = match.group()
+            hits[matched] = hits.get(matched, 0) + 1
+
+        # Teto por termo da taxonomia, não por forma encontrada no texto
+        term_hits: dict[str, tuple[list[TermRule], int]] = {}
+        for matched, count in hits.items():
+            term, rules = self._term_for(matched)
+            _, previous = term_hits.get(term, (rules, 0))
+            term_hits[term] = (rules, previous + count)
+
+        scores = [0.0] * len(self.targets)
+        for rules, count in term_hits.values():
+            count = min(count, self.max_hits_per_term)
+            for rule in rules:
+                scores[rule.target] += rule.weight * count
+        return scores
+
+    def categorize(self, text: str) -> CategorizationResult:
+        scores = self.target_scores(text or "")
+
+        main_category = self.default_category
+        best_category: Optional[Target] = None
+        best_sub: Optional[Target] = None
+        best_category_score = best_sub_score = self.min_score - 1e-9
+        category_scores: dict[str, float] = {}
+        tags: list[str] = list(self.base_tags)
+
+        for target, score in zip(self.targets, scores):
+            if target.kind == "category":
+                category_scores[target.name] = score
+                # Estritamente maior: no empate fica a declarada primeiro
+                if score > best_category_score:
+                    best_category, best_category_score = target, score
+            elif target.kind == "tag" and score >= self.min_score:
+                tags.extend(target.tags)
+
+        if best_category is not None:
+            main_category = best_category.name
+            tags.extend(best_category.tags)
+
+        for target, score in zip(self.targets, scores):
+            if target.kind != "subcategory" or score <= best_sub_score:
+                continue
+            if target.parents and main_category not in target.parents:
+                continue
+            best_sub, best_sub_score = target, score
+
+        if best_sub is not None:
+            tags.extend(best_sub.tags)
+
+        return CategorizationResult(
+            main_category=main_category,
+            sub_category=best_sub.name if best_sub else None,
+            tags=list(dict.fromkeys(tags)),
+            scores=category_scores,
+        )
+
+    def categorize_batch(self, texts: Iterable[str]) -> list[CategorizationResult]:
+        """
+        Vários textos com a mesma taxonomia compilada, na mesma ordem.
+        """
+        return [self.categorize(text) for text in texts]
+
+
+# ─────────────────────────────────────────────
+#  Carga (uma por processo)
+# ─────────────────────────────────────────────
+
+def taxonomy_path() -> Path:
+    return Path(settings.categorization_taxonomy_path) if settings.categorization_taxonomy_path else DEFAULT_TAXONOMY_PATH
+
+
+def load_taxonomy(path: Optional[Path] = None) -> CompiledTaxonomy:
+    path = path or taxonomy_path()
+    try:
+        taxonomy = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        raise TaxonomyError(f"não foi possível ler a taxonomia {path}: {e}") from e
+    return CompiledTaxonomy(taxonomy)
+
+
+_compiled: Optional[CompiledTaxonomy] = None
+_compiled_key: Optional[tuple] = None
+_compiled_lock = threading.Lock()
+
+
+def get_taxonomy() -> CompiledTaxonomy:
+    """
+    Taxonomia compilada, reaproveitada entre tasks. Recompila quando o
+    arquivo muda (caminho ou mtime), sem reiniciar o worker.
+    """
+    global _compiled, _compiled_key
+    path = taxonomy_path()
+    key = (str(path), os.stat(path).st_mtime_ns)
+
+    with _compiled_lock:
+        if _compiled is None or _compiled_key != key:
+            _compiled = load_taxonomy(path)
+            _compiled_key = key
+            print(
+                f"[categorization] Taxonomia {_compiled.version} carregada de {path} "
+                f"({_compiled.term_count} termos)"
+            )
+        return _compiled
+
+
+def categorize_batch(texts: Iterable[str]) -> list[CategorizationResult]:
+    return get_taxonomy().categorize_batch(texts)
@@ -0,0 +1,88 @@
+"""
+Gravação em lote dos resultados da categorização (VideoMetadata).
+
+Usado pelo estágio do pipeline (app/workers/tasks_categorization.py) e pelo
+backfill de re-categorização (backfill_categorization.py).
+"""
+
+from datetime import datetime
+from typing import Iterable, TypeVar
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.categorization.engine import MODEL_NAME, CategorizationResult
+from app.db.models_metadata import VideoMetadata
+from app.db.models_urls import Url
+
+
+Row = TypeVar("Row")
+
+UPSERT_COLUMNS = (
+    "main_category",
+    "sub_category",
+    "tags",
+    "category_scores",
+    "model_name",
+    "model_version",
+    "status",
+    "updated_at",
+)
+
+
+def latest_per_video(rows: Iterable[Row]) -> list[Row]:
+    """
+    Uma linha por video_id, a de maior transcript (as linhas vêm em ordem
+    de id). O ON CONFLICT não aceita a mesma linha duas vezes no comando.
+    """
+    return list({row.video_id: row for row in rows}.values())
+
+
+def upsert_video_metadata(
+    db: Session,
+    video_ids: list[int],
+    results: list[CategorizationResult],
+    model_version: str,
+) -> None:
+    """
+    Cria ou atualiza o VideoMetadata de cada vídeo num único
+    INSERT ... ON CONFLICT (video_id).
+    """
+    if not video_ids:
+        return
+
+    now = datetime.utcnow()
+    upsert = pg_insert(VideoMetadata).values(
+        [
+            {
+                "video_id": video_id,
+                "main_category": result.main_category,
+                "sub_category": result.sub_category,
+                "tags": result.tags,
+                "category_scores": result.scores,
+                "model_name": MODEL_NAME,
+                "model_version": model_version,
+                "status": "ready",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for video_id, result in zip(video_ids, results)
+        ]
+    )
+    db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[VideoMetadata.video_id],
+            set_={column: upsert.excluded[column] for column in UPSERT_COLUMNS},
+        )
+    )
+
+
+def mark_urls_categorized(db: Session, url_ids: list[int], only_transcribed: bool = False) -> None:
+    if not url_ids:
+        return
+
+    statement = update(Url).where(Url.id.in_(url_ids))
+    if only_transcribed:
+        statement = statement.where(Url.status == "transcribed")
+    db.execute(statement.values(status="categorized"))
@@ -23,7 +23,154 @@ class Settings(BaseModel):
         "/Users/lanna/vsl_pipeline/storage/audio_tmp",
     )
 
+    # O que o download_video guarda:
+    # - "video": o mp4 (transcribe_video extrai o áudio depois)
+    # - "audio": só o mp3 pronto para transcrição, numa passada, sem guardar vídeo
+    download_mode: str = os.getenv("DOWNLOAD_MODE", "video")
+
+    # Download HLS: "native" (segmentos em paralelo) ou "ffmpeg" (legado)
+    hls_downloader: str = os.getenv("HLS_DOWNLOADER", "native")
+    hls_segment_concurrency: int = int(os.getenv("HLS_SEGMENT_CONCURRENCY", "8"))
+    hls_segment_retries: int = int(os.getenv("HLS_SEGMENT_RETRIES", "3"))
+    hls_segment_timeout_seconds: float = float(os.getenv("HLS_SEGMENT_TIMEOUT_SECONDS", "30"))
+    # Rendition do master playlist: "archive" (maior qualidade) ou
+    # "transcribe" (só áudio / menor bandwidth — bem menos bytes)
+    hls_rendition_policy: str = os.getenv("HLS_RENDITION_POLICY", "archive")
+    # Falha no download: a Url vai para 'download_failed' e o feeder a
+    # devolve à fila de download até este número de tentativas
+    download_max_retries: int = int(os.getenv("DOWNLOAD_MAX_RETRIES", "3"))
+    # Url 'downloading' sem heartbeat há mais que isto: o worker morreu, a
+    # Url vai para 'download_failed' (o heartbeat roda a cada 60 s)
+    download_lease_seconds: int = int(os.getenv("DOWNLOAD_LEASE_SECONDS", "900"))
+
+    # Processos ffmpeg/ffprobe (app/media/process.py): limite total, limite
+    # sem progresso (o processo group leva SIGKILL) e intervalo de reporte
+    media_process_timeout_seconds: float = float(os.getenv("MEDIA_PROCESS_TIMEOUT_SECONDS", "14400"))
+    media_process_stall_seconds: float = float(os.getenv("MEDIA_PROCESS_STALL_SECONDS", "300"))
+    media_progress_interval_seconds: float = float(os.getenv("MEDIA_PROGRESS_INTERVAL_SECONDS", "5"))
+
+    # Transcrição em pedaços (app/transcription/chunked.py): áudios mais
+    # longos que TRANSCRIPTION_CHUNK_SECONDS ou maiores que o limite de
+    # upload são divididos em silêncios e transcritos em paralelo
+    transcription_chunking_enabled: bool = os.getenv("TRANSCRIPTION_CHUNKING_ENABLED", "true").lower() == "true"
+    transcription_chunk_seconds: float = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "600"))
+    transcription_chunk_min_seconds: float = float(os.getenv("TRANSCRIPTION_CHUNK_MIN_SECONDS", "240"))
+    transcription_chunk_overlap_seconds: float = float(os.getenv("TRANSCRIPTION_CHUNK_OVERLAP_SECONDS", "2"))
+    transcription_chunk_concurrency: int = int(os.getenv("TRANSCRIPTION_CHUNK_CONCURRENCY", "4"))
+    transcription_silence_noise_db: float = float(os.getenv("TRANSCRIPTION_SILENCE_NOISE_DB", "-35"))
+    transcription_silence_min_seconds: float = float(os.getenv("TRANSCRIPTION_SILENCE_MIN_SECONDS", "0.4"))
+    # Limite de upload da API de transcrição (25 MB no Whisper da OpenAI)
+    transcription_max_upload_bytes: int = int(os.getenv("TRANSCRIPTION_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+    # Falha na transcrição: a Url vai para 'transcription_failed' e o feeder
+    # a devolve à fila de transcrição até este número de tentativas
+    transcription_max_retries: int = int(os.getenv("TRANSCRIPTION_MAX_RETRIES", "3"))
+    # Url 'downloaded' há mais que isto sem virar 'transcribed': a mensagem
+    # de transcrição se perdeu (ou o worker morreu) e a Url vai para
+    # 'transcription_failed'. Precisa passar da transcrição mais longa
+    transcription_lease_seconds: int = int(os.getenv("TRANSCRIPTION_LEASE_SECONDS", "21600"))
+
+    # Whisper da OpenAI (app/workers/whisper_client.py). Um cliente por
+    # processo, com pool de conexões keep-alive
+    openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    openai_whisper_model: str = os.getenv("OPENAI_WHISPER_MODEL", "whisper-1")
+    whisper_max_connections: int = int(os.getenv("WHISPER_MAX_CONNECTIONS", "16"))
+    whisper_keepalive_seconds: float = float(os.getenv("WHISPER_KEEPALIVE_SECONDS", "120"))
+    whisper_timeout_seconds: float = float(os.getenv("WHISPER_TIMEOUT_SECONDS", "600"))
+    whisper_max_retries: int = int(os.getenv("WHISPER_MAX_RETRIES", "2"))
+
+    # Motor de transcrição (app/transcription/engines.py):
+    # "whisper_api" (OpenAI), "local_whisper" (faster-whisper na CPU) ou "stub"
+    transcription_engine: str = os.getenv("TRANSCRIPTION_ENGINE", "whisper_api")
+    # local_whisper: modelo (tiny/base/small/medium/large-v3 ou caminho),
+    # quantização e threads (0 = automático)
+    local_whisper_model: str = os.getenv("LOCAL_WHISPER_MODEL", "small")
+    local_whisper_compute_type: str = os.getenv("LOCAL_WHISPER_COMPUTE_TYPE", "int8")
+    local_whisper_cpu_threads: int = int(os.getenv("LOCAL_WHISPER_CPU_THREADS", "0"))
+    local_whisper_batch_size: int = int(os.getenv("LOCAL_WHISPER_BATCH_SIZE", "8"))
+    # Cria o motor (cliente HTTP / modelo local) quando o worker sobe, em
+    # vez de na primeira task
+    transcription_engine_warmup: bool = os.getenv("TRANSCRIPTION_ENGINE_WARMUP", "true").lower() == "true"
+    # Reaproveita a transcrição de outro vídeo com o mesmo áudio
+    # (impressão digital, app/media/fingerprint.py) em vez de chamar o motor
+    transcript_fingerprint_cache_enabled: bool = os.getenv("TRANSCRIPT_FINGERPRINT_CACHE_ENABLED", "true").lower() == "true"
+    # Máximo de bits diferentes (BER) para considerar dois áudios o mesmo
+    # VSL. Re-encodes ficam tipicamente abaixo de 0.15; áudios diferentes
+    # perto de 0.5
+    transcript_fingerprint_max_ber: float = float(os.getenv("TRANSCRIPT_FINGERPRINT_MAX_BER", "0.25"))
+
+    # Categorização (app/categorization/engine.py): JSON da taxonomia
+    # versionada. Vazio = app/categorization/taxonomy.json
+    categorization_taxonomy_path: str = os.getenv("CATEGORIZATION_TAXONOMY_PATH", "")
+    # Estágio em micro-lotes (app/workers/tasks_categorization.py): os
+    # transcripts prontos esperam num buffer no Redis até juntar um lote
+    categorization_enabled: bool = os.getenv("CATEGORIZATION_ENABLED", "true").lower() == "true"
+    categorization_batch_size: int = int(os.getenv("CATEGORIZATION_BATCH_SIZE", "200"))
+    # Esvazia lotes incompletos e varre Urls esquecidas em 'transcribed'
+    categorization_flush_interval_seconds: int = int(os.getenv("CATEGORIZATION_FLUSH_INTERVAL_SECONDS", "30"))
+    categorization_max_retries: int = int(os.getenv("CATEGORIZATION_MAX_RETRIES", "3"))
+
+    # Busca por VSLs parecidos (app/similarity). EMBEDDER:
+    # "sentence_transformers" (modelo local na CPU) ou "hashing" (sem modelo)
+    embedding_enabled: bool = os.getenv("EMBEDDING_ENABLED", "false").lower() == "true"
+    embedder: str = os.getenv("EMBEDDER", "sentence_transformers")
+    embedding_model_name: str = os.getenv(
+        "EMBEDDING_MODEL_NAME",
+        "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+    )
+    embedding_cpu_threads: int = int(os.getenv("EMBEDDING_CPU_THREADS", "0"))
+    embedding_window_words: int = int(os.getenv("EMBEDDING_WINDOW_WORDS", "100"))
+    embedding_max_windows: int = int(os.getenv("EMBEDDING_MAX_WINDOWS", "64"))
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    embedding_hashing_dim: int = int(os.getenv("EMBEDDING_HASHING_DIM", "512"))
+    # Como o vetor é gravado: "float16" (2 bytes/dimensão) ou "int8" (1 byte)
+    embedding_storage_dtype: str = os.getenv("EMBEDDING_STORAGE_DTYPE", "float16")
+    # Task periódica que vetoriza os transcripts novos
+    embedding_interval_seconds: int = int(os.getenv("EMBEDDING_INTERVAL_SECONDS", "60"))
+    embedding_transcripts_per_batch: int = int(os.getenv("EMBEDDING_TRANSCRIPTS_PER_BATCH", "32"))
+    embedding_max_per_run: int = int(os.getenv("EMBEDDING_MAX_PER_RUN", "2000"))
+    # Índice em memória da API: força bruta até SIMILARITY_IVF_MIN_VECTORS,
+    # depois IVF (listas por k-means) olhando SIMILARITY_IVF_NPROBE listas
+    similarity_ivf_min_vectors: int = int(os.getenv("SIMILARITY_IVF_MIN_VECTORS", "50000"))
+    similarity_ivf_nprobe: int = int(os.getenv("SIMILARITY_IVF_NPROBE", "16"))
+    # Intervalo mínimo entre leituras de vetores novos no banco
+    similarity_index_refresh_seconds: float = float(os.getenv("SIMILARITY_INDEX_REFRESH_SECONDS", "30"))
+
+    # Ciclo de vida do disco (app/media/lifecycle.py). Quota 0 = sem limite.
+    storage_lifecycle_enabled: bool = os.getenv("STORAGE_LIFECYCLE_ENABLED", "false").lower() == "true"
+    storage_lifecycle_interval_seconds: int = int(os.getenv("STORAGE_LIFECYCLE_INTERVAL_SECONDS", "900"))
+    video_storage_quota_bytes: int = int(os.getenv("VIDEO_STORAGE_QUOTA_BYTES", "0"))
+    audio_temp_quota_bytes: int = int(os.getenv("AUDIO_TEMP_QUOTA_BYTES", "0"))
+    # Vídeos já transcritos mais velhos que isso são removidos (0 = nunca)
+    video_max_age_days: int = int(os.getenv("VIDEO_MAX_AGE_DAYS", "0"))
+    # Arquivos mais novos que isso nunca são considerados órfãos
+    storage_orphan_grace_seconds: int = int(os.getenv("STORAGE_ORPHAN_GRACE_SECONDS", "3600"))
+    # Downloads HLS interrompidos ficam em {VIDEO_STORAGE_PATH}/partial/<url_id>
+    # para o retry continuar de onde parou; depois disso sem atividade, são apagados
+    download_partial_ttl_seconds: int = int(os.getenv("DOWNLOAD_PARTIAL_TTL_SECONDS", "172800"))
+
     enable_ingest_scheduler: bool = os.getenv("ENABLE_INGEST_SCHEDULER", "false").lower() == "true"
 
+    # Tempo máximo que uma URL pode ficar 'queued' sem nenhum worker pegar.
+    # Depois disso ela volta para 'pending_ingest' (ex.: dispatch perdido).
+    ingest_claim_lease_seconds: int = int(os.getenv("INGEST_CLAIM_LEASE_SECONDS", "21600"))
+
+    # Feeder contínuo (substitui o cron diário quando habilitado)
+    ingest_feeder_enabled: bool = os.getenv("INGEST_FEEDER_ENABLED", "false").lower() == "true"
+    ingest_feeder_interval_seconds: int = int(os.getenv("INGEST_FEEDER_INTERVAL_SECONDS", "30"))
+    # Máximo de URLs em andamento por estágio
+    feeder_download_watermark: int = int(os.getenv("FEEDER_DOWNLOAD_WATERMARK", "50"))
+    feeder_transcription_watermark: int = int(os.getenv("FEEDER_TRANSCRIPTION_WATERMARK", "50"))
+    # Máximo de mensagens aguardando nas filas do broker
+    feeder_broker_queue_watermark: int = int(os.getenv("FEEDER_BROKER_QUEUE_WATERMARK", "200"))
+    # Máximo de URLs novas por rodada do feeder
+    feeder_max_batch: int = int(os.getenv("FEEDER_MAX_BATCH", "200"))
+
+    # Cache de resultados da busca (/api/search)
+    search_cache_enabled: bool = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    search_cache_max_entries: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+    search_cache_ttl_seconds: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+    # Camada compartilhada no Redis entre os workers uvicorn
+    search_cache_redis: bool = os.getenv("SEARCH_CACHE_REDIS", "false").lower() == "true"
+
 settings = Settings()
 
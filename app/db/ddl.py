@@ -0,0 +1,119 @@
+"""
+DDL complementar ao Base.metadata.create_all().
+
+O create_all só cria tabelas que ainda não existem. Tudo o que ele não
+cobre (extensões, configurações de text search, triggers, colunas novas
+em tabelas já existentes) fica aqui, sempre escrito de forma idempotente
+para poder rodar `python init_db.py` quantas vezes quiser.
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+
+POST_CREATE_DDL: list[str] = [
+    # ─────────────────────────────────────────────
+    #  Busca full-text em transcripts
+    # ─────────────────────────────────────────────
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # Configuração 'pt_unaccent': stemming em português + remoção de acentos
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_ts_config
+            WHERE cfgname = 'pt_unaccent'
+              AND cfgnamespace = 'public'::regnamespace
+        ) THEN
+            CREATE TEXT SEARCH CONFIGURATION public.pt_unaccent (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION public.pt_unaccent
+                ALTER MAPPING FOR hword, hword_part, word
+                WITH unaccent, portuguese_stem;
+        END IF;
+    END
+    $$
+    """,
+    "ALTER TABLE transcripts ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE INDEX IF NOT EXISTS ix_transcripts_search_vector
+        ON transcripts USING gin (search_vector)
+    """,
+    # Trigger que mantém search_vector sincronizado com full_text
+    """
+    CREATE OR REPLACE FUNCTION transcripts_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector('public.pt_unaccent', coalesce(NEW.full_text, ''));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_transcripts_search_vector ON transcripts",
+    """
+    CREATE TRIGGER trg_transcripts_search_vector
+        BEFORE INSERT OR UPDATE OF full_text ON transcripts
+        FOR EACH ROW EXECUTE FUNCTION transcripts_search_vector_update()
+    """,
+    # ─────────────────────────────────────────────
+    #  Ingestão em lote de URLs
+    # ─────────────────────────────────────────────
+    "CREATE INDEX IF NOT EXISTS ix_urls_raw_url ON urls USING hash (raw_url)",
+    # ─────────────────────────────────────────────
+    #  Claim concorrente de URLs pendentes
+    # ─────────────────────────────────────────────
+    "ALTER TABLE urls ADD COLUMN IF NOT EXISTS claimed_at timestamp without time zone",
+    "CREATE INDEX IF NOT EXISTS ix_urls_status_id ON urls (status, id)",
+    # ─────────────────────────────────────────────
+    #  Storage content-addressed (refcount por storage_key)
+    # ─────────────────────────────────────────────
+    "CREATE INDEX IF NOT EXISTS ix_videos_storage_key ON videos (storage_key)",
+    # LRU da eviction (app/media/lifecycle.py)
+    "ALTER TABLE videos ADD COLUMN IF NOT EXISTS last_accessed_at timestamp without time zone",
+    # ─────────────────────────────────────────────
+    #  Telemetria dos estágios de mídia
+    # ─────────────────────────────────────────────
+    "ALTER TABLE jobs ADD COLUMN IF NOT EXISTS metrics jsonb",
+    # ─────────────────────────────────────────────
+    #  Cache de transcrição por impressão digital do áudio
+    # ─────────────────────────────────────────────
+    "ALTER TABLE videos ADD COLUMN IF NOT EXISTS audio_fingerprint varchar",
+    "CREATE INDEX IF NOT EXISTS ix_videos_audio_fingerprint ON videos (audio_fingerprint)",
+    """
+    ALTER TABLE transcripts ADD COLUMN IF NOT EXISTS source_transcript_id integer
+        REFERENCES transcripts (id) ON DELETE SET NULL
+    """,
+    # ─────────────────────────────────────────────
+    #  Segmentos com tempo (busca com offset no vídeo)
+    # ─────────────────────────────────────────────
+    "ALTER TABLE transcript_segments ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    CREATE INDEX IF NOT EXISTS ix_transcript_segments_search_vector
+        ON transcript_segments USING gin (search_vector)
+    """,
+    """
+    CREATE OR REPLACE FUNCTION transcript_segments_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := to_tsvector('public.pt_unaccent', coalesce(NEW.text, ''));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS trg_transcript_segments_search_vector ON transcript_segments",
+    """
+    CREATE TRIGGER trg_transcript_segments_search_vector
+        BEFORE INSERT OR UPDATE OF text ON transcript_segments
+        FOR EACH ROW EXECUTE FUNCTION transcript_segments_search_vector_update()
+    """,
+    # ─────────────────────────────────────────────
+    #  Categorização por taxonomia
+    # ─────────────────────────────────────────────
+    "ALTER TABLE video_metadata ADD COLUMN IF NOT EXISTS category_scores jsonb",
+]
+
+
+def apply_post_create_ddl(engine: Engine) -> None:
+    """
+    Executa todos os comandos de POST_CREATE_DDL numa única transação.
+    """
+    with engine.begin() as conn:
+        for statement in POST_CREATE_DDL:
+            conn.execute(text(statement))
@@ -1,8 +1,11 @@
 from app.db.models_urls import Url
 from app.db.models_videos import Video
 from app.db.models_transcripts import Transcript
+from app.db.models_transcript_segments import TranscriptSegment
 from app.db.models_metadata import VideoMetadata
+from app.db.models_embeddings import TranscriptEmbedding
+from app.db.models_fingerprints import AudioFingerprint
 from app.db.models_jobs import Job
 from app.db.models_dlq import DeadLetter
 
-__all__ = ["Url", "Video", "Transcript", "VideoMetadata", "Job", "DeadLetter"]
+__all__ = ["Url", "Video", "Transcript", "TranscriptSegment", "VideoMetadata", "TranscriptEmbedding", "AudioFingerprint", "Job", "DeadLetter"]
@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    Float,
+    String,
+    LargeBinary,
+    DateTime,
+    ForeignKey,
+    UniqueConstraint,
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TranscriptEmbedding(Base):
+    """
+    Vetor (embedding) de uma transcrição, para a busca por VSLs parecidos
+    (app/similarity).
+
+    O vetor fica em bytes compactos (float16 ou int8 com escala); o índice
+    em memória da API é montado a partir desta tabela e acompanha as linhas
+    novas pelo id crescente.
+    """
+
+    __tablename__ = "transcript_embeddings"
+    __table_args__ = (
+        # Um vetor por transcrição e modelo (trocar de modelo não apaga os antigos)
+        UniqueConstraint("transcript_id", "model", name="uq_transcript_embeddings_transcript_model"),
+    )
+
+    # Cresce a cada vetor gravado. Linhas nunca são reescritas: um vetor já
+    # gravado fica (on_conflict_do_nothing) e um modelo novo insere linhas
+    # novas, então o índice da API lê só id > último lido
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+
+    transcript_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("transcripts.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    video_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("videos.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    # Nome do embedder (ex.: "hashing-384", "paraphrase-multilingual-MiniLM-L12-v2")
+    model: Mapped[str] = mapped_column(String, nullable=False, index=True)
+
+    # 'float16' ou 'int8'
+    dtype: Mapped[str] = mapped_column(String, nullable=False)
+    dim: Mapped[int] = mapped_column(Integer, nullable=False)
+    # Só int8: valor = byte * scale
+    scale: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    vector: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<TranscriptEmbedding id={self.id} transcript_id={self.transcript_id} "
+            f"model={self.model} {self.dtype}x{self.dim}>"
+        )
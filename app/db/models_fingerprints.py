@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    Integer,
+    String,
+    LargeBinary,
+    DateTime,
+    ForeignKey,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class AudioFingerprint(Base):
+    """
+    Impressão digital perceptual do áudio de um vídeo
+    (app/media/fingerprint.py), para reaproveitar transcrições de cópias
+    re-encodadas do mesmo VSL (app/transcription/cache.py).
+
+    `keys` acha os candidatos pelo índice GIN (operador &&); `frames` é a
+    sequência completa, comparada com tolerância (BER) só nos candidatos.
+    """
+
+    __tablename__ = "audio_fingerprints"
+    __table_args__ = (
+        Index("ix_audio_fingerprints_keys", "keys", postgresql_using="gin"),
+    )
+
+    video_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("videos.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    # FINGERPRINT_VERSION: versões diferentes nunca são comparadas
+    version: Mapped[str] = mapped_column(String, nullable=False)
+
+    # Chaves LSH (bottom-k das palavras de 32 bits, como int32)
+    keys: Mapped[list[int]] = mapped_column(ARRAY(Integer), nullable=False)
+
+    # Uma palavra uint32 little-endian por quadro
+    frames: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, default=datetime.utcnow
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<AudioFingerprint video_id={self.video_id} version={self.version} "
+            f"frames={len(self.frames) // 4}>"
+        )
@@ -8,6 +8,7 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -35,6 +36,9 @@ class Job(Base):
 
     retries: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
+    # Throughput do job (bytes, seconds, bytes_per_second, realtime_factor...)
+    metrics: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, nullable=False
     )
@@ -36,8 +36,13 @@ class VideoMetadata(Base):
     # Ex.: ["promessa forte", "webinar", "copy agressiva"]
     tags: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
 
+    # Pontuação de cada categoria da taxonomia: {"categoria": score}
+    category_scores: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+
     # Modelo de IA usado (ex.: "gpt-4.1-mini", "qwen2.5-72b")
     model_name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Categorização por taxonomia: model_name "taxonomy_matcher" e
+    # model_version = versão da taxonomia
     model_version: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
     # Status: 'pending', 'ready', 'failed'
@@ -0,0 +1,54 @@
+from typing import Optional
+
+from sqlalchemy import (
+    Integer,
+    Text,
+    ForeignKey,
+    Index,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TranscriptSegment(Base):
+    """
+    Trecho da transcrição com o tempo em que é falado no vídeo.
+
+    A busca usa o full_text do Transcript para achar e ordenar os vídeos;
+    os segmentos respondem "em que momento deste vídeo o termo aparece"
+    sem reprocessar o texto inteiro (índice GIN próprio).
+    """
+
+    __tablename__ = "transcript_segments"
+    __table_args__ = (
+        Index("ix_transcript_segments_transcript_start", "transcript_id", "start_ms"),
+        Index("ix_transcript_segments_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    transcript_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("transcripts.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    # Offsets no áudio, em milissegundos
+    start_ms: Mapped[int] = mapped_column(Integer, nullable=False)
+    end_ms: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+
+    # Mesmo esquema de transcripts.search_vector: preenchido por trigger
+    # (ver app/db/ddl.py), nunca pela aplicação
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, nullable=True, deferred=True
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<TranscriptSegment id={self.id} transcript_id={self.transcript_id} "
+            f"{self.start_ms}-{self.end_ms}ms>"
+        )
@@ -7,7 +7,9 @@ from sqlalchemy import (
     Text,
     ForeignKey,
     DateTime,
+    Index,
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -15,6 +17,9 @@ from app.db.base import Base
 
 class Transcript(Base):
     __tablename__ = "transcripts"
+    __table_args__ = (
+        Index("ix_transcripts_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -31,9 +36,24 @@ class Transcript(Base):
     # Língua detectada
     language: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
+    # Preenchido quando o texto foi copiado de outra transcrição do mesmo
+    # áudio (cache por impressão digital) em vez de passar pelo motor
+    source_transcript_id: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        ForeignKey("transcripts.id", ondelete="SET NULL"),
+        nullable=True,
+    )
+
     # Texto completo da transcrição
     full_text: Mapped[str] = mapped_column(Text, nullable=False)
 
+    # Vetor de busca full-text (portuguese + unaccent).
+    # Preenchido por trigger no Postgres (ver app/db/ddl.py), nunca pela aplicação.
+    # deferred=True: não carregamos o vetor ao buscar o Transcript.
+    search_vector: Mapped[Optional[str]] = mapped_column(
+        TSVECTOR, nullable=True, deferred=True
+    )
+
     # Status da transcrição
     # Exemplos: 'pending', 'ready', 'failed'
     status: Mapped[str] = mapped_column(String, nullable=False, default="ready")
@@ -7,6 +7,7 @@ from sqlalchemy import (
     String,
     DateTime,
     Date,
+    Index,
 )
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -15,6 +16,13 @@ from app.db.base import Base
 
 class Url(Base):
     __tablename__ = "urls"
+    __table_args__ = (
+        # Hash: só usamos igualdade em raw_url, e URLs de CDN com token
+        # podem passar do limite de tamanho de uma entrada btree.
+        Index("ix_urls_raw_url", "raw_url", postgresql_using="hash"),
+        # Busca de pendentes por status, em ordem de id (claim da ingestão)
+        Index("ix_urls_status_id", "status", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -28,10 +36,13 @@ class Url(Base):
     # Status geral no pipeline
     # Exemplos:
     # 'pending_ingest', 'queued_download', 'downloading',
-    # 'download_failed', 'downloaded', 'transcribed', 'categorized'
+    # 'download_failed', 'downloaded', 'transcription_failed',
+    # 'transcribed', 'categorized'
     status: Mapped[str] = mapped_column(String, nullable=False, default="pending_ingest")
 
-    # Quantas vezes já tentamos baixar / transcrever / categorizar
+    # Quantas vezes já tentamos baixar / transcrever / categorizar (as falhas
+    # de download e transcrição voltam pelo feeder até DOWNLOAD_MAX_RETRIES /
+    # TRANSCRIPTION_MAX_RETRIES)
     retry_count_download: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     retry_count_transcription: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     retry_count_categorization: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -39,6 +50,10 @@ class Url(Base):
     # Último erro relevante (texto livre)
     last_error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
 
+    # Quando a URL foi reservada (status 'queued') por process_pending_urls.
+    # Reservas mais antigas que o lease voltam para 'pending_ingest'.
+    claimed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
     # Data lógico do "lote" em que a URL entrou (para o batch diário)
     batch_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
 
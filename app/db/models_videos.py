@@ -7,6 +7,7 @@ from sqlalchemy import (
     BigInteger,
     ForeignKey,
     DateTime,
+    Index,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -15,6 +16,12 @@ from app.db.base import Base
 
 class Video(Base):
     __tablename__ = "videos"
+    __table_args__ = (
+        # Contagem de referências do storage content-addressed
+        Index("ix_videos_storage_key", "storage_key"),
+        # Reaproveitamento de transcrições (app/transcription/cache.py)
+        Index("ix_videos_audio_fingerprint", "audio_fingerprint"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
 
@@ -27,7 +34,8 @@ class Video(Base):
     )
 
     # Caminho no storage (disco local ou S3)
-    # Exemplo: "videos/2025/11/13/abcd1234.mp4"
+    # Exemplo: "cas/ab/cd/abcd1234....mp4" (sha256 do conteúdo, ver app/media/storage.py)
+    # Registros antigos: caminho absoluto "…/storage/videos/<uuid>.mp4"
     storage_key: Mapped[str] = mapped_column(String, nullable=False)
 
     # Formato do arquivo de vídeo (mp4, mkv, etc.)
@@ -39,6 +47,20 @@ class Video(Base):
     # Duração em segundos (se conseguirmos extrair com ffprobe)
     duration_seconds: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
+    # Digest exato da impressão digital do áudio (ex.: "p1:<sha256>"),
+    # calculado pelo transcribe_video: atalho para cópias com o mesmo áudio
+    # decodificado. A impressão perceptual fica em audio_fingerprints (ver
+    # app/media/fingerprint.py). Nulo se o áudio é curto ou silencioso
+    # demais para identificar (AudioPrint.usable)
+    audio_fingerprint: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    # Último uso do arquivo (download, transcrição, playback pela API): a
+    # eviction de app/media/lifecycle.py remove primeiro o menos usado.
+    # NULL em vídeos anteriores à coluna (a eviction usa updated_at)
+    last_accessed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True, default=datetime.utcnow
+    )
+
     # Status do vídeo no storage
     # Exemplo: 'stored', 'deleted'
     status: Mapped[str] = mapped_column(String, nullable=False, default="stored")
@@ -0,0 +1,118 @@
+"""
+Inserção de URLs em lote, orientada a conjuntos.
+
+Para cada chunk de URLs:
+- deduplica dentro do próprio chunk, em memória
+- UMA query (índice em urls.raw_url) para descobrir quais já existem
+- UM INSERT multi-VALUES ... RETURNING para as novas
+
+Duplicatas entre chunks diferentes são pegas pela query do chunk seguinte,
+já que os INSERTs anteriores são visíveis na mesma transação. Assim a
+memória usada depende só do tamanho do chunk, não do total de URLs.
+"""
+
+from datetime import date, datetime
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db.models_urls import Url
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class UrlIngestResult(NamedTuple):
+    raw_url: str
+    created: bool
+    url_id: Optional[int]
+
+
+def chunked(items: Iterable[str], size: int) -> Iterator[list[str]]:
+    chunk: list[str] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def ingest_url_chunk(
+    db: Session,
+    raw_urls: list[str],
+    url_type: str = "m3u8",
+) -> list[UrlIngestResult]:
+    """
+    Insere um chunk de URLs com status 'pending_ingest'.
+
+    Devolve um resultado por item de entrada, na mesma ordem. Itens repetidos
+    (no banco ou no próprio chunk) voltam com created=False e o id existente.
+    """
+    if not raw_urls:
+        return []
+
+    unique_urls = list(dict.fromkeys(raw_urls))
+
+    # 1) Quais já existem no banco (se houver mais de uma, vale a mais recente)
+    existing: dict[str, int] = dict(
+        db.execute(
+            select(Url.raw_url, func.max(Url.id))
+            .where(Url.raw_url.in_(unique_urls))
+            .group_by(Url.raw_url)
+        ).all()
+    )
+
+    # 2) Insere as novas num único statement
+    new_urls = [raw for raw in unique_urls if raw not in existing]
+    created: dict[str, int] = {}
+
+    if new_urls:
+        now = datetime.utcnow()
+        today = date.today()
+        rows = db.execute(
+            insert(Url)
+            .values(
+                [
+                    {
+                        "raw_url": raw,
+                        "type": url_type,
+                        "status": "pending_ingest",
+                        "batch_date": today,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for raw in new_urls
+                ]
+            )
+            .returning(Url.id, Url.raw_url)
+        ).all()
+        created = {raw: url_id for url_id, raw in rows}
+
+    # 3) Monta o resultado na ordem de entrada. Só a primeira ocorrência de
+    #    uma URL nova conta como criada; as seguintes são duplicatas dela.
+    results: list[UrlIngestResult] = []
+    for raw in raw_urls:
+        if raw in created:
+            results.append(UrlIngestResult(raw, True, created.pop(raw)))
+            existing[raw] = results[-1].url_id
+        else:
+            results.append(UrlIngestResult(raw, False, existing.get(raw)))
+
+    return results
+
+
+def ingest_urls(
+    db: Session,
+    raw_urls: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    url_type: str = "m3u8",
+) -> Iterator[list[UrlIngestResult]]:
+    """
+    Processa raw_urls em chunks de chunk_size, devolvendo os resultados de
+    cada chunk conforme eles são gravados.
+    """
+    for chunk in chunked(raw_urls, chunk_size):
+        yield ingest_url_chunk(db, chunk, url_type=url_type)
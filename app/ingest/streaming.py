@@ -0,0 +1,360 @@
+"""
+Ingestão de listas de URLs muito grandes via corpo de requisição em stream
+(NDJSON ou CSV).
+
+O corpo é lido em pedaços conforme chega, quebrado em linhas, e cada
+chunk de URLs é gravado (e commitado) assim que fica completo. Para cada
+chunk sai uma linha de progresso em NDJSON na resposta. A memória usada
+depende do tamanho do chunk, nunca do tamanho do arquivo.
+"""
+
+import codecs
+import csv
+import json
+import re
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+
+from app.db.task_session import db_session
+from app.ingest.bulk_urls import ingest_url_chunk
+
+
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+# Nomes de coluna aceitos para a URL no CSV / no objeto NDJSON
+URL_FIELD_NAMES = ("raw_url", "url")
+
+# Linha maior que isso é descartada (conta como inválida): sem isso um
+# arquivo sem quebras de linha ficaria inteiro em memória
+STREAM_MAX_LINE_CHARS = 64 * 1024
+
+LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+
+# Registro CSV maior que isso é descartado (aspas que nunca fecham fariam o
+# resto do arquivo virar um registro só, em memória)
+CSV_MAX_RECORD_CHARS = 64 * 1024
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que não fica escutando 'http.disconnect' em paralelo.
+
+    O StreamingResponse padrão consome o canal receive() para detectar
+    desconexão, o que roubaria pedaços do corpo da requisição que ainda
+    estamos lendo enquanto respondemos.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def detect_format(content_type: Optional[str], explicit: Optional[str]) -> str:
+    if explicit:
+        return explicit.lower()
+
+    content_type = (content_type or "").lower()
+    if "csv" in content_type:
+        return "csv"
+    return "ndjson"
+
+
+class LineSplitter:
+    """
+    Quebra texto que chega em pedaços em linhas. Aceita \n, \r\n e \r
+    sozinho (CSV exportado pelo Excel antigo / Mac). Só o pedaço novo é
+    procurado por quebras; a linha incompleta fica guardada em partes, até
+    STREAM_MAX_LINE_CHARS. Passando disso a linha vira None (descartada) e
+    o resto dela é ignorado até a próxima quebra.
+    """
+
+    def __init__(self) -> None:
+        self.parts: list[str] = []
+        self.length = 0
+        self.overflow = False
+        # \r no fim do pedaço anterior: um \n no começo deste é o mesmo \r\n
+        self.after_cr = False
+
+    def feed(self, text: str) -> list[Optional[str]]:
+        if self.after_cr and text.startswith("\n"):
+            text = text[1:]
+        self.after_cr = text.endswith("\r")
+
+        lines: list[Optional[str]] = []
+        start = 0
+        for match in LINE_BREAK_RE.finditer(text):
+            self._append(text[start : match.start()])
+            lines.append(self._finish())
+            start = match.end()
+        self._append(text[start:])
+        return lines
+
+    def close(self) -> list[Optional[str]]:
+        if self.parts or self.overflow:
+            return [self._finish()]
+        return []
+
+    def _append(self, piece: str) -> None:
+        if self.overflow or not piece:
+            return
+        if self.length + len(piece) > STREAM_MAX_LINE_CHARS:
+            self.parts, self.length, self.overflow = [], 0, True
+            return
+        self.parts.append(piece)
+        self.length += len(piece)
+
+    def _finish(self) -> Optional[str]:
+        line = None if self.overflow else "".join(self.parts)
+        self.parts, self.length, self.overflow = [], 0, False
+        return line
+
+
+async def iter_lines(byte_stream: AsyncIterator[bytes]) -> AsyncIterator[Optional[str]]:
+    """
+    Converte o stream de bytes em linhas de texto (UTF-8), sem nunca
+    acumular mais do que uma linha incompleta (até STREAM_MAX_LINE_CHARS)
+    em memória. None no lugar de uma linha longa demais.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    splitter = LineSplitter()
+
+    async for data in byte_stream:
+        for line in splitter.feed(decoder.decode(data)):
+            yield line
+
+    for line in splitter.feed(decoder.decode(b"", final=True)) + splitter.close():
+        yield line
+
+
+def parse_ndjson_line(line: str) -> Optional[str]:
+    """
+    Aceita tanto uma string JSON ("https://...") quanto um objeto com
+    raw_url/url. Linhas vazias ou inválidas retornam None.
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        value = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+    if isinstance(value, dict):
+        for field in URL_FIELD_NAMES:
+            if isinstance(value.get(field), str):
+                value = value[field]
+                break
+        else:
+            return None
+
+    if not isinstance(value, str):
+        return None
+
+    return value.strip() or None
+
+
+class LineBuffer:
+    """
+    Iterador de linhas alimentado aos poucos. Diferente de um generator,
+    pode levantar StopIteration quando está vazio e voltar a entregar
+    linhas depois: o csv.reader em cima dele continua funcionando.
+    """
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "LineBuffer":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+class CsvUrlParser:
+    """
+    csv.reader sobre o stream decodificado. As linhas entram por feed() e
+    o registro só é entregue ao reader quando está completo: um campo entre
+    aspas pode conter quebras de linha, e o reader precisa ver o registro
+    inteiro (aspas balanceadas) de uma vez.
+
+    Se a primeira linha tiver uma coluna raw_url/url, ela é tratada como
+    cabeçalho; senão usamos a 1ª coluna.
+    """
+
+    def __init__(self) -> None:
+        self.column = 0
+        self.first_row = True
+        self.buffer = LineBuffer()
+        self.reader = csv.reader(self.buffer)
+        self.record: list[str] = []
+        self.record_length = 0
+        self.record_quotes = 0
+
+    def feed(self, line: str) -> Optional[list[str]]:
+        """
+        Recebe uma linha (sem a quebra). Retorna o registro quando ele fecha;
+        None enquanto um campo entre aspas continua aberto (ou para linhas
+        em branco fora de um registro). Um registro maior que
+        CSV_MAX_RECORD_CHARS (aspas que nunca fecham) é descartado: volta [].
+        """
+        if not self.record and not line.strip():
+            return None
+
+        self.record.append(line)
+        self.record_length += len(line) + 1
+        self.record_quotes += line.count('"')
+
+        if self.record_quotes % 2 == 0:
+            return self.flush()
+        if self.record_length > CSV_MAX_RECORD_CHARS:
+            self.reset()
+            return []
+        return None
+
+    def flush(self) -> Optional[list[str]]:
+        """
+        Entrega o registro pendente ao reader (no fim do stream, mesmo com
+        aspas abertas).
+        """
+        if not self.record:
+            return None
+        self.buffer.lines.extend(line + "\n" for line in self.record)
+        self.reset()
+        try:
+            return next(self.reader, [])
+        finally:
+            # Com aspas abertas no fim, o reader pode não ter consumido tudo
+            self.buffer.lines.clear()
+
+    def reset(self) -> None:
+        self.record = []
+        self.record_length = 0
+        self.record_quotes = 0
+
+    def consume_header(self, row: list[str]) -> bool:
+        """
+        Deve ser chamado para cada registro antes de url_from_row. Retorna
+        True se o registro era o cabeçalho (e portanto não contém URL).
+        """
+        if not self.first_row:
+            return False
+
+        self.first_row = False
+        header = [cell.strip().lower() for cell in row]
+        for field in URL_FIELD_NAMES:
+            if field in header:
+                self.column = header.index(field)
+                return True
+        return False
+
+    def url_from_row(self, row: list[str]) -> Optional[str]:
+        if self.column >= len(row):
+            return None
+
+        return row[self.column].strip() or None
+
+
+def _ingest_chunk_committed(raw_urls: list[str]) -> tuple[int, int]:
+    """
+    Grava um chunk numa transação própria. Roda no threadpool.
+    """
+    with db_session() as db:
+        results = ingest_url_chunk(db, raw_urls)
+
+    inserted = sum(1 for item in results if item.created)
+    return inserted, len(results) - inserted
+
+
+async def stream_ingest_urls(
+    byte_stream: AsyncIterator[bytes],
+    fmt: str,
+    chunk_size: int,
+) -> AsyncIterator[str]:
+    """
+    Lê as URLs do stream, grava em chunks e devolve uma linha NDJSON de
+    progresso por chunk, mais uma linha final com os totais.
+    """
+    csv_parser = CsvUrlParser() if fmt == "csv" else None
+
+    # Totais só de chunks já commitados (mais as linhas inválidas lidas)
+    totals = {"received": 0, "inserted": 0, "duplicates": 0, "invalid": 0}
+    chunk: list[str] = []
+    chunk_number = 0
+
+    async def flush_chunk() -> str:
+        nonlocal chunk, chunk_number
+        inserted, duplicates = await run_in_threadpool(_ingest_chunk_committed, chunk)
+        # Só conta depois do commit: se o chunk falhar, os totais e o número
+        # de chunks continuam descrevendo exatamente o que foi gravado
+        chunk_number += 1
+        totals["received"] += len(chunk)
+        totals["inserted"] += inserted
+        totals["duplicates"] += duplicates
+        progress = {
+            "chunk": chunk_number,
+            "chunk_received": len(chunk),
+            "chunk_inserted": inserted,
+            "chunk_duplicates": duplicates,
+            "total_received": totals["received"],
+            "total_inserted": totals["inserted"],
+            "total_duplicates": totals["duplicates"],
+            "total_invalid": totals["invalid"],
+        }
+        chunk = []
+        return json.dumps(progress) + "\n"
+
+    def add_url(raw_url: Optional[str]) -> None:
+        if raw_url is None:
+            totals["invalid"] += 1
+        else:
+            chunk.append(raw_url)
+
+    def add_csv_row(row: Optional[list[str]]) -> None:
+        if row is None or csv_parser.consume_header(row):
+            return
+        add_url(csv_parser.url_from_row(row))
+
+    try:
+        async for line in iter_lines(byte_stream):
+            if line is None:
+                # Linha longa demais, descartada (e o registro CSV em que
+                # ela estava junto)
+                totals["invalid"] += 1
+                if csv_parser is not None:
+                    csv_parser.reset()
+            elif csv_parser is not None:
+                add_csv_row(csv_parser.feed(line))
+            elif line.strip():
+                add_url(parse_ndjson_line(line))
+
+            if len(chunk) >= chunk_size:
+                yield await flush_chunk()
+
+        if csv_parser is not None:
+            add_csv_row(csv_parser.flush())
+
+        if chunk:
+            yield await flush_chunk()
+
+    except Exception as e:
+        # Chunks anteriores já foram commitados; avisamos onde parou
+        print(f"[stream_ingest_urls] ERRO no chunk {chunk_number + 1}: {e}")
+        yield json.dumps(
+            {
+                "done": False,
+                "error": str(e),
+                "chunks_committed": chunk_number,
+                "failed_chunk_received": len(chunk),
+                **totals,
+            }
+        ) + "\n"
+        return
+
+    yield json.dumps({"done": True, "chunks": chunk_number, **totals}) + "\n"
@@ -0,0 +1,43 @@
+"""
+Áudio pronto para transcrição: MP3 mono 48 kbps.
+
+Usado tanto pelo transcribe_video (extraindo do mp4 guardado) quanto pelo
+modo DOWNLOAD_MODE=audio do download_video, que grava direto esse áudio
+numa única passada, sem guardar o vídeo.
+"""
+
+from pathlib import Path
+from typing import Optional
+
+from app.media.process import MediaRunResult, ProgressCallback, run_ffmpeg
+
+
+TRANSCRIPTION_AUDIO_FORMAT = "mp3"
+
+TRANSCRIPTION_AUDIO_ARGS = [
+    "-vn",              # sem vídeo
+    "-acodec",
+    "libmp3lame",
+    "-b:a",
+    "48k",              # bitrate de 48 kbps (ou 32k se quiser ainda menor)
+    "-ac",
+    "1",                # mono
+]
+
+
+def encode_transcription_audio(
+    source: str,
+    output_path: Path,
+    on_progress: Optional[ProgressCallback] = None,
+) -> MediaRunResult:
+    """
+    source pode ser um arquivo local ou uma URL (o ffmpeg lê direto).
+    """
+    args = [
+        "-y",
+        "-i",
+        source,
+        *TRANSCRIPTION_AUDIO_ARGS,
+        str(output_path),
+    ]
+    return run_ffmpeg(args, on_progress=on_progress)
@@ -0,0 +1,135 @@
+"""
+Divisão de áudio em pedaços para transcrição em paralelo.
+
+Os cortes caem em silêncios (filtro silencedetect do ffmpeg), para não
+partir palavras ao meio. Se não houver silêncio perto do limite de
+tamanho, o corte é forçado no limite e o pedaço seguinte começa um pouco
+antes (overlap), para a palavra cortada aparecer inteira em pelo menos um
+dos lados; o texto repetido é removido na costura (ver
+app/transcription/chunked.py).
+"""
+
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+from app.media.process import run_ffmpeg
+
+
+SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+class ChunkSpan(NamedTuple):
+    start: float
+    end: float
+    # True se o início foi puxado para trás (corte forçado, sem silêncio):
+    # o começo deste pedaço repete o final do anterior
+    overlaps_previous: bool
+
+
+class AudioChunk(NamedTuple):
+    index: int
+    path: Path
+    span: ChunkSpan
+
+
+def detect_silences(
+    audio_path: Path,
+    noise_db: float,
+    min_silence_seconds: float,
+) -> list[tuple[float, float]]:
+    """
+    Intervalos (início, fim) de silêncio, em segundos.
+    """
+    starts: list[float] = []
+    silences: list[tuple[float, float]] = []
+
+    def collect(line: str) -> None:
+        match = SILENCE_START_RE.search(line)
+        if match:
+            starts.append(max(float(match.group(1)), 0.0))
+            return
+        match = SILENCE_END_RE.search(line)
+        if match and starts:
+            silences.append((starts.pop(), float(match.group(1))))
+
+    run_ffmpeg(
+        [
+            "-i",
+            str(audio_path),
+            "-af",
+            f"silencedetect=noise={noise_db}dB:d={min_silence_seconds}",
+            "-f",
+            "null",
+            "-",
+        ],
+        on_stderr_line=collect,
+    )
+    return silences
+
+
+def plan_chunks(
+    duration: float,
+    silences: list[tuple[float, float]],
+    max_chunk_seconds: float,
+    min_chunk_seconds: float,
+    overlap_seconds: float,
+) -> list[ChunkSpan]:
+    """
+    Divide [0, duration] em pedaços de no máximo max_chunk_seconds.
+
+    Cada corte vai no meio do silêncio mais tardio dentro de
+    [início + min_chunk_seconds, início + max_chunk_seconds]; sem silêncio
+    nessa janela, corta no limite com overlap_seconds de sobreposição.
+    """
+    cut_points = sorted((start + end) / 2 for start, end in silences)
+
+    spans: list[ChunkSpan] = []
+    start = 0.0
+    overlaps_previous = False
+
+    while duration - start > max_chunk_seconds:
+        window_start = start + min_chunk_seconds
+        window_end = start + max_chunk_seconds
+        candidates = [point for point in cut_points if window_start <= point <= window_end]
+
+        if candidates:
+            cut = candidates[-1]
+            spans.append(ChunkSpan(start, cut, overlaps_previous))
+            start, overlaps_previous = cut, False
+        else:
+            cut = window_end
+            spans.append(ChunkSpan(start, cut, overlaps_previous))
+            start, overlaps_previous = cut - overlap_seconds, True
+
+    spans.append(ChunkSpan(start, duration, overlaps_previous))
+    return spans
+
+
+def split_audio(audio_path: Path, spans: list[ChunkSpan], work_dir: Path) -> list[AudioChunk]:
+    """
+    Grava cada pedaço em work_dir (cópia do stream, sem re-encode).
+    """
+    work_dir.mkdir(parents=True, exist_ok=True)
+    suffix = audio_path.suffix or ".mp3"
+
+    chunks: list[AudioChunk] = []
+    for index, span in enumerate(spans):
+        chunk_path = work_dir / f"chunk_{index:04d}{suffix}"
+        run_ffmpeg(
+            [
+                "-y",
+                "-ss",
+                f"{span.start:.3f}",
+                "-t",
+                f"{span.end - span.start:.3f}",
+                "-i",
+                str(audio_path),
+                "-c",
+                "copy",
+                str(chunk_path),
+            ]
+        )
+        chunks.append(AudioChunk(index, chunk_path, span))
+    return chunks
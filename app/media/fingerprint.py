@@ -0,0 +1,269 @@
+"""
+Impressão digital perceptual do áudio, para reaproveitar transcrições.
+
+O mesmo VSL aparece em várias URLs (funis A/B, tokens de CDN), às vezes
+com container, codec ou bitrate diferentes, então nem o hash do arquivo
+nem um hash do áudio decodificado servem: um re-encode muda as amostras.
+A impressão segue o esquema de Haitsma & Kalker (sub-band energy
+differences), todo em NumPy:
+
+- decodifica para PCM mono em FINGERPRINT_SAMPLE_RATE
+- quadros de FINGERPRINT_FRAME_SAMPLES a cada FINGERPRINT_HOP_SAMPLES,
+  com janela de Hann; energia em FINGERPRINT_BANDS bandas logarítmicas
+  entre FINGERPRINT_MIN_HZ e FINGERPRINT_MAX_HZ
+- cada quadro vira uma palavra de 32 bits: o sinal da diferença de
+  energia entre bandas vizinhas, comparada com o quadro anterior.
+  Insensível a volume e a mudanças suaves de equalização; um re-encode
+  troca poucos bits (tipicamente < 10%)
+- quadros silenciosos viram 0 (o ruído do encoder decide os bits deles);
+  impressões com poucos quadros não silenciosos não são usadas
+  (AudioPrint.usable)
+
+A comparação é tolerante (compare_fingerprints): taxa de bits diferentes
+(BER) entre as duas sequências, no melhor alinhamento até
+FINGERPRINT_MAX_OFFSET_SECONDS, exigindo que a sobreposição cubra quase
+todo o áudio dos dois lados. Áudios diferentes ficam perto de 0.5.
+
+Para achar candidatos sem comparar com o acervo inteiro, cada impressão
+guarda FINGERPRINT_KEYS chaves (LSH por bottom-k: as palavras de menor
+hash). Palavras inteiras sobrevivem a um re-encode com boa frequência,
+então cópias compartilham várias chaves e áudios diferentes quase
+nenhuma; ver app/transcription/cache.py.
+
+Pega cópias do mesmo áudio, mesmo re-encodadas; não pega edições (cortes
+no meio, trilha trocada).
+"""
+
+import hashlib
+from pathlib import Path
+from typing import NamedTuple, Optional
+from uuid import uuid4
+
+import numpy as np
+
+from app.config import settings
+from app.media.process import run_ffmpeg
+
+
+# Sobe quando o algoritmo mudar: impressões de versões diferentes nunca
+# são comparadas entre si
+FINGERPRINT_VERSION = "p1"
+
+FINGERPRINT_SAMPLE_RATE = 8000
+# ~0.5 s por quadro, um quadro a cada 0.125 s. O passo limita o
+# desalinhamento entre duas cópias a meio passo (~60 ms), o que mantém a
+# BER de um re-encode bem abaixo do limite; 4 bytes por quadro = 32 bytes
+# por segundo de áudio guardados
+FINGERPRINT_FRAME_SAMPLES = 4096
+FINGERPRINT_HOP_SAMPLES = 1000
+# 33 bandas -> 32 diferenças -> uma palavra de 32 bits por quadro
+FINGERPRINT_BANDS = 33
+FINGERPRINT_MIN_HZ = 300.0
+FINGERPRINT_MAX_HZ = 3000.0
+# Quadro com energia abaixo disto (relativa ao percentil 95) é silêncio
+FINGERPRINT_SILENCE_DB = -40.0
+
+# Mínimo de quadros não silenciosos (~5 s de áudio), e fração deles, para
+# a impressão entrar no cache: vazia ou quase toda 0 daria o mesmo digest
+# (e as mesmas chaves) para áudios sem relação nenhuma
+FINGERPRINT_MIN_VOICED_FRAMES = 40
+FINGERPRINT_MIN_VOICED_FRACTION = 0.5
+
+FINGERPRINT_KEYS = 128
+# Deslocamento máximo entre as duas cópias (padding do encoder, intro
+# cortada); acima disso os tempos dos segmentos copiados ficariam errados
+FINGERPRINT_MAX_OFFSET_SECONDS = 2.0
+# Fração mínima de cada áudio coberta pela sobreposição
+FINGERPRINT_MIN_COVERAGE = 0.9
+
+# Quadros processados por vez (limita a memória em áudios longos)
+FRAME_BLOCK = 256
+# Multiplicador de Knuth: espalha as palavras antes do bottom-k
+KEY_HASH_MULTIPLIER = np.uint32(0x9E3779B1)
+
+
+class AudioPrint(NamedTuple):
+    # Uma palavra por quadro (uint32); 0 = quadro silencioso
+    frames: np.ndarray
+    # Chaves LSH (int32, para caber em integer[] no Postgres)
+    keys: list[int]
+
+    @property
+    def digest(self) -> str:
+        """Ex.: "p1:3f5a...". Igualdade exata (mesmo áudio decodificado)."""
+        return f"{FINGERPRINT_VERSION}:{hashlib.sha256(self.frames_bytes()).hexdigest()}"
+
+    @property
+    def usable(self) -> bool:
+        """
+        False para áudio curto demais (menos de um quadro), decode vazio ou
+        quase só silêncio: essas impressões não identificam o áudio.
+        """
+        voiced = int(np.count_nonzero(self.frames))
+        return (
+            voiced >= FINGERPRINT_MIN_VOICED_FRAMES
+            and voiced >= FINGERPRINT_MIN_VOICED_FRACTION * len(self.frames)
+        )
+
+    def frames_bytes(self) -> bytes:
+        return self.frames.astype("<u4").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, keys: Optional[list[int]] = None) -> "AudioPrint":
+        frames = np.frombuffer(data, dtype="<u4").astype(np.uint32)
+        return cls(frames, keys if keys is not None else lsh_keys(frames))
+
+
+class FingerprintMatch(NamedTuple):
+    bit_error_rate: float
+    # Quadros de b a mais no começo (negativo: a começa depois)
+    offset_frames: int
+    overlap_frames: int
+
+    @property
+    def offset_seconds(self) -> float:
+        return self.offset_frames * FINGERPRINT_HOP_SAMPLES / FINGERPRINT_SAMPLE_RATE
+
+
+def band_edges() -> np.ndarray:
+    """
+    Índices dos bins do FFT que delimitam as bandas (escala logarítmica).
+    """
+    hz = np.geomspace(FINGERPRINT_MIN_HZ, FINGERPRINT_MAX_HZ, FINGERPRINT_BANDS + 1)
+    return np.round(hz * FINGERPRINT_FRAME_SAMPLES / FINGERPRINT_SAMPLE_RATE).astype(np.intp)
+
+
+def band_energies(samples: np.ndarray) -> np.ndarray:
+    """
+    Energia de cada banda em cada quadro: float64 (quadros, FINGERPRINT_BANDS).
+    """
+    count = 1 + (len(samples) - FINGERPRINT_FRAME_SAMPLES) // FINGERPRINT_HOP_SAMPLES
+    if count <= 0:
+        return np.empty((0, FINGERPRINT_BANDS))
+
+    edges = band_edges()
+    window = np.hanning(FINGERPRINT_FRAME_SAMPLES).astype(np.float32)
+    energies = np.empty((count, FINGERPRINT_BANDS))
+
+    for start in range(0, count, FRAME_BLOCK):
+        stop = min(start + FRAME_BLOCK, count)
+        frames = np.lib.stride_tricks.sliding_window_view(
+            samples[start * FINGERPRINT_HOP_SAMPLES : (stop - 1) * FINGERPRINT_HOP_SAMPLES + FINGERPRINT_FRAME_SAMPLES],
+            FINGERPRINT_FRAME_SAMPLES,
+        )[::FINGERPRINT_HOP_SAMPLES]
+        power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2
+        # Soma de cada banda: diferença de somas acumuladas nos limites
+        cumulative = np.concatenate([np.zeros((len(power), 1)), np.cumsum(power, axis=1)], axis=1)
+        energies[start:stop] = cumulative[:, edges[1:]] - cumulative[:, edges[:-1]]
+
+    return energies
+
+
+def subfingerprints(energies: np.ndarray) -> np.ndarray:
+    """
+    Bit m do quadro n: (E[n,m] - E[n,m+1]) - (E[n-1,m] - E[n-1,m+1]) > 0.
+    """
+    if len(energies) < 2:
+        return np.empty(0, dtype=np.uint32)
+
+    band_diff = energies[:, :-1] - energies[:, 1:]
+    bits = (band_diff[1:] - band_diff[:-1]) > 0
+    weights = np.uint32(1) << np.arange(bits.shape[1], dtype=np.uint32)
+    words = (bits * weights).sum(axis=1, dtype=np.uint64).astype(np.uint32)
+
+    loudness = energies[1:].sum(axis=1)
+    reference = np.percentile(loudness, 95) or 1.0
+    with np.errstate(divide="ignore"):
+        level_db = 10 * np.log10(loudness / reference)
+    words[level_db < FINGERPRINT_SILENCE_DB] = 0
+    return words
+
+
+def lsh_keys(frames: np.ndarray) -> list[int]:
+    """
+    Bottom-k: as FINGERPRINT_KEYS palavras (não silenciosas) de menor hash.
+    Duas cópias do mesmo áudio compartilham boa parte delas.
+    """
+    words = np.unique(frames[frames != 0])
+    hashes = words * KEY_HASH_MULTIPLIER
+    picked = words[np.argsort(hashes, kind="stable")[:FINGERPRINT_KEYS]]
+    return sorted(picked.view(np.int32).tolist())
+
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    Fração de bits diferentes entre duas sequências do mesmo tamanho.
+    """
+    diff = np.bitwise_xor(a, b).astype("<u4").view(np.uint8)
+    return float(np.unpackbits(diff).sum()) / (32 * len(a))
+
+
+def compare_fingerprints(a: AudioPrint, b: AudioPrint) -> Optional[FingerprintMatch]:
+    """
+    Melhor alinhamento (menor BER) entre as duas impressões, com
+    deslocamento de até FINGERPRINT_MAX_OFFSET_SECONDS. None se, nesse
+    alinhamento, a sobreposição cobrir menos de FINGERPRINT_MIN_COVERAGE de
+    algum dos dois áudios (não são o mesmo VSL, mesmo que um contenha o
+    outro).
+    """
+    fa, fb = a.frames, b.frames
+    if not len(fa) or not len(fb):
+        return None
+
+    max_offset = int(FINGERPRINT_MAX_OFFSET_SECONDS * FINGERPRINT_SAMPLE_RATE / FINGERPRINT_HOP_SAMPLES)
+    best: Optional[FingerprintMatch] = None
+
+    for offset in range(-max_offset, max_offset + 1):
+        # offset > 0: o quadro i de a corresponde ao quadro i + offset de b
+        start_a = max(0, -offset)
+        start_b = max(0, offset)
+        overlap = min(len(fa) - start_a, len(fb) - start_b)
+        if overlap < FINGERPRINT_MIN_COVERAGE * max(len(fa), len(fb)):
+            continue
+
+        ber = bit_error_rate(fa[start_a : start_a + overlap], fb[start_b : start_b + overlap])
+        if best is None or ber < best.bit_error_rate:
+            best = FingerprintMatch(ber, offset, overlap)
+
+    return best
+
+
+def read_pcm(pcm_path: Path) -> np.ndarray:
+    """
+    Amostras s16le (memmap: band_energies lê um bloco de quadros por vez).
+    """
+    size = pcm_path.stat().st_size // 2
+    if not size:
+        return np.empty(0, dtype=np.int16)
+    return np.memmap(pcm_path, dtype="<i2", mode="r", shape=(size,))
+
+
+def audio_fingerprint(audio_path: Path) -> AudioPrint:
+    """
+    Decodifica num arquivo temporário em AUDIO_TEMP_PATH (~16 KB por
+    segundo de áudio), apagado no fim.
+    """
+    pcm_path = Path(settings.audio_temp_path) / f"fp_{uuid4().hex}.pcm"
+    pcm_path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        run_ffmpeg(
+            [
+                "-y",
+                "-i",
+                str(audio_path),
+                "-vn",
+                "-ac",
+                "1",
+                "-ar",
+                str(FINGERPRINT_SAMPLE_RATE),
+                "-f",
+                "s16le",
+                str(pcm_path),
+            ]
+        )
+        frames = subfingerprints(band_energies(read_pcm(pcm_path)))
+    finally:
+        pcm_path.unlink(missing_ok=True)
+
+    return AudioPrint(frames, lsh_keys(frames))
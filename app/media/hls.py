@@ -0,0 +1,590 @@
+"""
+Downloader HLS nativo.
+
+Substitui o `ffmpeg -i playlist.m3u8 -c copy` (que baixa um segmento por
+vez numa única conexão e sem timeout) por:
+- parse do playlist (master e media)
+- download concorrente dos segmentos com um httpx.Client (pool keep-alive),
+  retries e timeout por segmento
+- concatenação dos segmentos em ordem e remux para mp4 com ffmpeg -c copy
+- checkpoint por segmento: com um work_dir fixo (ver partial_work_dir), os
+  segmentos já baixados sobrevivem a uma falha e o retry só busca o resto
+
+Playlists que não suportamos (ex.: segmentos criptografados) levantam
+UnsupportedPlaylistError, e quem chama pode cair de volta no ffmpeg.
+"""
+
+import hashlib
+import json
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import NamedTuple, Optional
+from urllib.parse import urljoin
+
+import httpx
+
+from app.config import settings
+from app.media.audio import encode_transcription_audio
+from app.media.process import MediaRunResult, ProgressCallback, run_ffmpeg
+
+
+class HlsError(Exception):
+    pass
+
+
+class UnsupportedPlaylistError(HlsError):
+    """Playlist válido, mas fora do que o downloader nativo cobre."""
+
+
+class SegmentDownloadError(HlsError):
+    pass
+
+
+# ─────────────────────────────────────────────
+#  Parse de playlists
+# ─────────────────────────────────────────────
+
+ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+class Variant(NamedTuple):
+    uri: str
+    bandwidth: int
+    resolution: Optional[str]
+    codecs: Optional[str]
+    audio_group: Optional[str]
+
+
+class Rendition(NamedTuple):
+    """Entrada EXT-X-MEDIA (ex.: trilha de áudio separada)."""
+    type: str
+    group_id: str
+    uri: Optional[str]
+    name: Optional[str]
+    language: Optional[str]
+    default: bool
+
+
+class MasterPlaylist(NamedTuple):
+    variants: list[Variant]
+    renditions: list[Rendition]
+
+
+class Segment(NamedTuple):
+    uri: str
+    duration: float
+    # (offset, length) quando o playlist usa EXT-X-BYTERANGE
+    byte_range: Optional[tuple[int, int]] = None
+
+
+class MediaPlaylist(NamedTuple):
+    segments: list[Segment]
+    init_segment: Optional[Segment]
+
+    @property
+    def duration(self) -> float:
+        return sum(segment.duration for segment in self.segments)
+
+
+def parse_attributes(value: str) -> dict[str, str]:
+    return {
+        key: raw.strip('"')
+        for key, raw in ATTRIBUTE_RE.findall(value)
+    }
+
+
+def is_master_playlist(text: str) -> bool:
+    return "#EXT-X-STREAM-INF" in text
+
+
+def _parse_byte_range(value: str, next_offset: int) -> tuple[int, int]:
+    length_str, _, offset_str = value.partition("@")
+    length = int(length_str)
+    offset = int(offset_str) if offset_str else next_offset
+    return offset, length
+
+
+def parse_master_playlist(text: str, base_url: str) -> MasterPlaylist:
+    variants: list[Variant] = []
+    renditions: list[Rendition] = []
+    pending_attrs: Optional[dict[str, str]] = None
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            pending_attrs = parse_attributes(line.split(":", 1)[1])
+        elif line.startswith("#EXT-X-MEDIA:"):
+            attrs = parse_attributes(line.split(":", 1)[1])
+            renditions.append(
+                Rendition(
+                    type=attrs.get("TYPE", ""),
+                    group_id=attrs.get("GROUP-ID", ""),
+                    uri=urljoin(base_url, attrs["URI"]) if "URI" in attrs else None,
+                    name=attrs.get("NAME"),
+                    language=attrs.get("LANGUAGE"),
+                    default=attrs.get("DEFAULT", "NO") == "YES",
+                )
+            )
+        elif not line.startswith("#") and pending_attrs is not None:
+            variants.append(
+                Variant(
+                    uri=urljoin(base_url, line),
+                    bandwidth=int(pending_attrs.get("BANDWIDTH", "0") or 0),
+                    resolution=pending_attrs.get("RESOLUTION"),
+                    codecs=pending_attrs.get("CODECS"),
+                    audio_group=pending_attrs.get("AUDIO"),
+                )
+            )
+            pending_attrs = None
+
+    return MasterPlaylist(variants=variants, renditions=renditions)
+
+
+def parse_media_playlist(text: str, base_url: str) -> MediaPlaylist:
+    segments: list[Segment] = []
+    init_segment: Optional[Segment] = None
+    duration: Optional[float] = None
+    byte_range: Optional[tuple[int, int]] = None
+    next_offset = 0
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith("#EXTINF:"):
+            duration = float(line.split(":", 1)[1].split(",", 1)[0] or 0)
+        elif line.startswith("#EXT-X-BYTERANGE:"):
+            byte_range = _parse_byte_range(line.split(":", 1)[1], next_offset)
+        elif line.startswith("#EXT-X-KEY:"):
+            method = parse_attributes(line.split(":", 1)[1]).get("METHOD", "NONE")
+            if method != "NONE":
+                raise UnsupportedPlaylistError(f"Segmentos criptografados ({method})")
+        elif line.startswith("#EXT-X-MAP:"):
+            attrs = parse_attributes(line.split(":", 1)[1])
+            map_range = None
+            if "BYTERANGE" in attrs:
+                map_range = _parse_byte_range(attrs["BYTERANGE"], 0)
+            init_segment = Segment(urljoin(base_url, attrs["URI"]), 0.0, map_range)
+        elif not line.startswith("#"):
+            segments.append(Segment(urljoin(base_url, line), duration or 0.0, byte_range))
+            if byte_range:
+                next_offset = byte_range[0] + byte_range[1]
+            duration = None
+            byte_range = None
+
+    if not segments:
+        raise HlsError("Playlist sem segmentos")
+
+    return MediaPlaylist(segments=segments, init_segment=init_segment)
+
+
+# ─────────────────────────────────────────────
+#  HTTP
+# ─────────────────────────────────────────────
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def build_http_client(concurrency: int, timeout_seconds: float) -> httpx.Client:
+    return httpx.Client(
+        follow_redirects=True,
+        timeout=httpx.Timeout(timeout_seconds, connect=min(timeout_seconds, 10.0)),
+        limits=httpx.Limits(
+            max_connections=concurrency,
+            max_keepalive_connections=concurrency,
+        ),
+    )
+
+
+def fetch_text(client: httpx.Client, url: str) -> str:
+    response = client.get(url)
+    response.raise_for_status()
+    return response.text
+
+
+def fetch_segment(
+    client: httpx.Client,
+    segment: Segment,
+    dest: Path,
+    retries: int,
+) -> int:
+    """
+    Baixa um segmento para dest (via arquivo .part + rename), com retries
+    e backoff exponencial para erros de rede e RETRYABLE_STATUS; outros
+    erros HTTP falham na hora. Retorna o número de bytes gravados.
+
+    Segmentos com EXT-X-BYTERANGE exigem 206 e exatamente `length` bytes:
+    um servidor que ignora o Range responderia 200 com o arquivo inteiro,
+    e o segmento sairia errado sem nenhum erro. Isso levanta
+    UnsupportedPlaylistError (quem chama cai no ffmpeg); corpo curto conta
+    como falha e é tentado de novo.
+    """
+    headers = {}
+    length: Optional[int] = None
+    if segment.byte_range:
+        offset, length = segment.byte_range
+        headers["Range"] = f"bytes={offset}-{offset + length - 1}"
+
+    part = dest.with_suffix(dest.suffix + ".part")
+    last_error: Optional[Exception] = None
+
+    for attempt in range(retries + 1):
+        if attempt:
+            time.sleep(min(2 ** (attempt - 1), 10))
+        try:
+            written = 0
+            with client.stream("GET", segment.uri, headers=headers) as response:
+                if response.status_code in RETRYABLE_STATUS:
+                    last_error = HlsError(f"HTTP {response.status_code}")
+                    continue
+                if response.is_error:
+                    # 403 (token de CDN expirado), 404...: tentar de novo não muda nada
+                    raise SegmentDownloadError(
+                        f"Falha ao baixar segmento {segment.uri}: HTTP {response.status_code}"
+                    )
+                if length is not None and response.status_code != 206:
+                    raise UnsupportedPlaylistError(
+                        f"Servidor ignorou o Range (HTTP {response.status_code}) em {segment.uri}"
+                    )
+
+                with part.open("wb") as f:
+                    for data in response.iter_bytes():
+                        f.write(data)
+                        written += len(data)
+
+            if length is not None and written != length:
+                last_error = HlsError(f"Byte-range incompleto: {written} de {length} bytes")
+                continue
+
+            part.replace(dest)
+            return written
+
+        except httpx.TransportError as e:
+            last_error = e
+
+    part.unlink(missing_ok=True)
+    raise SegmentDownloadError(
+        f"Falha ao baixar segmento {segment.uri} após {retries + 1} tentativas: {last_error}"
+    )
+
+
+# ─────────────────────────────────────────────
+#  Download
+# ─────────────────────────────────────────────
+
+class DownloadStats(NamedTuple):
+    segments: int
+    bytes: int
+    seconds: float
+    playlist_duration: float
+    audio_only: bool
+    # Segmentos reaproveitados de uma tentativa anterior (não rebaixados)
+    resumed_segments: int = 0
+
+
+def _segment_suffix(uri: str) -> str:
+    suffix = Path(uri.split("?", 1)[0]).suffix
+    return suffix if suffix else ".ts"
+
+
+# ─────────────────────────────────────────────
+#  Checkpoint (download retomável)
+# ─────────────────────────────────────────────
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def playlist_fingerprint(tracks: list[tuple[str, MediaPlaylist]]) -> str:
+    """
+    Identifica o conjunto de segmentos de um download. Query strings ficam
+    de fora: tokens de CDN mudam a cada request, os segmentos não.
+    """
+    digest = hashlib.sha256()
+    for name, playlist in tracks:
+        segments = list(playlist.segments)
+        if playlist.init_segment:
+            segments.insert(0, playlist.init_segment)
+        digest.update(f"track:{name}\n".encode())
+        for segment in segments:
+            digest.update(f"{segment.uri.split('?', 1)[0]}|{segment.byte_range}\n".encode())
+    return digest.hexdigest()
+
+
+def prepare_work_dir(work_dir: Path, fingerprint: str) -> bool:
+    """
+    Reaproveita work_dir se o checkpoint é do mesmo playlist; senão começa
+    do zero. Retorna True se há uma tentativa anterior para continuar.
+    """
+    checkpoint = work_dir / CHECKPOINT_FILE
+    try:
+        if json.loads(checkpoint.read_text()).get("fingerprint") == fingerprint:
+            return True
+    except (OSError, ValueError):
+        pass
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint.write_text(json.dumps({"fingerprint": fingerprint}))
+    return False
+
+
+def download_media_playlist(
+    client: httpx.Client,
+    playlist: MediaPlaylist,
+    work_dir: Path,
+    concurrency: int,
+    retries: int,
+) -> tuple[Path, int, int]:
+    """
+    Baixa em paralelo os segmentos que ainda não estão em work_dir e
+    concatena em ordem num único arquivo (init segment primeiro, se houver).
+    Retorna (arquivo, bytes baixados, segmentos reaproveitados).
+
+    Cada segmento só aparece com o nome final depois de completo (.part +
+    rename), então o que existe em work_dir é sempre um checkpoint válido.
+    """
+    track_path = work_dir / f"track{_segment_suffix(playlist.segments[0].uri)}"
+    if track_path.exists():
+        # Tentativa anterior já concatenou esta trilha
+        return track_path, 0, len(playlist.segments)
+
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs: list[tuple[Segment, Path]] = []
+    if playlist.init_segment:
+        jobs.append((playlist.init_segment, work_dir / "init.seg"))
+    for index, segment in enumerate(playlist.segments):
+        jobs.append((segment, work_dir / f"{index:06d}.seg"))
+
+    missing = [(segment, dest) for segment, dest in jobs if not dest.exists()]
+    resumed = sum(
+        1 for segment, dest in jobs
+        if segment is not playlist.init_segment and dest.exists()
+    )
+
+    total_bytes = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(fetch_segment, client, segment, dest, retries)
+            for segment, dest in missing
+        ]
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in not_done:
+            future.cancel()
+        for future in done:
+            # Propaga a primeira falha (se houver)
+            total_bytes += future.result()
+
+    part = track_path.with_suffix(track_path.suffix + ".part")
+    with part.open("wb") as out:
+        for _, dest in jobs:
+            with dest.open("rb") as f:
+                shutil.copyfileobj(f, out, length=1024 * 1024)
+    part.replace(track_path)
+
+    for _, dest in jobs:
+        dest.unlink()
+
+    return track_path, total_bytes, resumed
+
+
+def remux_to_mp4(
+    inputs: list[Path],
+    output_path: Path,
+    on_progress: Optional[ProgressCallback] = None,
+) -> MediaRunResult:
+    args = ["-y"]
+    for path in inputs:
+        args += ["-i", str(path)]
+    if len(inputs) > 1:
+        # Vídeo do primeiro input, áudio do segundo (trilha separada)
+        args += ["-map", "0:v:0?", "-map", "1:a:0"]
+    args += ["-c", "copy", str(output_path)]
+
+    return run_ffmpeg(args, on_progress=on_progress)
+
+
+# Política de escolha de rendition num master playlist:
+# - "archive": maior bandwidth (mesmo comportamento do ffmpeg), para guardar
+#   o vídeo na melhor qualidade
+# - "transcribe": só o necessário para transcrever/categorizar — trilha de
+#   áudio separada se existir, senão a variante de menor bandwidth
+RENDITION_POLICIES = ("archive", "transcribe")
+
+AUDIO_CODEC_PREFIXES = ("mp4a", "ac-3", "ec-3", "opus", "flac", "mp3")
+
+
+def is_audio_only_variant(variant: Variant) -> bool:
+    if variant.resolution or not variant.codecs:
+        return False
+    codecs = [codec.strip().lower() for codec in variant.codecs.split(",")]
+    return all(codec.startswith(AUDIO_CODEC_PREFIXES) for codec in codecs)
+
+
+def audio_renditions(master: MasterPlaylist, group_id: Optional[str] = None) -> list[Rendition]:
+    """
+    Trilhas de áudio com playlist próprio (EXT-X-MEDIA TYPE=AUDIO com URI),
+    DEFAULT=YES primeiro.
+    """
+    renditions = [
+        rendition for rendition in master.renditions
+        if rendition.type == "AUDIO"
+        and rendition.uri
+        and (group_id is None or rendition.group_id == group_id)
+    ]
+    return sorted(renditions, key=lambda rendition: not rendition.default)
+
+
+def select_tracks(master: MasterPlaylist, policy: str) -> list[tuple[str, str]]:
+    """
+    Decide quais media playlists baixar. Retorna [(nome, uri)], com o
+    vídeo (se houver) sempre antes do áudio separado.
+    """
+    if policy not in RENDITION_POLICIES:
+        raise ValueError(f"Política de rendition desconhecida: {policy!r}")
+
+    if policy == "transcribe":
+        # 1) Trilha de áudio separada: baixamos só ela
+        audio = audio_renditions(master)
+        if audio:
+            return [("audio", audio[0].uri)]
+
+        # 2) Variante só de áudio, a mais leve
+        audio_variants = [v for v in master.variants if is_audio_only_variant(v)]
+        if audio_variants:
+            return [("main", min(audio_variants, key=lambda v: v.bandwidth).uri)]
+
+    if not master.variants:
+        raise HlsError("Master playlist sem variantes")
+
+    if policy == "transcribe":
+        variant = min(master.variants, key=lambda v: v.bandwidth)
+    else:
+        variant = max(master.variants, key=lambda v: v.bandwidth)
+
+    tracks = [("main", variant.uri)]
+
+    # Variante que referencia áudio separado: precisamos dele também
+    if variant.audio_group:
+        audio = audio_renditions(master, variant.audio_group)
+        if audio:
+            tracks.append(("audio", audio[0].uri))
+
+    return tracks
+
+
+def resolve_media_playlists(
+    client: httpx.Client, url: str, policy: str
+) -> list[tuple[str, MediaPlaylist]]:
+    """
+    Resolve a URL (master ou media) nas media playlists a baixar, de
+    acordo com a política de rendition (ver select_tracks).
+    """
+    text = fetch_text(client, url)
+
+    if not text.lstrip().startswith("#EXTM3U"):
+        raise UnsupportedPlaylistError("Resposta não é um playlist HLS (#EXTM3U)")
+
+    if not is_master_playlist(text):
+        return [("main", parse_media_playlist(text, url))]
+
+    master = parse_master_playlist(text, url)
+
+    return [
+        (name, parse_media_playlist(fetch_text(client, uri), uri))
+        for name, uri in select_tracks(master, policy)
+    ]
+
+
+def download_hls(
+    url: str,
+    output_path: Path,
+    concurrency: Optional[int] = None,
+    retries: Optional[int] = None,
+    timeout_seconds: Optional[float] = None,
+    client: Optional[httpx.Client] = None,
+    rendition_policy: Optional[str] = None,
+    audio_output: bool = False,
+    work_dir: Optional[Path] = None,
+    on_progress: Optional[ProgressCallback] = None,
+) -> DownloadStats:
+    """
+    Baixa um HLS (master ou media playlist) e grava um mp4 em output_path.
+
+    rendition_policy: "archive" ou "transcribe" (default: HLS_RENDITION_POLICY).
+    Com "transcribe" o mp4 pode conter só áudio.
+
+    audio_output=True: em vez do mp4, grava direto o áudio pronto para
+    transcrição (ver app/media/audio.py).
+
+    work_dir: diretório de trabalho persistente (ex.: partial_work_dir(url_id)).
+    Se o download falhar, os segmentos completos ficam lá e a próxima
+    chamada com o mesmo work_dir só baixa os que faltam; é apagado no
+    sucesso. Sem work_dir, usa um diretório temporário descartável.
+
+    on_progress: repassado ao ffmpeg do remux/encode (ver app/media/process.py).
+
+    `client` pode ser injetado (ex.: apontando para um servidor HTTP local
+    servindo um playlist de fixture).
+    """
+    concurrency = concurrency or settings.hls_segment_concurrency
+    retries = settings.hls_segment_retries if retries is None else retries
+    timeout_seconds = timeout_seconds or settings.hls_segment_timeout_seconds
+    rendition_policy = rendition_policy or settings.hls_rendition_policy
+
+    own_client = client is None
+    client = client or build_http_client(concurrency, timeout_seconds)
+    resumable = work_dir is not None
+    if not resumable:
+        work_dir = Path(tempfile.mkdtemp(prefix="hls_", dir=output_path.parent))
+    started = time.monotonic()
+    succeeded = False
+
+    try:
+        tracks = resolve_media_playlists(client, url, rendition_policy)
+        if resumable:
+            prepare_work_dir(work_dir, playlist_fingerprint(tracks))
+
+        inputs: list[Path] = []
+        total_bytes = 0
+        total_segments = 0
+        resumed_segments = 0
+        for name, playlist in tracks:
+            track_path, track_bytes, track_resumed = download_media_playlist(
+                client, playlist, work_dir / name, concurrency, retries
+            )
+            inputs.append(track_path)
+            total_bytes += track_bytes
+            total_segments += len(playlist.segments)
+            resumed_segments += track_resumed
+
+        if audio_output:
+            # Trilha de áudio separada (se houver) é sempre a última
+            encode_transcription_audio(str(inputs[-1]), output_path, on_progress)
+        else:
+            remux_to_mp4(inputs, output_path, on_progress)
+
+        succeeded = True
+        return DownloadStats(
+            segments=total_segments,
+            bytes=total_bytes,
+            seconds=time.monotonic() - started,
+            playlist_duration=tracks[0][1].duration,
+            audio_only=[name for name, _ in tracks] == ["audio"],
+            resumed_segments=resumed_segments,
+        )
+
+    finally:
+        # Work dir persistente só sai no sucesso: é o checkpoint do retry
+        if succeeded or not resumable:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        if own_client:
+            client.close()
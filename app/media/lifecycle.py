@@ -0,0 +1,312 @@
+"""
+Ciclo de vida do disco: quotas, eviction e reconciliação.
+
+- VIDEO_STORAGE_PATH: quota em bytes. Passando da quota, vídeos cujo
+  transcript já está pronto são removidos, do menos usado recentemente
+  para o mais (LRU por Video.last_accessed_at: download, transcrição e
+  playback pela API), e o Video vai para status 'deleted'. Opcionalmente,
+  vídeos transcritos sem uso há mais de VIDEO_MAX_AGE_DAYS saem de
+  qualquer jeito. Os arquivos só são apagados depois do commit que marcou
+  os Video (purge_storage_keys).
+- AUDIO_TEMP_PATH: quota em bytes; arquivos mais antigos saem primeiro.
+  (O transcribe_video já apaga o próprio mp3 depois de transcrever.)
+- Reconciliação: arquivos no disco sem Video 'stored' apontando para eles
+  (órfãos) são apagados; Video 'stored' cujo arquivo sumiu vira 'deleted'.
+
+Arquivos mais novos que STORAGE_ORPHAN_GRACE_SECONDS nunca são tocados:
+podem ser de um download que ainda não commitou o Video.
+
+Downloads interrompidos em partial/<url_id> são checkpoints para o retry:
+só saem inteiros, quando nada no diretório muda há mais de
+DOWNLOAD_PARTIAL_TTL_SECONDS.
+"""
+
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models_transcripts import Transcript
+from app.db.models_videos import Video
+from app.db.task_session import db_session
+from app.media.storage import (
+    PARTIAL_DIR_NAME,
+    count_references,
+    is_content_key,
+    lock_storage_key,
+    release_storage_key,
+    resolve_path,
+    storage_root,
+)
+
+
+def iter_files(root: Path) -> Iterator[os.DirEntry]:
+    if not root.exists():
+        return
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def directory_usage(root: Path) -> int:
+    return sum(entry.stat().st_size for entry in iter_files(root))
+
+
+def key_for_path(path: Path) -> str:
+    """
+    Inverso de resolve_path: caminhos dentro do storage content-addressed
+    viram chave relativa; o resto (legado) fica como caminho absoluto.
+    """
+    root = storage_root()
+    try:
+        relative = path.relative_to(root).as_posix()
+    except ValueError:
+        return str(path)
+    if relative.startswith("cas/"):
+        return relative
+    return str(path)
+
+
+# ─────────────────────────────────────────────
+#  Eviction de vídeos
+# ─────────────────────────────────────────────
+
+def evictable_storage_keys(db: Session, limit: int = 500) -> list[tuple[str, datetime]]:
+    """
+    storage_keys em que TODOS os Video 'stored' já têm transcript pronto,
+    do uso mais antigo para o mais recente (vídeos anteriores a
+    last_accessed_at contam pelo updated_at).
+    """
+    ready = (
+        db.query(Transcript.video_id)
+        .filter(Transcript.status == "ready")
+        .distinct()
+        .subquery()
+    )
+    last_used = func.max(func.coalesce(Video.last_accessed_at, Video.updated_at)).label("last_used")
+
+    return (
+        db.query(Video.storage_key, last_used)
+        .outerjoin(ready, ready.c.video_id == Video.id)
+        .filter(Video.status == "stored")
+        .group_by(Video.storage_key)
+        .having(func.bool_and(ready.c.video_id.isnot(None)))
+        .order_by("last_used")
+        .limit(limit)
+        .all()
+    )
+
+
+def evict_storage_key(db: Session, storage_key: str) -> int:
+    """
+    Marca como 'deleted' todos os Video que apontam para storage_key.
+    Retorna o tamanho do arquivo, que só é apagado depois do commit
+    (purge_storage_keys).
+    """
+    path = resolve_path(storage_key)
+    size = path.stat().st_size if path.exists() else 0
+
+    db.query(Video).filter(
+        and_(Video.storage_key == storage_key, Video.status == "stored")
+    ).update(
+        {"status": "deleted", "updated_at": datetime.utcnow()},
+        synchronize_session=False,
+    )
+    return size
+
+
+def purge_storage_keys(storage_keys: list[str]) -> int:
+    """
+    Apaga os arquivos sem referência, um storage_key por transação (cada
+    uma segura o lock do storage_key só durante a recontagem e o unlink).
+    Chamado depois do commit da eviction. Retorna os bytes liberados.
+    """
+    freed = 0
+    for storage_key in storage_keys:
+        path = resolve_path(storage_key)
+        size = path.stat().st_size if path.exists() else 0
+        with db_session() as db:
+            if release_storage_key(db, storage_key):
+                freed += size
+    return freed
+
+
+def enforce_video_quota(db: Session) -> dict:
+    """
+    Marca os Video a remover na sessão recebida. Os storage_keys vão em
+    "evicted_storage_keys": depois do commit, passe-os para
+    purge_storage_keys.
+    """
+    quota = settings.video_storage_quota_bytes
+    max_age_days = settings.video_max_age_days
+    root = storage_root()
+
+    usage = directory_usage(root)
+    evicted: list[str] = []
+    age_cutoff = (
+        datetime.utcnow() - timedelta(days=max_age_days) if max_age_days > 0 else None
+    )
+
+    for storage_key, last_used in evictable_storage_keys(db):
+        over_quota = quota > 0 and usage > quota
+        too_old = age_cutoff is not None and last_used < age_cutoff
+        if not over_quota and not too_old:
+            # Em ordem de uso: daqui pra frente ninguém está acima da quota
+            # nem é velho o bastante
+            break
+
+        usage -= evict_storage_key(db, storage_key)
+        evicted.append(storage_key)
+
+    return {
+        "usage_bytes": usage,
+        "quota_bytes": quota,
+        "evicted_keys": len(evicted),
+        "evicted_storage_keys": evicted,
+    }
+
+
+# ─────────────────────────────────────────────
+#  Áudio temporário
+# ─────────────────────────────────────────────
+
+def enforce_audio_temp_quota() -> dict:
+    quota = settings.audio_temp_quota_bytes
+    grace = settings.storage_orphan_grace_seconds
+    root = Path(settings.audio_temp_path)
+
+    files = sorted(
+        ((entry.stat().st_mtime, entry.stat().st_size, Path(entry.path)) for entry in iter_files(root)),
+    )
+    usage = sum(size for _, size, _ in files)
+    removed = 0
+    now = time.time()
+
+    for mtime, size, path in files:
+        if quota <= 0 or usage <= quota:
+            break
+        if now - mtime < grace:
+            # Pode estar sendo usado por uma transcrição em andamento
+            continue
+        path.unlink(missing_ok=True)
+        usage -= size
+        removed += 1
+
+    return {"usage_bytes": usage, "quota_bytes": quota, "removed_files": removed}
+
+
+def cleanup_temp_audio(audio_file: Path) -> None:
+    """
+    Chamado pelo transcribe_video depois de transcrever. Só apaga arquivos
+    que estão de fato no AUDIO_TEMP_PATH (nunca o mp3 guardado no storage
+    pelo modo DOWNLOAD_MODE=audio).
+    """
+    try:
+        audio_file.resolve().relative_to(Path(settings.audio_temp_path).resolve())
+    except ValueError:
+        return
+    audio_file.unlink(missing_ok=True)
+
+
+# ─────────────────────────────────────────────
+#  Reconciliação disco x banco
+# ─────────────────────────────────────────────
+
+def cleanup_stale_partials(now: float) -> tuple[int, int]:
+    """
+    Apaga work dirs de downloads retomáveis sem atividade há mais de
+    DOWNLOAD_PARTIAL_TTL_SECONDS. Retorna (diretórios, bytes).
+    """
+    ttl = settings.download_partial_ttl_seconds
+    partial_root = storage_root() / PARTIAL_DIR_NAME
+    if not partial_root.exists():
+        return 0, 0
+
+    removed = 0
+    freed = 0
+    for work_dir in partial_root.iterdir():
+        if not work_dir.is_dir():
+            continue
+        stats = [entry.stat() for entry in iter_files(work_dir)]
+        last_activity = max((st.st_mtime for st in stats), default=work_dir.stat().st_mtime)
+        if now - last_activity < ttl:
+            continue
+
+        shutil.rmtree(work_dir, ignore_errors=True)
+        removed += 1
+        freed += sum(st.st_size for st in stats)
+
+    return removed, freed
+
+
+def reconcile_storage(db: Session) -> dict:
+    grace = settings.storage_orphan_grace_seconds
+    now = time.time()
+    partial_root = storage_root() / PARTIAL_DIR_NAME
+
+    referenced = {
+        key for (key,) in db.query(Video.storage_key).filter(Video.status == "stored").distinct()
+    }
+
+    orphans_removed = 0
+    orphan_bytes = 0
+    seen_keys: set[str] = set()
+
+    for entry in iter_files(storage_root()):
+        path = Path(entry.path)
+        if partial_root in path.parents:
+            # Checkpoints de download: tratados em cleanup_stale_partials
+            continue
+        stat = entry.stat()
+        key = key_for_path(path)
+        seen_keys.add(key)
+
+        if key in referenced or now - stat.st_mtime < grace:
+            continue
+
+        # Confirma com o lock do storage_key: um download pode ter
+        # deduplicado nele depois da leitura de `referenced`
+        if is_content_key(key):
+            lock_storage_key(db, key)
+            if count_references(db, key) > 0:
+                continue
+
+        # Sem Video 'stored' apontando: arquivo órfão (inclui sobras de
+        # downloads interrompidos em tmp/)
+        path.unlink(missing_ok=True)
+        orphans_removed += 1
+        orphan_bytes += stat.st_size
+
+    partials_removed, partial_bytes = cleanup_stale_partials(now)
+
+    # Video 'stored' apontando para arquivo que não existe mais
+    missing = [key for key in referenced if key not in seen_keys and not resolve_path(key).exists()]
+    marked_missing = 0
+    if missing:
+        marked_missing = (
+            db.query(Video)
+            .filter(Video.storage_key.in_(missing), Video.status == "stored")
+            .update(
+                {"status": "deleted", "updated_at": datetime.utcnow()},
+                synchronize_session=False,
+            )
+        )
+
+    return {
+        "orphans_removed": orphans_removed,
+        "orphan_bytes": orphan_bytes,
+        "videos_marked_deleted": marked_missing,
+        "partials_removed": partials_removed,
+        "partial_bytes": partial_bytes,
+    }
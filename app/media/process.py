@@ -0,0 +1,296 @@
+"""
+Execução de ffmpeg/ffprobe com progresso, timeouts e telemetria.
+
+Substitui os `subprocess.run(..., capture_output=True)` sem timeout: um
+ffmpeg travado (upstream que parou de mandar bytes, por exemplo) segurava
+o slot do worker para sempre.
+
+run_ffmpeg:
+- roda o ffmpeg com `-progress pipe:1` e lê out_time / total_size / speed
+  enquanto ele trabalha; a cada MEDIA_PROGRESS_INTERVAL_SECONDS chama
+  on_progress (ver app/media/telemetry.py)
+- timeout de relógio (MEDIA_PROCESS_TIMEOUT_SECONDS) e de estagnação
+  (MEDIA_PROCESS_STALL_SECONDS sem out_time/total_size avançar)
+- o processo roda num process group próprio; no timeout o grupo inteiro
+  leva SIGKILL (o ffmpeg pode ter filhos, ex.: protocolos externos)
+- devolve MediaRunResult com bytes/s e fator de tempo real
+
+Falhas levantam subprocess.CalledProcessError (como o check=True de
+antes) ou MediaProcessTimeout.
+"""
+
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, NamedTuple, Optional
+
+from app.config import settings
+
+
+STDERR_TAIL_LINES = 50
+
+
+class MediaProcessTimeout(subprocess.TimeoutExpired):
+    def __init__(self, cmd: list[str], timeout: float, reason: str, stderr: Optional[str] = None):
+        super().__init__(cmd, timeout, stderr=stderr)
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"{self.cmd[0]} abortado ({self.reason}) após {self.timeout:.0f}s"
+
+
+class ProgressSnapshot(NamedTuple):
+    # Posição do que já foi escrito na saída, em segundos de mídia
+    out_time_seconds: float
+    # Bytes escritos na saída até agora
+    total_size: int
+    # Velocidade reportada pelo ffmpeg (1.0 = tempo real); None se N/A
+    speed: Optional[float]
+    elapsed_seconds: float
+
+
+class MediaRunResult(NamedTuple):
+    elapsed_seconds: float
+    out_time_seconds: float
+    total_size: int
+
+    @property
+    def bytes_per_second(self) -> Optional[float]:
+        if self.elapsed_seconds <= 0:
+            return None
+        return self.total_size / self.elapsed_seconds
+
+    @property
+    def realtime_factor(self) -> Optional[float]:
+        """Segundos de mídia processados por segundo de relógio."""
+        if self.elapsed_seconds <= 0 or self.out_time_seconds <= 0:
+            return None
+        return self.out_time_seconds / self.elapsed_seconds
+
+    def as_metrics(self) -> dict:
+        return throughput_metrics(self.total_size, self.elapsed_seconds, self.out_time_seconds)
+
+
+ProgressCallback = Callable[[ProgressSnapshot], None]
+
+
+def throughput_metrics(total_bytes: int, seconds: float, media_seconds: float) -> dict:
+    """
+    Formato único das métricas gravadas em Job.metrics, seja qual for a
+    origem (ffmpeg, downloader HLS nativo...).
+    """
+    return {
+        "bytes": total_bytes,
+        "seconds": round(seconds, 3),
+        "media_seconds": round(media_seconds, 3),
+        "bytes_per_second": round(total_bytes / seconds, 1) if seconds > 0 else None,
+        "realtime_factor": round(media_seconds / seconds, 2) if seconds > 0 and media_seconds > 0 else None,
+    }
+
+
+def kill_process_group(proc: subprocess.Popen) -> None:
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    proc.wait()
+
+
+def _parse_speed(value: str) -> Optional[float]:
+    # "1.53x" ou "N/A"
+    try:
+        return float(value.rstrip("x"))
+    except ValueError:
+        return None
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    # Campos ainda desconhecidos vêm como "N/A"
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _pump(stream, sink, on_eof: Optional[Callable[[], None]] = None) -> None:
+    for line in stream:
+        sink(line)
+    stream.close()
+    if on_eof is not None:
+        on_eof()
+
+
+def run_ffmpeg(
+    args: list[str],
+    on_progress: Optional[ProgressCallback] = None,
+    timeout: Optional[float] = None,
+    stall_timeout: Optional[float] = None,
+    progress_interval: Optional[float] = None,
+    on_stderr_line: Optional[Callable[[str], None]] = None,
+) -> MediaRunResult:
+    """
+    Roda `ffmpeg <args>` (sem o "ffmpeg" inicial) com progresso e timeouts.
+
+    on_stderr_line recebe cada linha do stderr (ex.: saída de filtros de
+    análise como silencedetect). Roda na thread que lê o pipe.
+    """
+    timeout = timeout or settings.media_process_timeout_seconds
+    stall_timeout = stall_timeout or settings.media_process_stall_seconds
+    progress_interval = progress_interval or settings.media_progress_interval_seconds
+
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-progress", "pipe:1", *args]
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        # Metadados da origem ecoados no stderr podem não ser UTF-8 (títulos
+        # em Latin-1): um erro de decode mataria a thread que drena o pipe
+        encoding="utf-8",
+        errors="replace",
+        start_new_session=True,
+    )
+
+    # stdout (progresso) vai para uma fila, para o loop principal poder
+    # checar os timeouts mesmo quando o ffmpeg não escreve nada;
+    # stderr é drenado para não travar o pipe, guardando só o final
+    lines: "queue.Queue[Optional[str]]" = queue.Queue()
+    stderr_tail: deque = deque(maxlen=STDERR_TAIL_LINES)
+
+    def stderr_sink(line: str) -> None:
+        stderr_tail.append(line)
+        if on_stderr_line is not None:
+            on_stderr_line(line)
+    readers = [
+        threading.Thread(
+            target=_pump, args=(proc.stdout, lines.put, lambda: lines.put(None)), daemon=True
+        ),
+        threading.Thread(target=_pump, args=(proc.stderr, stderr_sink), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    started = time.monotonic()
+    last_advance = started
+    last_report = started
+    block: dict[str, str] = {}
+    out_time = 0.0
+    total_size = 0
+
+    def abort(reason: str, limit: float) -> None:
+        kill_process_group(proc)
+        raise MediaProcessTimeout(cmd, limit, reason, stderr="".join(stderr_tail))
+
+    while True:
+        try:
+            line = lines.get(timeout=1.0)
+        except queue.Empty:
+            line = ""
+
+        now = time.monotonic()
+        if line is None:
+            break
+
+        key, sep, value = line.strip().partition("=")
+        if sep:
+            block[key] = value
+
+        if key == "progress":
+            # Fim de um bloco de progresso ("continue" ou "end")
+            out_time_us = _parse_int(block.get("out_time_us"))
+            new_out_time = out_time_us / 1_000_000 if out_time_us is not None else out_time
+            new_size = _parse_int(block.get("total_size"))
+            new_size = new_size if new_size is not None else total_size
+            if new_out_time > out_time or new_size > total_size:
+                last_advance = now
+                out_time = max(out_time, new_out_time)
+                total_size = max(total_size, new_size)
+
+            if on_progress is not None and (value == "end" or now - last_report >= progress_interval):
+                last_report = now
+                snapshot = ProgressSnapshot(
+                    out_time_seconds=out_time,
+                    total_size=total_size,
+                    speed=_parse_speed(block.get("speed", "N/A")),
+                    elapsed_seconds=now - started,
+                )
+                try:
+                    on_progress(snapshot)
+                except Exception as e:
+                    # Telemetria nunca derruba o processamento
+                    print(f"[run_ffmpeg] aviso: falha ao reportar progresso: {e}")
+            block = {}
+
+        if now - started > timeout:
+            abort("timeout", timeout)
+        if now - last_advance > stall_timeout:
+            abort("sem progresso", stall_timeout)
+
+    try:
+        returncode = proc.wait(timeout=stall_timeout)
+    except subprocess.TimeoutExpired:
+        abort("não terminou depois de fechar a saída", stall_timeout)
+    for reader in readers:
+        reader.join(timeout=1.0)
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, stderr="".join(stderr_tail))
+
+    return MediaRunResult(
+        elapsed_seconds=time.monotonic() - started,
+        out_time_seconds=out_time,
+        total_size=total_size,
+    )
+
+
+def run_command(cmd: list[str], timeout: Optional[float] = None) -> str:
+    """
+    Comando curto sem progresso (ex.: ffprobe): só timeout de relógio, com
+    kill do process group. Retorna o stdout.
+    """
+    timeout = timeout or settings.media_process_stall_seconds
+
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        # Metadados da origem ecoados no stderr podem não ser UTF-8 (títulos
+        # em Latin-1): um erro de decode mataria a thread que drena o pipe
+        encoding="utf-8",
+        errors="replace",
+        start_new_session=True,
+    )
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc)
+        raise MediaProcessTimeout(cmd, timeout, "timeout")
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=stdout, stderr=stderr)
+    return stdout
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """
+    Duração em segundos via ffprobe (None se o container não informar).
+    """
+    stdout = run_command(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            path,
+        ]
+    )
+    duration_str = stdout.strip()
+    if not duration_str or duration_str == "N/A":
+        return None
+    return float(duration_str)
@@ -0,0 +1,167 @@
+"""
+Storage de vídeos endereçado por conteúdo (content-addressed).
+
+Cada arquivo é guardado pelo SHA-256 do seu conteúdo, em subdiretórios
+sharded para não ter dezenas de milhares de entradas num diretório só:
+
+    {VIDEO_STORAGE_PATH}/cas/ab/cd/abcd1234....mp4
+
+O storage_key gravado em Video é o caminho relativo ("cas/ab/cd/...").
+O mesmo VSL baixado por duas URLs diferentes gera o mesmo hash, então o
+segundo download vira só um insert de metadados apontando para o arquivo
+que já existe.
+
+Contagem de referências: quantos Video com status 'stored' apontam para o
+mesmo storage_key. O arquivo só é apagado quando a última referência sai
+(ver release_storage_key).
+
+Dedup e remoção disputam o mesmo arquivo: um download pode achar o
+arquivo pronto e contar com ele enquanto a eviction conta zero referências
+(o Video do download ainda não foi commitado) e o apaga. Os dois caminhos
+pegam um advisory lock de transação por storage_key (lock_storage_key):
+o download segura o lock do store_file até commitar o seu Video, e a
+remoção só conta referências e apaga com o lock na mão.
+
+storage_keys antigos (caminho absoluto com uuid) continuam funcionando.
+"""
+
+import hashlib
+import os
+from datetime import datetime
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models_videos import Video
+
+
+CAS_PREFIX = "cas"
+TMP_DIR_NAME = "tmp"
+PARTIAL_DIR_NAME = "partial"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def storage_root() -> Path:
+    return Path(settings.video_storage_path)
+
+
+def new_temp_path(extension: str) -> Path:
+    """
+    Caminho temporário no mesmo filesystem do storage, para que a
+    promoção para o caminho final seja um rename atômico.
+    """
+    tmp_dir = storage_root() / TMP_DIR_NAME
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    return tmp_dir / f"{uuid4().hex}.{extension}"
+
+
+def partial_work_dir(url_id: int) -> Path:
+    """
+    Diretório de trabalho de um download HLS, fixo por url_id: os segmentos
+    já baixados sobrevivem a uma falha e o retry só busca o que falta.
+    """
+    return storage_root() / PARTIAL_DIR_NAME / str(url_id)
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_key(digest: str, extension: str) -> str:
+    return f"{CAS_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+
+def is_content_key(storage_key: str) -> bool:
+    return storage_key.startswith(CAS_PREFIX + "/")
+
+
+def resolve_path(storage_key: str) -> Path:
+    """
+    storage_key -> caminho no disco. Aceita chaves novas (relativas ao
+    VIDEO_STORAGE_PATH) e antigas (caminho absoluto).
+    """
+    if is_content_key(storage_key):
+        return storage_root() / storage_key
+    return Path(storage_key)
+
+
+def lock_storage_key(db: Session, storage_key: str) -> None:
+    """
+    Advisory lock do Postgres para storage_key, solto no fim da transação
+    de db (commit ou rollback).
+    """
+    db.execute(select(func.pg_advisory_xact_lock(func.hashtext(storage_key))))
+
+
+def store_file(db: Session, tmp_path: Path, extension: str) -> tuple[str, bool]:
+    """
+    Move tmp_path para o seu endereço de conteúdo.
+
+    Retorna (storage_key, deduplicated). Se já existia um arquivo com o
+    mesmo conteúdo, o temporário é descartado e deduplicated=True.
+
+    Pega o lock do storage_key na transação de db: o chamador deve gravar o
+    Video que aponta para a chave nessa mesma transação, para que nenhuma
+    remoção apague o arquivo entre a checagem e o commit.
+    """
+    storage_key = content_key(hash_file(tmp_path), extension)
+    final_path = resolve_path(storage_key)
+
+    lock_storage_key(db, storage_key)
+
+    if final_path.exists():
+        tmp_path.unlink()
+        return storage_key, True
+
+    final_path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, final_path)
+    return storage_key, False
+
+
+def count_references(db: Session, storage_key: str) -> int:
+    return (
+        db.query(func.count(Video.id))
+        .filter(Video.storage_key == storage_key, Video.status == "stored")
+        .scalar()
+    ) or 0
+
+
+def touch_storage_key(db: Session, storage_key: str) -> None:
+    """
+    Registra um uso do arquivo (Video.last_accessed_at), para o LRU da
+    eviction.
+    """
+    db.execute(
+        update(Video)
+        .where(Video.storage_key == storage_key, Video.status == "stored")
+        .values(last_accessed_at=datetime.utcnow())
+    )
+
+
+def release_storage_key(db: Session, storage_key: str) -> bool:
+    """
+    Chamado depois que o commit que tirou as referências a storage_key
+    (ex.: Video em status 'deleted') já aconteceu, numa transação nova:
+    um rollback depois do unlink deixaria Video 'stored' sem arquivo.
+
+    Apaga o arquivo se não sobrou nenhuma referência, contando com o lock
+    do storage_key (um download que deduplicou nele e ainda não commitou
+    segura o lock até commitar). Retorna True se o arquivo foi apagado.
+    """
+    db.flush()
+    lock_storage_key(db, storage_key)
+    if count_references(db, storage_key) > 0:
+        return False
+
+    path = resolve_path(storage_key)
+    if path.exists():
+        path.unlink()
+        return True
+    return False
@@ -0,0 +1,92 @@
+"""
+Progresso ao vivo dos estágios de mídia.
+
+Enquanto um ffmpeg roda, o Job ainda não foi commitado (a task inteira é
+uma transação só), então o progresso vai para o Redis do broker:
+
+    vsl:media:progress:<stage>:<resource_id> -> JSON do último snapshot
+
+com TTL curto, para sumir sozinho se o worker morrer. O resultado final
+(bytes/s, fator de tempo real) é gravado em Job.metrics junto com o Job.
+
+GET /admin/media/progress lista o que está rodando agora.
+"""
+
+import json
+import time
+from typing import Optional
+
+from app.config import settings
+from app.media.process import ProgressSnapshot
+
+
+PROGRESS_KEY_PREFIX = "vsl:media:progress"
+
+_redis = None
+
+
+def _get_redis():
+    global _redis
+    if _redis is None and settings.redis_url:
+        import redis
+
+        _redis = redis.Redis.from_url(settings.redis_url, socket_timeout=0.5)
+    return _redis
+
+
+class ProgressReporter:
+    """
+    Callback para run_ffmpeg(on_progress=...). Falhas do Redis são só
+    logadas (run_ffmpeg já ignora exceções do callback).
+    """
+
+    def __init__(self, stage: str, resource_id: int, media_duration: Optional[float] = None) -> None:
+        self.stage = stage
+        self.resource_id = resource_id
+        # Duração total esperada, quando conhecida, para calcular percentual
+        self.media_duration = media_duration
+        self.key = f"{PROGRESS_KEY_PREFIX}:{stage}:{resource_id}"
+
+    def __call__(self, snapshot: ProgressSnapshot) -> None:
+        client = _get_redis()
+        if client is None:
+            return
+
+        elapsed = snapshot.elapsed_seconds
+        payload = {
+            "stage": self.stage,
+            "resource_id": self.resource_id,
+            "out_time_seconds": round(snapshot.out_time_seconds, 3),
+            "total_size": snapshot.total_size,
+            "speed": snapshot.speed,
+            "elapsed_seconds": round(elapsed, 3),
+            "bytes_per_second": round(snapshot.total_size / elapsed, 1) if elapsed > 0 else None,
+            "percent": (
+                round(100 * snapshot.out_time_seconds / self.media_duration, 1)
+                if self.media_duration
+                else None
+            ),
+            "updated_at": time.time(),
+        }
+        ttl = max(int(settings.media_progress_interval_seconds * 6), 30)
+        client.setex(self.key, ttl, json.dumps(payload))
+
+    def clear(self) -> None:
+        try:
+            client = _get_redis()
+            if client is not None:
+                client.delete(self.key)
+        except Exception as e:
+            print(f"[media_progress] aviso: falha ao limpar progresso {self.key}: {e}")
+
+
+def live_progress() -> list[dict]:
+    client = _get_redis()
+    if client is None:
+        return []
+
+    keys = list(client.scan_iter(match=f"{PROGRESS_KEY_PREFIX}:*", count=500))
+    if not keys:
+        return []
+
+    return [json.loads(raw) for raw in client.mget(keys) if raw is not None]
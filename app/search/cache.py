@@ -0,0 +1,239 @@
+"""
+Cache de resultados da busca (/api/search).
+
+Duas camadas:
+- local: LRU com TTL, em memória, por processo uvicorn (tamanho limitado)
+- redis (opcional): compartilhada entre todos os workers uvicorn
+
+Invalidação por "geração": um contador no Redis que entra em todas as
+chaves. Quando transcribe_video grava um Transcript novo, chama
+invalidate_search_cache(), o contador sobe e todas as entradas antigas
+deixam de ser encontradas (expiram sozinhas pelo TTL). O contador é o
+mesmo Redis do broker do Celery, então API e workers enxergam o mesmo valor.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.config import settings
+
+
+GENERATION_KEY = "vsl:search:generation"
+ENTRY_KEY_PREFIX = "vsl:search:entry"
+
+
+def normalize_query(query: str) -> str:
+    """
+    "  Promoção   RELÂMPAGO " -> "promoção relâmpago"
+    """
+    return " ".join(query.lower().split())
+
+
+def build_cache_key(query: str, limit: int, cursor: Optional[str]) -> str:
+    raw = f"{normalize_query(query)}|{limit}|{cursor or ''}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class LRUTTLCache:
+    """
+    LRU simples com TTL por entrada. Thread-safe: os endpoints síncronos do
+    FastAPI rodam num threadpool.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SearchCache:
+    def __init__(
+        self,
+        enabled: bool,
+        max_entries: int,
+        ttl_seconds: int,
+        use_redis_tier: bool,
+        redis_url: str,
+        generation_check_seconds: float = 1.0,
+    ) -> None:
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.use_redis_tier = use_redis_tier
+        self.redis_url = redis_url
+        self.generation_check_seconds = generation_check_seconds
+
+        self.local = LRUTTLCache(max_entries, ttl_seconds)
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+        self._redis = None
+        self._generation = 0
+        self._generation_checked_at = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "SearchCache":
+        return cls(
+            enabled=settings.search_cache_enabled,
+            max_entries=settings.search_cache_max_entries,
+            ttl_seconds=settings.search_cache_ttl_seconds,
+            use_redis_tier=settings.search_cache_redis,
+            redis_url=settings.redis_url,
+        )
+
+    # ─────────────────────────────────────────────
+    #  Redis (geração + camada compartilhada)
+    # ─────────────────────────────────────────────
+
+    def _get_redis(self):
+        if self._redis is None and self.redis_url:
+            import redis
+
+            self._redis = redis.Redis.from_url(self.redis_url, socket_timeout=0.5)
+        return self._redis
+
+    def _current_generation(self) -> int:
+        """
+        Lê o contador de geração no Redis, no máximo uma vez a cada
+        generation_check_seconds. Se o Redis estiver fora, mantém a última
+        geração conhecida (o TTL continua limitando a idade das entradas).
+        """
+        now = time.monotonic()
+        if now - self._generation_checked_at < self.generation_check_seconds:
+            return self._generation
+
+        self._generation_checked_at = now
+        try:
+            client = self._get_redis()
+            if client is not None:
+                value = client.get(GENERATION_KEY)
+                self._generation = int(value) if value else 0
+        except Exception as e:
+            print(f"[search_cache] aviso: falha ao ler geração no Redis: {e}")
+
+        return self._generation
+
+    # ─────────────────────────────────────────────
+    #  API pública
+    # ─────────────────────────────────────────────
+
+    def get(self, query: str, limit: int, cursor: Optional[str]) -> Optional[dict]:
+        if not self.enabled:
+            return None
+
+        key = f"{self._current_generation()}:{build_cache_key(query, limit, cursor)}"
+
+        value = self.local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+
+        if self.use_redis_tier:
+            try:
+                raw = self._get_redis().get(f"{ENTRY_KEY_PREFIX}:{key}")
+                if raw:
+                    value = json.loads(raw)
+                    self.local.set(key, value)
+                    self.redis_hits += 1
+                    return value
+            except Exception as e:
+                print(f"[search_cache] aviso: falha ao ler do Redis: {e}")
+
+        self.misses += 1
+        return None
+
+    def set(self, query: str, limit: int, cursor: Optional[str], value: dict) -> None:
+        if not self.enabled:
+            return
+
+        key = f"{self._current_generation()}:{build_cache_key(query, limit, cursor)}"
+        self.local.set(key, value)
+
+        if self.use_redis_tier:
+            try:
+                self._get_redis().setex(
+                    f"{ENTRY_KEY_PREFIX}:{key}",
+                    self.ttl_seconds,
+                    json.dumps(value, default=str),
+                )
+            except Exception as e:
+                print(f"[search_cache] aviso: falha ao gravar no Redis: {e}")
+
+    def invalidate(self) -> None:
+        """
+        Sobe a geração no Redis (invalida todos os processos) e limpa a
+        camada local deste processo.
+        """
+        self.local.clear()
+        try:
+            client = self._get_redis()
+            if client is not None:
+                self._generation = int(client.incr(GENERATION_KEY))
+                self._generation_checked_at = time.monotonic()
+        except Exception as e:
+            print(f"[search_cache] aviso: falha ao invalidar geração no Redis: {e}")
+
+    def stats(self) -> dict:
+        hits = self.local_hits + self.redis_hits
+        total = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "redis_tier": self.use_redis_tier,
+            "generation": self._generation,
+            "hits": hits,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (hits / total) if total else 0.0,
+            "local_entries": len(self.local),
+            "local_max_entries": self.local.max_entries,
+            "local_evictions": self.local.evictions,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+search_cache = SearchCache.from_settings()
+
+
+def invalidate_search_cache() -> None:
+    """
+    Chamado pelos workers depois de gravar (commit) um Transcript novo.
+    """
+    search_cache.invalidate()
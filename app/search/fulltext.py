@@ -0,0 +1,158 @@
+"""
+Helpers de busca full-text sobre transcripts.search_vector.
+
+O vetor é mantido por trigger no Postgres (ver app/db/ddl.py) usando a
+configuração 'pt_unaccent': stemming em português + remoção de acentos.
+A mesma configuração é aplicada na query do usuário, então "promoção",
+"promocao" e "promoções" casam entre si.
+"""
+
+import base64
+import json
+import re
+from functools import reduce
+from typing import Optional
+
+from sqlalchemy import Float, and_, cast, func, literal_column, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db.models_transcripts import Transcript
+
+
+TS_CONFIG = literal_column("'public.pt_unaccent'::regconfig")
+
+# Normalização 32 do ts_rank_cd: rank / (rank + 1), sempre entre 0 e 1
+RANK_NORMALIZATION = 32
+
+# Marcadores usados pelo ts_headline em volta de cada termo encontrado.
+# São caracteres de controle para nunca colidirem com o texto transcrito.
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_STOP = "\x03"
+
+# Frase entre aspas ou termo solto, na sintaxe do websearch_to_tsquery
+QUERY_CLAUSE_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+HEADLINE_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+    "MaxWords=35, MinWords=15, ShortWord=3, "
+    "MaxFragments=2, FragmentDelimiter=\" … \""
+)
+
+
+def build_tsquery(query: str) -> ColumnElement:
+    """
+    Converte o texto digitado em tsquery.
+
+    websearch_to_tsquery aceita a sintaxe que o usuário já conhece:
+    - termos soltos: todos precisam aparecer (AND)
+    - "frase entre aspas": termos em sequência
+    - OR entre termos
+    - -termo para excluir
+    """
+    return func.websearch_to_tsquery(TS_CONFIG, query)
+
+
+def segment_query_clauses(query: str) -> list[ColumnElement]:
+    """
+    Uma tsquery por termo solto e por frase entre aspas (que continua
+    exigindo os termos em sequência). Exclusões (-termo) e o OR ficam de
+    fora: já filtraram as transcrições, e nos segmentos interessa onde cada
+    termo aparece, não onde aparecem todos juntos.
+    """
+    clauses: list[str] = []
+    for phrase, term in QUERY_CLAUSE_PATTERN.findall(query):
+        phrase = phrase.strip()
+        term = term.strip('"')
+        if phrase:
+            clauses.append(f'"{phrase}"')
+        elif term and not term.startswith("-") and term.lower() != "or":
+            clauses.append(term)
+
+    return [func.websearch_to_tsquery(TS_CONFIG, clause) for clause in dict.fromkeys(clauses)]
+
+
+def any_clause(clauses: list[ColumnElement]) -> ColumnElement:
+    """
+    OR (operador || de tsquery) das cláusulas.
+    """
+    return reduce(lambda left, right: left.op("||")(right), clauses)
+
+
+def match_expression(tsquery: ColumnElement) -> ColumnElement:
+    return Transcript.search_vector.op("@@")(tsquery)
+
+
+def rank_expression(tsquery: ColumnElement) -> ColumnElement:
+    # Cast para double precision: o valor volta para o Python sem perda e
+    # pode ser usado no cursor de paginação com comparação exata.
+    return cast(
+        func.ts_rank_cd(Transcript.search_vector, tsquery, RANK_NORMALIZATION),
+        Float,
+    )
+
+
+def headline_expression(tsquery: ColumnElement) -> ColumnElement:
+    """
+    Trecho da transcrição em volta dos termos encontrados, calculado no
+    Postgres. Assim o full_text nunca sai do banco na listagem.
+    """
+    return func.ts_headline(
+        TS_CONFIG, Transcript.full_text, tsquery, HEADLINE_OPTIONS
+    )
+
+
+def parse_headline(headline: str) -> tuple[str, list[tuple[int, int]]]:
+    """
+    Remove os marcadores do ts_headline e devolve o snippet limpo junto com
+    os offsets (início, fim) de cada trecho destacado.
+    """
+    parts: list[str] = []
+    highlights: list[tuple[int, int]] = []
+    length = 0
+    start: Optional[int] = None
+
+    for char in headline or "":
+        if char == HIGHLIGHT_START:
+            start = length
+        elif char == HIGHLIGHT_STOP:
+            if start is not None:
+                highlights.append((start, length))
+            start = None
+        else:
+            parts.append(char)
+            length += 1
+
+    return "".join(parts), highlights
+
+
+# ─────────────────────────────────────────────
+#  Cursor de paginação (keyset em rank DESC, id DESC)
+# ─────────────────────────────────────────────
+
+def encode_cursor(rank: float, transcript_id: int) -> str:
+    payload = json.dumps({"r": rank, "id": transcript_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """
+    Levanta ValueError se o cursor não for válido.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(payload["r"]), int(payload["id"])
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor!r}") from e
+
+
+def after_cursor(rank: ColumnElement, cursor: str) -> ColumnElement:
+    """
+    Filtro keyset: só linhas que vêm depois do cursor na ordem
+    (rank DESC, id DESC).
+    """
+    last_rank, last_id = decode_cursor(cursor)
+    return or_(
+        rank < last_rank,
+        and_(rank == last_rank, Transcript.id < last_id),
+    )
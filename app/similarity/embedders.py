@@ -0,0 +1,167 @@
+"""
+Embedders: transformam o texto de uma transcrição num vetor, na CPU.
+Escolhidos por EMBEDDER:
+
+- "sentence_transformers": modelo multilíngue pequeno
+  (EMBEDDING_MODEL_NAME, padrão paraphrase-multilingual-MiniLM-L12-v2,
+  384 dimensões). A transcrição é dividida em janelas de
+  EMBEDDING_WINDOW_WORDS palavras (o modelo só enxerga ~128 tokens) e o
+  vetor final é a média das janelas. Carregado uma vez por processo.
+  Dependência opcional: `pip install sentence-transformers`.
+- "hashing": saco de palavras e bigramas com hashing (só NumPy), sem
+  modelo. Pega vocabulário parecido, não sinônimos. Para testes e dev.
+
+Todos devolvem float32 (n, dim) com norma 1: produto interno = cosseno.
+O nome do embedder (Embedder.name) vai em TranscriptEmbedding.model.
+"""
+
+import os
+import threading
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from app.categorization.engine import normalize_text
+from app.config import settings
+
+
+EMBEDDER_NAMES = ("sentence_transformers", "hashing")
+
+# Palavras curtas (artigos, preposições) só adicionam ruído no hashing
+HASHING_MIN_TOKEN_LENGTH = 4
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class Embedder:
+    # Valor gravado em TranscriptEmbedding.model
+    name: str = ""
+    dim: int = 0
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class SentenceTransformerEmbedder(Embedder):
+    def __init__(self) -> None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError(
+                "EMBEDDER=sentence_transformers requer o pacote sentence-transformers"
+            ) from e
+
+        if settings.embedding_cpu_threads > 0:
+            import torch
+
+            torch.set_num_threads(settings.embedding_cpu_threads)
+
+        print(f"[embedding] Carregando modelo {settings.embedding_model_name} (cpu)")
+        self.model = SentenceTransformer(settings.embedding_model_name, device="cpu")
+        self.name = embedder_model_name()
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def windows(text: str) -> list[str]:
+        """
+        Janelas de EMBEDDING_WINDOW_WORDS palavras; acima de
+        EMBEDDING_MAX_WINDOWS, amostradas em intervalos regulares.
+        """
+        words = text.split()
+        size = settings.embedding_window_words
+        windows = [" ".join(words[i : i + size]) for i in range(0, len(words), size)] or [""]
+
+        limit = settings.embedding_max_windows
+        if len(windows) > limit:
+            picks = np.linspace(0, len(windows) - 1, limit).round().astype(int)
+            windows = [windows[i] for i in picks]
+        return windows
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        per_text = [self.windows(text) for text in texts]
+        flat = [window for windows in per_text for window in windows]
+
+        with self._lock:
+            encoded = self.model.encode(
+                flat,
+                batch_size=settings.embedding_batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            )
+
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        start = 0
+        for i, windows in enumerate(per_text):
+            vectors[i] = encoded[start : start + len(windows)].mean(axis=0)
+            start += len(windows)
+        return normalize_rows(vectors)
+
+
+class HashingEmbedder(Embedder):
+    def __init__(self) -> None:
+        self.dim = settings.embedding_hashing_dim
+        self.name = embedder_model_name()
+
+    def embed_one(self, text: str) -> np.ndarray:
+        tokens = [t for t in normalize_text(text).split() if len(t) >= HASHING_MIN_TOKEN_LENGTH]
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+
+        # crc32 é estável entre processos (hash() do Python não é)
+        hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+        index = (hashes % self.dim).astype(np.intp)
+        sign = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, index, sign)
+
+        # tf sublinear: uma palavra repetida 100 vezes não domina o vetor
+        return np.sign(vector) * np.log1p(np.abs(vector))
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return normalize_rows(np.stack([self.embed_one(text) for text in texts]))
+
+
+def embedder_model_name() -> str:
+    """
+    TranscriptEmbedding.model do EMBEDDER configurado, sem carregar o
+    modelo (a API só lê os vetores).
+    """
+    if settings.embedder == "hashing":
+        return f"hashing-{settings.embedding_hashing_dim}"
+    return settings.embedding_model_name.rsplit("/", 1)[-1]
+
+
+EMBEDDER_CLASSES: dict[str, type[Embedder]] = {
+    "sentence_transformers": SentenceTransformerEmbedder,
+    "hashing": HashingEmbedder,
+}
+
+_embedder: Optional[Embedder] = None
+_embedder_key: Optional[tuple] = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> Embedder:
+    """
+    Instância única por processo (modelo residente). Depois de um fork, o
+    processo filho carrega o seu.
+    """
+    global _embedder, _embedder_key
+    name = settings.embedder
+    if name not in EMBEDDER_CLASSES:
+        raise ValueError(f"EMBEDDER inválido: {name!r} (use {', '.join(EMBEDDER_NAMES)})")
+
+    with _embedder_lock:
+        key = (name, os.getpid())
+        if _embedder is None or _embedder_key != key:
+            _embedder = EMBEDDER_CLASSES[name]()
+            _embedder_key = key
+        return _embedder
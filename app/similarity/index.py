@@ -0,0 +1,267 @@
+"""
+Índice de vetores em memória (NumPy): k vizinhos mais próximos por
+cosseno (os vetores têm norma 1, então é um produto interno).
+
+- força bruta: uma multiplicação matriz × vetor sobre o corpus inteiro.
+  Exato, e rápido o bastante até dezenas de milhares de vetores.
+- IVF: a partir de ivf_min_vectors, os vetores são agrupados por k-means
+  (esférico) em ~2·√n listas e guardados em ordem de lista, cada lista
+  uma fatia contígua da matriz. A consulta compara com os centróides e só
+  varre as nprobe listas mais próximas. Aproximado: troca um pouco de
+  recall por uma fração do custo (ver bench_similarity.py).
+
+Incremental: add() acrescenta no fim. Os vetores novos ficam fora das
+listas (varridos na força bruta) até passarem de RELAYOUT_FRACTION do
+índice; aí são distribuídos nas listas. O k-means é refeito quando o
+índice dobra de tamanho desde o último treino.
+
+Leitura sem lock: cada add() monta um estado novo e troca a referência;
+uma busca em andamento continua usando o estado antigo.
+"""
+
+import math
+import threading
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+
+IVF_LISTS_PER_SQRT = 2
+IVF_MIN_LISTS = 8
+IVF_MAX_LISTS = 4096
+# Amostra usada no k-means: até tantos vetores por lista
+KMEANS_SAMPLE_PER_LIST = 64
+KMEANS_ITERATIONS = 10
+# Vetores fora das listas (ou apagados) acima desta fração -> reorganiza
+RELAYOUT_FRACTION = 0.1
+ASSIGN_BLOCK_ROWS = 65536
+
+
+class Neighbor(NamedTuple):
+    id: int
+    score: float
+
+
+class _IndexState(NamedTuple):
+    ids: np.ndarray  # int64 (n,)
+    vectors: np.ndarray  # float32 (n, dim)
+    alive: np.ndarray  # bool (n,): False = substituído por um vetor mais novo
+    # IVF (None na força bruta): a lista c ocupa [offsets[c], offsets[c+1])
+    centroids: Optional[np.ndarray]
+    offsets: Optional[np.ndarray]
+    # Posições [0, covered) estão nas listas; [covered, n) são varridas inteiras
+    covered: int
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Lista (centróide mais próximo) de cada vetor, em blocos para não criar
+    uma matriz n × nlist inteira.
+    """
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        block = vectors[start : start + ASSIGN_BLOCK_ROWS]
+        labels[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(vectors: np.ndarray, nlist: int, rng: np.random.Generator) -> np.ndarray:
+    sample_size = min(len(vectors), nlist * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        labels = assign_lists(sample, centroids)
+        order = np.argsort(labels, kind="stable")
+        sorted_labels = labels[order]
+        present, starts = np.unique(sorted_labels, return_index=True)
+
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids[present] = sums / norms
+
+        # Lista vazia: recomeça de um vetor qualquer da amostra
+        empty = np.setdiff1d(np.arange(nlist), present)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+
+    return centroids
+
+
+class VectorIndex:
+    def __init__(
+        self,
+        dim: int,
+        ivf_min_vectors: int = 50_000,
+        nprobe: int = 16,
+        seed: int = 0,
+    ) -> None:
+        self.dim = dim
+        self.ivf_min_vectors = ivf_min_vectors
+        self.nprobe = nprobe
+        self._rng = np.random.default_rng(seed)
+
+        self._state = _IndexState(
+            ids=np.empty(0, dtype=np.int64),
+            vectors=np.empty((0, dim), dtype=np.float32),
+            alive=np.empty(0, dtype=bool),
+            centroids=None,
+            offsets=None,
+            covered=0,
+        )
+        # Só usados por quem escreve (sob _write_lock)
+        self._positions: dict[int, int] = {}
+        self._trained_on = 0
+        self._write_lock = threading.Lock()
+
+    # ─────────────────────────────────────────────
+    #  Escrita
+    # ─────────────────────────────────────────────
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray) -> None:
+        """
+        Acrescenta (ou substitui, se o id já existir) vetores de norma 1.
+        """
+        new_ids = np.asarray(list(ids), dtype=np.int64)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(new_ids), self.dim)
+        if not len(new_ids):
+            return
+
+        with self._write_lock:
+            state = self._state
+            start = len(state.ids)
+            alive = np.concatenate([state.alive, np.ones(len(new_ids), dtype=bool)])
+
+            for position, item_id in enumerate(new_ids.tolist(), start=start):
+                previous = self._positions.get(item_id)
+                if previous is not None:
+                    alive[previous] = False
+                self._positions[item_id] = position
+
+            state = state._replace(
+                ids=np.concatenate([state.ids, new_ids]),
+                vectors=np.concatenate([state.vectors, vectors]),
+                alive=alive,
+            )
+            self._state = self._maintain(state)
+
+    def _maintain(self, state: _IndexState) -> _IndexState:
+        total = len(state.ids)
+        live = int(state.alive.sum())
+        dead = total - live
+        outside = total - state.covered
+
+        if live >= self.ivf_min_vectors:
+            if state.centroids is None or live >= 2 * self._trained_on:
+                nlist = min(IVF_MAX_LISTS, max(IVF_MIN_LISTS, int(IVF_LISTS_PER_SQRT * math.sqrt(live))))
+                live_vectors = state.vectors[state.alive]
+                centroids = spherical_kmeans(live_vectors, nlist, self._rng)
+                self._trained_on = live
+                return self._relayout(state, centroids)
+            if outside + dead > RELAYOUT_FRACTION * total:
+                return self._relayout(state, state.centroids)
+            return state
+
+        if state.centroids is not None or dead > RELAYOUT_FRACTION * total:
+            return self._relayout(state, None)
+        return state
+
+    def _relayout(self, state: _IndexState, centroids: Optional[np.ndarray]) -> _IndexState:
+        """
+        Remove os apagados e, com centróides, ordena os vetores por lista.
+        """
+        ids = state.ids[state.alive]
+        vectors = state.vectors[state.alive]
+        offsets = None
+
+        if centroids is not None:
+            labels = assign_lists(vectors, centroids)
+            order = np.argsort(labels, kind="stable")
+            ids, vectors = ids[order], vectors[order]
+            offsets = np.searchsorted(labels[order], np.arange(len(centroids) + 1))
+
+        self._positions = dict(zip(ids.tolist(), range(len(ids))))
+        return _IndexState(
+            ids=ids,
+            vectors=np.ascontiguousarray(vectors),
+            alive=np.ones(len(ids), dtype=bool),
+            centroids=centroids,
+            offsets=offsets,
+            covered=len(ids) if centroids is not None else 0,
+        )
+
+    # ─────────────────────────────────────────────
+    #  Leitura
+    # ─────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return int(self._state.alive.sum())
+
+    @property
+    def mode(self) -> str:
+        return "ivf" if self._state.centroids is not None else "brute_force"
+
+    def vector(self, item_id: int) -> Optional[np.ndarray]:
+        state = self._state
+        positions = np.flatnonzero((state.ids == item_id) & state.alive)
+        return state.vectors[positions[0]] if len(positions) else None
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        exclude_ids: Iterable[int] = (),
+        nprobe: Optional[int] = None,
+    ) -> list[Neighbor]:
+        state = self._state
+        query = normalize(query)
+
+        if state.centroids is None:
+            ranges = [(0, len(state.ids))]
+        else:
+            nprobe = min(nprobe or self.nprobe, len(state.centroids))
+            centroid_scores = state.centroids @ query
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            ranges = [(int(state.offsets[c]), int(state.offsets[c + 1])) for c in probe]
+            ranges.append((state.covered, len(state.ids)))
+
+        ranges = [(a, b) for a, b in ranges if b > a]
+        if not ranges:
+            return []
+
+        positions = np.concatenate([np.arange(a, b) for a, b in ranges])
+        scores = np.concatenate([state.vectors[a:b] @ query for a, b in ranges])
+
+        scores[~state.alive[positions]] = -np.inf
+        exclude = np.asarray(list(exclude_ids), dtype=np.int64)
+        if len(exclude):
+            scores[np.isin(state.ids[positions], exclude)] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            Neighbor(int(state.ids[positions[i]]), float(scores[i]))
+            for i in top
+            if np.isfinite(scores[i])
+        ]
+
+    def stats(self) -> dict:
+        state = self._state
+        return {
+            "vectors": len(self),
+            "dim": self.dim,
+            "mode": self.mode,
+            "lists": 0 if state.centroids is None else len(state.centroids),
+            "outside_lists": len(state.ids) - state.covered if state.centroids is not None else 0,
+            "nprobe": self.nprobe,
+            "memory_bytes": int(state.vectors.nbytes),
+        }
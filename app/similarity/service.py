@@ -0,0 +1,102 @@
+"""
+Índice de similaridade do processo da API.
+
+Montado na primeira consulta a partir de transcript_embeddings e
+atualizado de forma incremental: no máximo a cada
+SIMILARITY_INDEX_REFRESH_SECONDS, lê só os vetores com id maior que o
+último já carregado. Cada processo uvicorn tem o seu.
+"""
+
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.config import settings
+from app.db.task_session import db_session
+from app.similarity.embedders import embedder_model_name
+from app.similarity.index import Neighbor, VectorIndex
+from app.similarity.store import load_embeddings_after
+
+
+LOAD_PAGE_SIZE = 10_000
+
+
+class SimilarityIndex:
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self.index: Optional[VectorIndex] = None
+        self.last_embedding_id = 0
+        self.last_refresh = 0.0
+        self.refresh_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = False) -> None:
+        if not force and time.monotonic() - self.last_refresh < settings.similarity_index_refresh_seconds:
+            return
+
+        with self._lock:
+            if not force and time.monotonic() - self.last_refresh < settings.similarity_index_refresh_seconds:
+                return
+
+            start = time.monotonic()
+            loaded = 0
+            with db_session() as db:
+                while True:
+                    rows = load_embeddings_after(db, self.model, self.last_embedding_id, LOAD_PAGE_SIZE)
+                    if not rows:
+                        break
+                    if self.index is None:
+                        self.index = VectorIndex(
+                            dim=len(rows[0].vector),
+                            ivf_min_vectors=settings.similarity_ivf_min_vectors,
+                            nprobe=settings.similarity_ivf_nprobe,
+                        )
+                    self.index.add([row.transcript_id for row in rows], np.stack([row.vector for row in rows]))
+                    self.last_embedding_id = rows[-1].id
+                    loaded += len(rows)
+
+            self.last_refresh = time.monotonic()
+            self.refresh_seconds = self.last_refresh - start
+            if loaded:
+                print(
+                    f"[similarity] {loaded} vetores novos ({self.model}) em "
+                    f"{self.refresh_seconds:.2f}s; índice com {len(self.index)}"
+                )
+
+    def similar(self, transcript_id: int, k: int) -> Optional[list[Neighbor]]:
+        """
+        Os k vetores mais próximos do da transcrição, sem ela mesma.
+        None = a transcrição ainda não tem vetor.
+        """
+        self.refresh()
+        if self.index is None:
+            return None
+
+        vector = self.index.vector(transcript_id)
+        if vector is None:
+            return None
+        return self.index.search(vector, k, exclude_ids=[transcript_id])
+
+    def stats(self) -> dict:
+        stats = self.index.stats() if self.index is not None else {"vectors": 0}
+        return {
+            "model": self.model,
+            **stats,
+            "last_embedding_id": self.last_embedding_id,
+            "last_refresh_seconds": round(self.refresh_seconds, 3),
+        }
+
+
+_similarity_index: Optional[SimilarityIndex] = None
+_similarity_lock = threading.Lock()
+
+
+def get_similarity_index() -> SimilarityIndex:
+    global _similarity_index
+    model = embedder_model_name()
+    with _similarity_lock:
+        if _similarity_index is None or _similarity_index.model != model:
+            _similarity_index = SimilarityIndex(model)
+        return _similarity_index
@@ -0,0 +1,122 @@
+"""
+Gravação e leitura dos embeddings (tabela transcript_embeddings).
+
+Os vetores são gravados compactos, conforme EMBEDDING_STORAGE_DTYPE:
+- float16: 2 bytes por dimensão, erro desprezível para cosseno
+- int8: 1 byte por dimensão + uma escala por vetor (valor = byte × escala)
+
+Em memória (índice da API) voltam a ser float32.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models_embeddings import TranscriptEmbedding
+from app.db.models_transcripts import Transcript
+
+
+STORAGE_DTYPES = ("float16", "int8")
+
+
+class StoredEmbedding(NamedTuple):
+    id: int
+    transcript_id: int
+    vector: np.ndarray
+
+
+def encode_vector(vector: np.ndarray, dtype: str) -> tuple[bytes, Optional[float]]:
+    if dtype == "float16":
+        return vector.astype(np.float16).tobytes(), None
+    if dtype == "int8":
+        scale = float(np.abs(vector).max()) / 127 or 1.0
+        return np.round(vector / scale).astype(np.int8).tobytes(), scale
+    raise ValueError(f"EMBEDDING_STORAGE_DTYPE inválido: {dtype!r} (use {', '.join(STORAGE_DTYPES)})")
+
+
+def decode_vector(data: bytes, dtype: str, scale: Optional[float]) -> np.ndarray:
+    if dtype == "int8":
+        return np.frombuffer(data, dtype=np.int8).astype(np.float32) * np.float32(scale)
+    return np.frombuffer(data, dtype=np.float16).astype(np.float32)
+
+
+def find_unembedded(db: Session, model: str, limit: int) -> list[tuple[int, int]]:
+    """
+    (transcript_id, video_id) de transcrições prontas ainda sem vetor deste
+    modelo. Transcrições com erro do motor ficam de fora.
+    """
+    embedded = select(TranscriptEmbedding.transcript_id).where(
+        TranscriptEmbedding.model == model,
+        TranscriptEmbedding.transcript_id == Transcript.id,
+    )
+    rows = db.execute(
+        select(Transcript.id, Transcript.video_id)
+        .where(
+            Transcript.status == "ready",
+            ~Transcript.engine.like("%\\_error"),
+            ~embedded.exists(),
+        )
+        .order_by(Transcript.id)
+        .limit(limit)
+    )
+    return [tuple(row) for row in rows]
+
+
+def save_embeddings(
+    db: Session,
+    model: str,
+    dtype: str,
+    transcript_ids: list[int],
+    video_ids: list[int],
+    vectors: np.ndarray,
+) -> int:
+    if not transcript_ids:
+        return 0
+
+    values = []
+    for transcript_id, video_id, vector in zip(transcript_ids, video_ids, vectors):
+        data, scale = encode_vector(vector, dtype)
+        values.append(
+            {
+                "transcript_id": transcript_id,
+                "video_id": video_id,
+                "model": model,
+                "dtype": dtype,
+                "dim": len(vector),
+                "scale": scale,
+                "vector": data,
+            }
+        )
+
+    result = db.execute(
+        pg_insert(TranscriptEmbedding)
+        .values(values)
+        .on_conflict_do_nothing(constraint="uq_transcript_embeddings_transcript_model")
+    )
+    return result.rowcount or 0
+
+
+def load_embeddings_after(db: Session, model: str, after_id: int, limit: int) -> list[StoredEmbedding]:
+    """
+    Próximos vetores do modelo com id > after_id, em ordem de id (o índice
+    da API lê só o que entrou desde a última vez).
+    """
+    rows = db.execute(
+        select(
+            TranscriptEmbedding.id,
+            TranscriptEmbedding.transcript_id,
+            TranscriptEmbedding.dtype,
+            TranscriptEmbedding.scale,
+            TranscriptEmbedding.vector,
+        )
+        .where(TranscriptEmbedding.model == model, TranscriptEmbedding.id > after_id)
+        .order_by(TranscriptEmbedding.id)
+        .limit(limit)
+    )
+    return [
+        StoredEmbedding(row_id, transcript_id, decode_vector(data, dtype, scale))
+        for row_id, transcript_id, dtype, scale, data in rows
+    ]
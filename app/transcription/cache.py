@@ -0,0 +1,157 @@
+"""
+Reaproveitamento de transcrições por impressão digital do áudio
+(ver app/media/fingerprint.py):
+
+- atalho exato: Video.audio_fingerprint (digest) igual
+- senão, candidatos que compartilham chaves LSH (audio_fingerprints.keys,
+  índice GIN), conferidos com compare_fingerprints; aceita o de menor BER
+  abaixo de TRANSCRIPT_FINGERPRINT_MAX_BER
+
+Um Transcript copiado de outro tem source_transcript_id preenchido; é por
+aí que a taxa de acerto é medida.
+"""
+
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models_fingerprints import AudioFingerprint
+from app.db.models_transcripts import Transcript
+from app.db.models_videos import Video
+from app.media.fingerprint import FINGERPRINT_VERSION, AudioPrint, compare_fingerprints
+
+
+# Vídeos com pelo menos tantas chaves em comum viram candidatos
+FINGERPRINT_MIN_SHARED_KEYS = 2
+# Candidatos lidos pelo índice e, desses, os conferidos por BER (os com
+# mais chaves em comum)
+FINGERPRINT_CANDIDATE_SCAN = 200
+FINGERPRINT_MAX_CANDIDATES = 10
+
+
+def save_audio_fingerprint(db: Session, video_id: int, fingerprint: AudioPrint) -> None:
+    values = {
+        "video_id": video_id,
+        "version": FINGERPRINT_VERSION,
+        "keys": fingerprint.keys,
+        "frames": fingerprint.frames_bytes(),
+    }
+    db.execute(
+        pg_insert(AudioFingerprint)
+        .values(values)
+        .on_conflict_do_update(
+            index_elements=[AudioFingerprint.video_id],
+            set_={key: value for key, value in values.items() if key != "video_id"},
+        )
+    )
+
+
+def ready_transcript_query(db: Session):
+    """
+    Transcripts prontos que não sejam texto de erro do motor.
+    """
+    return db.query(Transcript).filter(
+        Transcript.status == "ready",
+        ~Transcript.engine.like("%\\_error"),
+    )
+
+
+def find_similar_audio(
+    db: Session,
+    fingerprint: AudioPrint,
+    exclude_video_id: Optional[int] = None,
+) -> Optional[int]:
+    """
+    video_id (com transcrição pronta) cujo áudio é uma cópia deste, pela
+    comparação tolerante; None se nenhum candidato passar do limite.
+    """
+    if not fingerprint.keys:
+        return None
+
+    has_transcript = (
+        select(Transcript.id)
+        .where(
+            Transcript.video_id == AudioFingerprint.video_id,
+            Transcript.status == "ready",
+            ~Transcript.engine.like("%\\_error"),
+        )
+        .exists()
+    )
+    query = select(AudioFingerprint.video_id, AudioFingerprint.keys).where(
+        AudioFingerprint.version == FINGERPRINT_VERSION,
+        AudioFingerprint.keys.overlap(fingerprint.keys),
+        has_transcript,
+    )
+    if exclude_video_id is not None:
+        query = query.where(AudioFingerprint.video_id != exclude_video_id)
+
+    query_keys = set(fingerprint.keys)
+    shared = [
+        (len(query_keys.intersection(keys)), video_id)
+        for video_id, keys in db.execute(query.limit(FINGERPRINT_CANDIDATE_SCAN))
+    ]
+    candidates = [
+        video_id
+        for count, video_id in sorted(shared, reverse=True)[:FINGERPRINT_MAX_CANDIDATES]
+        if count >= FINGERPRINT_MIN_SHARED_KEYS
+    ]
+    if not candidates:
+        return None
+
+    best_video_id: Optional[int] = None
+    best_ber = settings.transcript_fingerprint_max_ber
+    rows = db.execute(
+        select(AudioFingerprint.video_id, AudioFingerprint.frames, AudioFingerprint.keys).where(
+            AudioFingerprint.video_id.in_(candidates)
+        )
+    )
+    for video_id, frames, keys in rows:
+        match = compare_fingerprints(fingerprint, AudioPrint.from_bytes(frames, keys))
+        if match is not None and match.bit_error_rate <= best_ber:
+            best_video_id, best_ber = video_id, match.bit_error_rate
+
+    return best_video_id
+
+
+def find_transcript_by_fingerprint(
+    db: Session,
+    fingerprint: AudioPrint,
+    exclude_video_id: Optional[int] = None,
+) -> Optional[Transcript]:
+    """
+    Transcript pronto (e que não seja texto de erro) de outro vídeo com o
+    mesmo áudio: digest igual ou impressão parecida (find_similar_audio).
+    Impressão sem áudio suficiente (AudioPrint.usable) nunca acerta.
+    """
+    if not fingerprint.usable:
+        return None
+
+    query = ready_transcript_query(db).join(Video, Video.id == Transcript.video_id)
+    if exclude_video_id is not None:
+        query = query.filter(Video.id != exclude_video_id)
+
+    exact = query.filter(Video.audio_fingerprint == fingerprint.digest).order_by(Transcript.id).first()
+    if exact is not None:
+        return exact
+
+    video_id = find_similar_audio(db, fingerprint, exclude_video_id)
+    if video_id is None:
+        return None
+    return query.filter(Video.id == video_id).order_by(Transcript.id).first()
+
+
+def fingerprint_cache_stats(db: Session) -> dict:
+    total, copied = db.query(
+        func.count(Transcript.id),
+        func.count(Transcript.source_transcript_id),
+    ).one()
+
+    return {
+        "transcripts": total,
+        "cache_hits": copied,
+        "engine_calls": total - copied,
+        "hit_rate": round(copied / total, 4) if total else None,
+    }
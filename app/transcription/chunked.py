@@ -0,0 +1,141 @@
+"""
+Transcrição em pedaços, em paralelo.
+
+Áudios longos (ou maiores que o limite de upload da API) são divididos
+em silêncios (app/media/chunking.py), os pedaços são transcritos ao mesmo
+tempo (TRANSCRIPTION_CHUNK_CONCURRENCY) e os textos costurados em ordem.
+
+Nos cortes forçados (sem silêncio) os pedaços se sobrepõem alguns
+segundos; na costura, as palavras repetidas no início do pedaço seguinte
+são removidas (maior sufixo do texto anterior que é prefixo do próximo).
+"""
+
+import re
+import shutil
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+from app.config import settings
+from app.media.chunking import detect_silences, plan_chunks, split_audio
+from app.media.process import probe_duration
+from app.transcription.engines import TranscriptionEngine
+from app.transcription.segments import TranscriptionResult, merge_chunk_segments
+
+
+# Quantas palavras no máximo procurar como sobreposição entre dois pedaços
+MAX_OVERLAP_WORDS = 30
+# Menos que isso pode ser só coincidência ("de", "que a"...)
+MIN_OVERLAP_WORDS = 2
+
+WORD_NORMALIZE_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def _normalize_word(word: str) -> str:
+    return WORD_NORMALIZE_RE.sub("", word.lower())
+
+
+def overlap_length(previous_words: list[str], next_words: list[str]) -> int:
+    """
+    Tamanho do maior sufixo de previous_words que é prefixo de next_words
+    (comparando sem pontuação nem maiúsculas).
+    """
+    previous_norm = [_normalize_word(w) for w in previous_words[-MAX_OVERLAP_WORDS:]]
+    next_norm = [_normalize_word(w) for w in next_words[:MAX_OVERLAP_WORDS]]
+
+    for size in range(min(len(previous_norm), len(next_norm)), MIN_OVERLAP_WORDS - 1, -1):
+        if previous_norm[-size:] == next_norm[:size]:
+            return size
+    return 0
+
+
+def stitch_texts(texts: list[str], overlaps_previous: list[bool]) -> str:
+    """
+    Junta os textos dos pedaços em ordem. Só procura repetição nas
+    fronteiras em que houve sobreposição de áudio.
+    """
+    words: list[str] = []
+    for text, overlaps in zip(texts, overlaps_previous):
+        chunk_words = text.split()
+        if overlaps and words:
+            chunk_words = chunk_words[overlap_length(words, chunk_words):]
+        words.extend(chunk_words)
+    return " ".join(words)
+
+
+def needs_chunking(audio_path: Path, duration: Optional[float]) -> bool:
+    if not settings.transcription_chunking_enabled:
+        return False
+    if audio_path.stat().st_size > settings.transcription_max_upload_bytes:
+        return True
+    return duration is not None and duration > settings.transcription_chunk_seconds
+
+
+def transcribe_chunked(
+    engine: TranscriptionEngine,
+    audio_path: Path,
+    duration: Optional[float] = None,
+) -> TranscriptionResult:
+    """
+    Os pedaços vão juntos para engine.transcribe_batch, com até
+    TRANSCRIPTION_CHUNK_CONCURRENCY em voo (no Whisper API, requests
+    assíncronos no mesmo processo).
+
+    Se o áudio não precisa ser dividido, é só uma chamada direta.
+    """
+    if duration is None:
+        duration = probe_duration(str(audio_path))
+
+    if duration is None or not needs_chunking(audio_path, duration):
+        return engine.transcribe_file(audio_path)
+
+    silences = detect_silences(
+        audio_path,
+        settings.transcription_silence_noise_db,
+        settings.transcription_silence_min_seconds,
+    )
+    # Bitrate alto pode estourar o limite de upload antes do limite de tempo
+    bytes_per_second = audio_path.stat().st_size / duration
+    max_chunk_seconds = min(
+        settings.transcription_chunk_seconds,
+        0.9 * settings.transcription_max_upload_bytes / bytes_per_second,
+    )
+    spans = plan_chunks(
+        duration,
+        silences,
+        max_chunk_seconds=max_chunk_seconds,
+        min_chunk_seconds=min(settings.transcription_chunk_min_seconds, max_chunk_seconds / 2),
+        overlap_seconds=settings.transcription_chunk_overlap_seconds,
+    )
+
+    # Sempre no AUDIO_TEMP_PATH (o áudio pode estar no storage, no modo
+    # DOWNLOAD_MODE=audio)
+    work_dir = Path(settings.audio_temp_path) / f"chunks_{uuid4().hex}"
+    try:
+        chunks = split_audio(audio_path, spans, work_dir)
+        forced_cuts = sum(1 for chunk in chunks if chunk.span.overlaps_previous)
+        print(
+            f"[transcribe_chunked] {audio_path.name}: {len(chunks)} pedaços "
+            f"({forced_cuts} cortes sem silêncio), "
+            f"concorrência={settings.transcription_chunk_concurrency}"
+        )
+
+        results = engine.transcribe_batch(
+            [chunk.path for chunk in chunks],
+            concurrency=settings.transcription_chunk_concurrency,
+        )
+
+        return TranscriptionResult(
+            stitch_texts(
+                [result.text for result in results],
+                [chunk.span.overlaps_previous for chunk in chunks],
+            ),
+            # Tempos de cada pedaço passam para a linha do tempo do áudio inteiro
+            merge_chunk_segments(
+                [result.segments for result in results],
+                [chunk.span.start for chunk in chunks],
+            ),
+        )
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
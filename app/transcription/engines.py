@@ -0,0 +1,186 @@
+"""
+Motores de transcrição, escolhidos por TRANSCRIPTION_ENGINE:
+
+- "whisper_api": Whisper da OpenAI (API paga, remoto). Áudios longos são
+  divididos e transcritos em paralelo (ver app/transcription/chunked.py).
+- "local_whisper": faster-whisper (CTranslate2) na CPU, modelo quantizado
+  (int8 por padrão). O modelo é carregado uma vez por processo do worker e
+  fica residente; custo marginal zero por transcrição.
+  Dependência opcional: `pip install faster-whisper`.
+- "stub": texto determinístico derivado do conteúdo do arquivo, sem rede
+  nem modelo. Para testes e ambiente de dev.
+
+O nome do motor (TranscriptionEngine.name) é o que vai em Transcript.engine.
+Todos devolvem TranscriptionResult: texto + segmentos com tempo.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from app.config import settings
+from app.media.storage import hash_file
+from app.transcription.segments import TimedSegment, TranscriptionResult, segment_from_response
+
+
+ENGINE_NAMES = ("whisper_api", "local_whisper", "stub")
+
+
+class TranscriptionEngine:
+    # Valor gravado em Transcript.engine
+    name: str = ""
+    # Motores remotos se beneficiam de dividir o áudio e mandar em paralelo;
+    # os locais já processam o arquivo inteiro de uma vez
+    parallel_chunks: bool = False
+
+    @property
+    def error_name(self) -> str:
+        """Transcript.engine quando a transcrição falha."""
+        return f"{self.name}_error"
+
+    def transcribe_file(self, audio_path: Path, language: Optional[str] = None) -> TranscriptionResult:
+        raise NotImplementedError
+
+    def transcribe_batch(
+        self,
+        audio_paths: list[Path],
+        language: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> list[TranscriptionResult]:
+        """
+        Vários arquivos de uma vez, na mesma ordem. Por padrão, um por um
+        (concurrency só vale para motores remotos).
+        """
+        return [self.transcribe_file(path, language) for path in audio_paths]
+
+
+class WhisperApiEngine(TranscriptionEngine):
+    parallel_chunks = True
+
+    def __init__(self) -> None:
+        from app.workers.whisper_client import WhisperTranscriber
+
+        self.transcriber = WhisperTranscriber()
+        self.name = self.transcriber.model
+
+    @property
+    def error_name(self) -> str:
+        return "whisperai_error"
+
+    def transcribe_file(self, audio_path: Path, language: Optional[str] = None) -> TranscriptionResult:
+        return self.transcriber.transcribe_file(audio_path, language)
+
+    def transcribe_batch(
+        self,
+        audio_paths: list[Path],
+        language: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> list[TranscriptionResult]:
+        # Requests assíncronos em voo ao mesmo tempo, no mesmo processo
+        return self.transcriber.transcribe_many(audio_paths, language, concurrency)
+
+
+class LocalWhisperEngine(TranscriptionEngine):
+    name = "local_whisper"
+
+    def __init__(self) -> None:
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise RuntimeError(
+                "TRANSCRIPTION_ENGINE=local_whisper requer o pacote faster-whisper"
+            ) from e
+
+        print(
+            f"[local_whisper] Carregando modelo {settings.local_whisper_model} "
+            f"({settings.local_whisper_compute_type}, cpu)"
+        )
+        self.model = WhisperModel(
+            settings.local_whisper_model,
+            device="cpu",
+            compute_type=settings.local_whisper_compute_type,
+            cpu_threads=settings.local_whisper_cpu_threads,
+        )
+
+        # Pipeline em lote (faster-whisper >= 1.1): vários trechos do áudio
+        # passam pelo modelo de uma vez
+        self.pipeline = None
+        if settings.local_whisper_batch_size > 1:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+
+                self.pipeline = BatchedInferencePipeline(model=self.model)
+            except ImportError:
+                pass
+
+        # O modelo é compartilhado entre as threads do worker; CTranslate2
+        # não ganha nada com chamadas simultâneas na mesma instância
+        self._lock = threading.Lock()
+
+    def transcribe_file(self, audio_path: Path, language: Optional[str] = None) -> TranscriptionResult:
+        if not audio_path.exists():
+            raise FileNotFoundError(f"Arquivo de áudio não existe: {audio_path}")
+
+        with self._lock:
+            if self.pipeline is not None:
+                segments, _ = self.pipeline.transcribe(
+                    str(audio_path),
+                    language=language,
+                    batch_size=settings.local_whisper_batch_size,
+                )
+            else:
+                segments, _ = self.model.transcribe(
+                    str(audio_path), language=language, vad_filter=True
+                )
+            # segments é um gerador: a transcrição acontece aqui
+            timed = [segment for segment in map(segment_from_response, segments) if segment is not None]
+        return TranscriptionResult(" ".join(segment.text for segment in timed), timed)
+
+
+class StubEngine(TranscriptionEngine):
+    name = "stub"
+
+    def transcribe_file(self, audio_path: Path, language: Optional[str] = None) -> TranscriptionResult:
+        if not audio_path.exists():
+            raise FileNotFoundError(f"Arquivo de áudio não existe: {audio_path}")
+
+        digest = hash_file(audio_path)
+        text = f"transcrição stub {digest[:16]} ({audio_path.stat().st_size} bytes)"
+        return TranscriptionResult(text, [TimedSegment(0.0, 0.0, text)])
+
+
+ENGINE_CLASSES: dict[str, type[TranscriptionEngine]] = {
+    "whisper_api": WhisperApiEngine,
+    "local_whisper": LocalWhisperEngine,
+    "stub": StubEngine,
+}
+
+_engines: dict[str, TranscriptionEngine] = {}
+_engines_pid: Optional[int] = None
+_engines_lock = threading.Lock()
+
+
+def get_engine(name: Optional[str] = None) -> TranscriptionEngine:
+    """
+    Instância única por processo (o modelo local fica carregado e o pool
+    HTTP fica aberto entre tasks). name padrão: TRANSCRIPTION_ENGINE.
+
+    Depois de um fork (prefork do Celery) o processo filho cria as suas:
+    conexões e threads do pai não sobrevivem ao fork.
+    """
+    global _engines_pid
+    name = name or settings.transcription_engine
+    if name not in ENGINE_CLASSES:
+        raise ValueError(f"TRANSCRIPTION_ENGINE inválido: {name!r} (use {', '.join(ENGINE_NAMES)})")
+
+    with _engines_lock:
+        if _engines_pid != os.getpid():
+            _engines.clear()
+            _engines_pid = os.getpid()
+
+        engine = _engines.get(name)
+        if engine is None:
+            engine = ENGINE_CLASSES[name]()
+            _engines[name] = engine
+    return engine
@@ -0,0 +1,166 @@
+"""
+Segmentos com tempo (início/fim no áudio) das transcrições.
+
+Os motores devolvem TranscriptionResult (texto + segmentos). Os segmentos
+vão para a tabela transcript_segments, que tem o seu próprio tsvector:
+a busca usa esse índice para dizer em que momento do vídeo cada termo é
+falado (ver find_hit_offsets).
+"""
+
+from typing import Iterable, NamedTuple, Optional
+
+from sqlalchemy import case, func, insert, literal, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.db.models_transcript_segments import TranscriptSegment
+from app.search.fulltext import any_clause
+
+
+class TimedSegment(NamedTuple):
+    # Segundos desde o início do áudio
+    start: float
+    end: float
+    text: str
+
+
+class TranscriptionResult(NamedTuple):
+    text: str
+    segments: list[TimedSegment]
+
+
+def segment_from_response(item) -> Optional[TimedSegment]:
+    """
+    Segmento da resposta de um motor (objeto com start/end/text, ou dict).
+    """
+    get = item.get if isinstance(item, dict) else lambda key: getattr(item, key, None)
+    start, end, text = get("start"), get("end"), get("text")
+    if start is None or end is None or not text or not text.strip():
+        return None
+    return TimedSegment(float(start), float(end), text.strip())
+
+
+def shift_segments(segments: Iterable[TimedSegment], offset: float) -> list[TimedSegment]:
+    return [TimedSegment(s.start + offset, s.end + offset, s.text) for s in segments]
+
+
+def merge_chunk_segments(
+    chunk_segments: list[list[TimedSegment]],
+    chunk_starts: list[float],
+) -> list[TimedSegment]:
+    """
+    Junta os segmentos dos pedaços de uma transcrição em paralelo
+    (app/transcription/chunked.py) na linha do tempo do áudio inteiro.
+    Onde os pedaços se sobrepõem, fica o segmento do pedaço anterior.
+    """
+    merged: list[TimedSegment] = []
+    for segments, chunk_start in zip(chunk_segments, chunk_starts):
+        last_end = merged[-1].end if merged else 0.0
+        for segment in shift_segments(segments, chunk_start):
+            if merged and segment.end <= last_end:
+                continue
+            merged.append(segment)
+    return merged
+
+
+# ─────────────────────────────────────────────
+#  Persistência
+# ─────────────────────────────────────────────
+
+def save_segments(db: Session, transcript_id: int, segments: list[TimedSegment]) -> int:
+    if not segments:
+        return 0
+
+    db.execute(
+        insert(TranscriptSegment),
+        [
+            {
+                "transcript_id": transcript_id,
+                "start_ms": int(round(segment.start * 1000)),
+                "end_ms": int(round(segment.end * 1000)),
+                "text": segment.text,
+            }
+            for segment in segments
+        ],
+    )
+    return len(segments)
+
+
+def copy_segments(db: Session, source_transcript_id: int, transcript_id: int) -> int:
+    """
+    Copia os segmentos de outra transcrição (cache por impressão digital),
+    sem trazer nada para o Python.
+    """
+    source = select(
+        literal(transcript_id),
+        TranscriptSegment.start_ms,
+        TranscriptSegment.end_ms,
+        TranscriptSegment.text,
+    ).where(TranscriptSegment.transcript_id == source_transcript_id)
+
+    result = db.execute(
+        insert(TranscriptSegment).from_select(
+            ["transcript_id", "start_ms", "end_ms", "text"], source
+        )
+    )
+    return result.rowcount or 0
+
+
+def find_hit_offsets(
+    db: Session,
+    clauses: list[ColumnElement],
+    transcript_ids: list[int],
+    per_transcript: int,
+) -> dict[int, list[tuple[int, int]]]:
+    """
+    Para cada transcrição, os (start_ms, end_ms) dos segmentos que casam
+    com algum termo da busca (clauses, ver segment_query_clauses), no
+    máximo per_transcript por vídeo: os que casam com mais termos primeiro,
+    depois os mais cedo no vídeo. O resultado vem em ordem de tempo.
+
+    Um segmento é uma frase curta, então exigir todos os termos (o AND da
+    busca nas transcrições) quase nunca acharia nada numa busca de várias
+    palavras. Usa o GIN de transcript_segments.search_vector (o OR das
+    cláusulas): nunca relê o full_text. Uma frase entre aspas que
+    atravessa dois segmentos não gera offset.
+    """
+    if not transcript_ids or not clauses:
+        return {}
+
+    vector = TranscriptSegment.search_vector
+    terms_hit = sum(
+        (case((vector.op("@@")(clause), 1), else_=0) for clause in clauses),
+        literal(0),
+    )
+    position = (
+        func.row_number()
+        .over(
+            partition_by=TranscriptSegment.transcript_id,
+            order_by=(terms_hit.desc(), TranscriptSegment.start_ms),
+        )
+        .label("position")
+    )
+    hits = (
+        select(
+            TranscriptSegment.transcript_id,
+            TranscriptSegment.start_ms,
+            TranscriptSegment.end_ms,
+            position,
+        )
+        .where(
+            TranscriptSegment.transcript_id.in_(transcript_ids),
+            vector.op("@@")(any_clause(clauses)),
+        )
+        .subquery()
+    )
+
+    rows = db.execute(
+        select(hits.c.transcript_id, hits.c.start_ms, hits.c.end_ms)
+        .where(hits.c.position <= per_transcript)
+        .order_by(hits.c.transcript_id, hits.c.start_ms)
+    )
+
+    offsets: dict[int, list[tuple[int, int]]] = {}
+    for transcript_id, start_ms, end_ms in rows:
+        offsets.setdefault(transcript_id, []).append((start_ms, end_ms))
+    return offsets
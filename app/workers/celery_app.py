@@ -1,5 +1,6 @@
 from celery import Celery
 from celery.schedules import crontab
+from kombu import Queue
 from app.config import settings
 
 
@@ -10,21 +11,60 @@ celery_app = Celery(
 )
 
 
+# Uma fila por estágio do pipeline, para que downloads longos não
+# roubem os slots da transcrição (e vice-versa).
+QUEUE_DEFAULT = "default"
+QUEUE_INGEST = "ingest"
+QUEUE_DOWNLOAD = "download"
+QUEUE_TRANSCRIPTION = "transcription"
+QUEUE_CATEGORIZATION = "categorization"
+QUEUE_EMBEDDING = "embedding"
+
+
 celery_app.conf.update(
-    task_default_queue="default",
+    task_default_queue=QUEUE_DEFAULT,
+    task_queues=[
+        Queue(QUEUE_DEFAULT),
+        Queue(QUEUE_INGEST),
+        Queue(QUEUE_DOWNLOAD),
+        Queue(QUEUE_TRANSCRIPTION),
+        Queue(QUEUE_CATEGORIZATION),
+        Queue(QUEUE_EMBEDDING),
+    ],
+    task_routes={
+        "app.workers.tasks_download.*": {"queue": QUEUE_DOWNLOAD},
+        "app.workers.tasks_transcription.*": {"queue": QUEUE_TRANSCRIPTION},
+        "app.workers.tasks_categorization.*": {"queue": QUEUE_CATEGORIZATION},
+        "app.workers.tasks_embedding.*": {"queue": QUEUE_EMBEDDING},
+        "app.workers.tasks_ingest.*": {"queue": QUEUE_INGEST},
+        "app.workers.tasks_feeder.*": {"queue": QUEUE_INGEST},
+        "app.workers.pipeline_orchestrator.*": {"queue": QUEUE_INGEST},
+        "app.workers.tasks_storage.*": {"queue": QUEUE_DEFAULT},
+    },
     include=[
         "app.workers.tasks_test",
         "app.workers.tasks_download",
         "app.workers.tasks_transcription",
-        # "app.workers.tasks_categorization",
+        "app.workers.tasks_categorization",
+        "app.workers.tasks_embedding",
         "app.workers.pipeline_orchestrator",
-        "app.workers.tasks_ingest",  
+        "app.workers.tasks_ingest",
+        "app.workers.tasks_feeder",
+        "app.workers.tasks_storage",
     ],
 )
 
-if settings.enable_ingest_scheduler:
+if settings.ingest_feeder_enabled:
+    # Modo contínuo: completa as filas até o watermark a cada intervalo
+    celery_app.conf.beat_schedule = {
+        "feed-pipeline-continuous": {
+            "task": "app.workers.tasks_feeder.feed_pipeline",
+            "schedule": float(settings.ingest_feeder_interval_seconds),
+        },
+    }
+elif settings.enable_ingest_scheduler:
     # 03:00 da manhã (horário do servidor)
-        celery_app.conf.beat_schedule = {
+    celery_app.conf.beat_schedule = {
         "process-pending-urls-daily": {
             "task": "app.workers.tasks_ingest.process_pending_urls",
             "schedule": crontab(hour=3, minute=0),
@@ -32,4 +72,30 @@ if settings.enable_ingest_scheduler:
         },
     }
 else:
-    celery_app.conf.beat_schedule = {}
\ No newline at end of file
+    celery_app.conf.beat_schedule = {}
+
+if settings.categorization_enabled:
+    # Lotes incompletos não ficam esperando o buffer encher
+    celery_app.conf.beat_schedule["flush-categorization-buffer"] = {
+        "task": "app.workers.tasks_categorization.categorize_buffered",
+        "schedule": float(settings.categorization_flush_interval_seconds),
+        "kwargs": {"drain_partial": True},
+    }
+
+if settings.embedding_enabled:
+    celery_app.conf.beat_schedule["embed-pending-transcripts"] = {
+        "task": "app.workers.tasks_embedding.embed_pending_transcripts",
+        "schedule": float(settings.embedding_interval_seconds),
+    }
+
+if settings.storage_lifecycle_enabled:
+    celery_app.conf.beat_schedule.update({
+        "enforce-storage-quotas": {
+            "task": "app.workers.tasks_storage.enforce_storage_quotas",
+            "schedule": float(settings.storage_lifecycle_interval_seconds),
+        },
+        "reconcile-storage": {
+            "task": "app.workers.tasks_storage.reconcile_storage_task",
+            "schedule": crontab(hour=4, minute=0),
+        },
+    })
@@ -3,44 +3,62 @@ from celery import chain
 from app.workers.celery_app import celery_app
 from app.workers.tasks_download import download_video
 from app.workers.tasks_transcription import transcribe_video
-# FUTURO: quando tivermos a categorização pronta:
-# from app.workers.tasks_categorization import categorize_transcript
 
 
-@celery_app.task(name="app.workers.pipeline_orchestrator.start_url_pipeline")
-def start_url_pipeline(url_id: int) -> dict:
+def build_url_pipeline(url_id: int) -> chain:
     """
-    Orquestra o pipeline completo para uma URL.
+    Monta a chain de tasks de uma URL.
 
-    Fluxo atual (MVP):
-    - download_video(url_id) -> retorna video_id
-    - transcribe_video(video_id) -> retorna transcript_id
-
-    FUTURO (quando a categorização estiver pronta):
-    - categorize_transcript(transcript_id) -> retorna metadata_id
+    IMPORTANTE:
+    - download_video.s(url_id) recebe o url_id
+    - transcribe_video.s() recebe COMO ARGUMENTO o retorno da task anterior,
+      ou seja, o video_id retornado por download_video
 
-    A implementação aqui precisa ser estável, de forma que:
-    - hoje roda só download + transcrição
-    - amanhã possamos plugar categorização sem quebrar nada
+    A categorização não é um elo da chain: transcribe_video empilha o
+    transcript no buffer e ele é categorizado em lote
+    (app/workers/tasks_categorization.py).
     """
-
-    # Monta a chain de tasks.
-    # IMPORTANTE:
-    # - download_video.s(url_id) recebe o url_id
-    # - transcribe_video.s() recebe COMO ARGUMENTO o retorno da task anterior,
-    #   ou seja, o video_id retornado por download_video
-    workflow = chain(
+    return chain(
         download_video.s(url_id),
         transcribe_video.s(),
-        # FUTURO: quando existir categorize_transcript:
-        # categorize_transcript.s(),
     )
 
-    # Dispara o workflow. O resultado representa a ÚLTIMA task da chain.
-    async_result = workflow.delay()
 
-    return {
-        "pipeline_final_task_id": async_result.id,
-        "url_id": url_id,
-    }
+def dispatch_url_pipelines(url_ids: list[int]) -> list[dict]:
+    """
+    Publica as chains de um lote inteiro de URLs direto no broker, usando
+    uma única conexão de producer para todas as mensagens.
+
+    Substitui o antigo "uma task start_url_pipeline por URL", que custava
+    duas idas ao broker e um slot de worker só para montar a chain.
+
+    Retorna, para cada URL, o id da ÚLTIMA task da sua chain.
+    """
+    dispatched: list[dict] = []
+
+    with celery_app.producer_or_acquire() as producer:
+        for url_id in url_ids:
+            async_result = build_url_pipeline(url_id).apply_async(producer=producer)
+            dispatched.append(
+                {
+                    "url_id": url_id,
+                    "pipeline_final_task_id": async_result.id,
+                }
+            )
 
+    return dispatched
+
+
+@celery_app.task(name="app.workers.pipeline_orchestrator.start_url_pipeline")
+def start_url_pipeline(url_id: int) -> dict:
+    """
+    Orquestra o pipeline completo para uma URL.
+
+    Fluxo:
+    - download_video(url_id) -> retorna video_id
+    - transcribe_video(video_id) -> retorna transcript_id e empilha o
+      transcript para a categorização em lote (categorize_buffered)
+
+    Para lotes, prefira dispatch_url_pipelines (sem a task intermediária).
+    """
+    return dispatch_url_pipelines([url_id])[0]
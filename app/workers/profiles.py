@@ -0,0 +1,89 @@
+"""
+Perfis de worker Celery, um por estágio do pipeline.
+
+Cada perfil escuta só as filas do seu estágio e usa o tipo de pool que
+combina com o trabalho:
+- download: I/O de rede + ffmpeg em subprocesso -> pool de threads
+- transcription: esperando a API do Whisper -> pool de threads
+- categorization: CPU leve -> prefork
+- embedding: modelo na CPU, já multithread -> 1 processo
+- ingest: orquestração (claim, dispatch, feeder) -> prefork pequeno
+
+gevent/eventlet também servem para os estágios de I/O, mas exigem o pacote
+instalado; escolha com WORKER_<PERFIL>_POOL=gevent.
+
+Overrides por variável de ambiente:
+    WORKER_<PERFIL>_POOL, WORKER_<PERFIL>_CONCURRENCY, WORKER_<PERFIL>_PREFETCH
+"""
+
+import os
+from typing import NamedTuple
+
+from app.workers.celery_app import (
+    QUEUE_CATEGORIZATION,
+    QUEUE_DEFAULT,
+    QUEUE_DOWNLOAD,
+    QUEUE_EMBEDDING,
+    QUEUE_INGEST,
+    QUEUE_TRANSCRIPTION,
+)
+
+
+class WorkerProfile(NamedTuple):
+    queues: tuple[str, ...]
+    pool: str
+    concurrency: int
+    prefetch_multiplier: int
+
+
+PROFILES: dict[str, WorkerProfile] = {
+    "download": WorkerProfile((QUEUE_DOWNLOAD,), "threads", 8, 1),
+    "transcription": WorkerProfile((QUEUE_TRANSCRIPTION,), "threads", 8, 1),
+    "categorization": WorkerProfile((QUEUE_CATEGORIZATION,), "prefork", os.cpu_count() or 2, 4),
+    "embedding": WorkerProfile((QUEUE_EMBEDDING,), "prefork", 1, 1),
+    "ingest": WorkerProfile((QUEUE_INGEST, QUEUE_DEFAULT), "prefork", 2, 1),
+    # Dev / máquina única: tudo num worker só
+    "all": WorkerProfile(
+        (
+            QUEUE_DEFAULT,
+            QUEUE_INGEST,
+            QUEUE_DOWNLOAD,
+            QUEUE_TRANSCRIPTION,
+            QUEUE_CATEGORIZATION,
+            QUEUE_EMBEDDING,
+        ),
+        "prefork",
+        os.cpu_count() or 2,
+        1,
+    ),
+}
+
+
+def resolve_profile(name: str) -> WorkerProfile:
+    """
+    Perfil com os overrides de ambiente aplicados.
+    Levanta KeyError se o perfil não existir.
+    """
+    profile = PROFILES[name]
+    prefix = f"WORKER_{name.upper()}_"
+
+    return profile._replace(
+        pool=os.getenv(prefix + "POOL", profile.pool),
+        concurrency=int(os.getenv(prefix + "CONCURRENCY", profile.concurrency)),
+        prefetch_multiplier=int(
+            os.getenv(prefix + "PREFETCH", profile.prefetch_multiplier)
+        ),
+    )
+
+
+def worker_argv(name: str, loglevel: str = "info") -> list[str]:
+    profile = resolve_profile(name)
+    return [
+        "worker",
+        f"--loglevel={loglevel}",
+        f"--hostname={name}@%h",
+        f"--queues={','.join(profile.queues)}",
+        f"--pool={profile.pool}",
+        f"--concurrency={profile.concurrency}",
+        f"--prefetch-multiplier={profile.prefetch_multiplier}",
+    ]
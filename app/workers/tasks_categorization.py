@@ -1,6 +1,33 @@
+"""
+Estágio de categorização, em micro-lotes.
+
+Categorizar um transcript é barato (uma passada de regex), então o custo
+de uma task por URL (mensagem no broker, quatro SELECTs, um commit) seria
+maior que o trabalho em si. Em vez disso:
+
+- transcribe_video, depois do commit, empilha o transcript_id num buffer
+  no Redis (buffer_for_categorization)
+- quando o buffer chega a CATEGORIZATION_BATCH_SIZE, dispara
+  categorize_buffered; o beat também dispara a cada
+  CATEGORIZATION_FLUSH_INTERVAL_SECONDS para esvaziar lotes incompletos
+- cada lote carrega Transcript/Video em um SELECT, faz o upsert de todos os
+  VideoMetadata num INSERT ... ON CONFLICT e atualiza as Urls num UPDATE,
+  tudo numa transação
+
+O buffer não é a fonte da verdade: se um id se perder (Redis fora do ar,
+worker morto no meio do lote), a rodada do beat pega as Urls que ficaram
+em 'transcribed' sem VideoMetadata.
+"""
+
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional
 
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from app.categorization.engine import get_taxonomy
+from app.categorization.store import latest_per_video, mark_urls_categorized, upsert_video_metadata
 from app.workers.celery_app import celery_app
 from app.db.task_session import db_session
 from app.db.models_transcripts import Transcript
@@ -9,163 +36,270 @@ from app.db.models_urls import Url
 from app.db.models_metadata import VideoMetadata
 from app.db.models_jobs import Job
 from app.db.models_dlq import DeadLetter
+from app.config import settings
 
 
-def simple_categorization_logic(text: str) -> tuple[str, Optional[str], list[str]]:
-    """
-    LÓGICA DE CATEGORIZAÇÃO FAKE (placeholder de IA).
+CATEGORIZATION_BUFFER_KEY = "vsl:categorization:buffer"
+# Marca que já existe um flush na fila (evita disparar um por transcript
+# enquanto o buffer estiver cheio)
+CATEGORIZATION_FLUSH_KEY = "vsl:categorization:flush_queued"
+CATEGORIZATION_FLUSH_KEY_TTL = 60
+
 
-    Aqui a ideia não é ser inteligente ainda, é só:
-    - ter um lugar claro pra plugar a IA depois
-    - gerar dados minimamente úteis pro fluxo do pipeline
+def get_redis():
+    import redis
+
+    return redis.Redis.from_url(settings.redis_url)
+
+
+# ─────────────────────────────────────────────
+#  Buffer
+# ─────────────────────────────────────────────
+
+def buffer_for_categorization(transcript_ids: list[int]) -> None:
+    """
+    Empilha transcripts prontos para categorizar. Nunca levanta: se o Redis
+    falhar, a varredura do beat acha a Url em 'transcribed' depois.
     """
+    try:
+        client = get_redis()
+        pipe = client.pipeline()
+        pipe.rpush(CATEGORIZATION_BUFFER_KEY, *transcript_ids)
+        pipe.llen(CATEGORIZATION_BUFFER_KEY)
+        _, size = pipe.execute()
 
-    text_lower = text.lower()
+        if size >= settings.categorization_batch_size and client.set(
+            CATEGORIZATION_FLUSH_KEY, "1", nx=True, ex=CATEGORIZATION_FLUSH_KEY_TTL
+        ):
+            categorize_buffered.delay()
+    except Exception as e:
+        print(f"[categorization] aviso: falha ao empilhar {transcript_ids}: {e}")
 
-    main_category = "unknown"
-    sub_category: Optional[str] = None
-    tags: list[str] = ["vsl", "long_form"]
 
-    # Exemplos de heurísticas bem simples (só pra termos algo no banco)
-    if any(w in text_lower for w in ["emagrecer", "peso", "dieta", "barriga"]):
-        main_category = "saúde & emagrecimento"
-        tags.append("saude")
-    elif any(w in text_lower for w in ["dinheiro", "investir", "investimento", "ações", "bolsa"]):
-        main_category = "finanças & investimentos"
-        tags.append("financas")
-    elif any(w in text_lower for w in ["curso", "aula", "treinamento", "mentoria"]):
-        main_category = "educação & cursos"
-        tags.append("educacao")
+def pop_buffered(client, limit: int) -> list[int]:
+    """
+    Tira até `limit` ids do começo do buffer, atomicamente (MULTI/EXEC).
+    """
+    pipe = client.pipeline()
+    pipe.lrange(CATEGORIZATION_BUFFER_KEY, 0, limit - 1)
+    pipe.ltrim(CATEGORIZATION_BUFFER_KEY, limit, -1)
+    raw, _ = pipe.execute()
+    return list(dict.fromkeys(int(value) for value in raw))
 
-    # Só um exemplo de subcategoria
-    if "webinário" in text_lower or "webinar" in text_lower:
-        sub_category = "webinar"
-        tags.append("webinar")
 
-    # Garantir que tags não tenham duplicados
-    tags = list(dict.fromkeys(tags))
+def find_uncategorized(db: Session, limit: int) -> list[int]:
+    """
+    Transcripts de Urls que ficaram em 'transcribed' sem VideoMetadata
+    (ids perdidos do buffer, ou transcritos antes deste estágio existir).
+    """
+    rows = db.execute(
+        select(Transcript.id)
+        .join(Video, Video.id == Transcript.video_id)
+        .join(Url, Url.id == Video.url_id)
+        .outerjoin(VideoMetadata, VideoMetadata.video_id == Video.id)
+        .where(
+            Url.status == "transcribed",
+            Url.retry_count_categorization < settings.categorization_max_retries,
+            Transcript.status == "ready",
+            VideoMetadata.id.is_(None),
+        )
+        .order_by(Transcript.id)
+        .limit(limit)
+    )
+    return list(rows.scalars())
 
-    return main_category, sub_category, tags
 
+# ─────────────────────────────────────────────
+#  Lote
+# ─────────────────────────────────────────────
 
-@celery_app.task(name="app.workers.tasks_categorization.categorize_transcript")
-def categorize_transcript(transcript_id: int) -> Optional[int]:
+def categorize_transcripts(db: Session, transcript_ids: Iterable[int]) -> dict:
     """
-    Task de categorização de VSL com base na transcrição.
-
-    Fluxo:
-    - Busca Transcript no banco
-    - Busca Video e Url relacionados
-    - Cria Job 'categorization'
-    - Roda lógica de categorização (placeholder de IA)
-    - Cria/atualiza VideoMetadata
-    - Atualiza Url para 'categorized'
+    Categoriza um lote inteiro na sessão recebida (o commit é do chamador):
+    um SELECT, um upsert de VideoMetadata, um UPDATE de Urls e um INSERT
+    de Jobs, qualquer que seja o tamanho do lote.
     """
+    started_at = datetime.utcnow()
+    start = time.monotonic()
+
+    rows = db.execute(
+        select(Transcript.id, Transcript.video_id, Transcript.full_text, Video.url_id)
+        .join(Video, Video.id == Transcript.video_id)
+        .where(Transcript.id.in_(list(transcript_ids)))
+        .order_by(Transcript.id)
+    ).all()
+
+    rows = latest_per_video(rows)
+    if not rows:
+        return {"categorized": 0, "seconds": 0.0}
+
+    taxonomy = get_taxonomy()
+    results = taxonomy.categorize_batch(row.full_text or "" for row in rows)
+
+    upsert_video_metadata(db, [row.video_id for row in rows], results, taxonomy.version)
+    mark_urls_categorized(db, [row.url_id for row in rows if row.url_id is not None])
+
+    seconds = time.monotonic() - start
+    finished_at = datetime.utcnow()
+    metrics = {
+        "batch_size": len(rows),
+        "batch_seconds": round(seconds, 3),
+        "taxonomy_version": taxonomy.version,
+    }
+    db.execute(
+        insert(Job),
+        [
+            {
+                "job_type": "categorization",
+                "resource_type": "transcript",
+                "resource_id": row.id,
+                "status": "success",
+                "metrics": metrics,
+                "created_at": started_at,
+                "started_at": started_at,
+                "finished_at": finished_at,
+            }
+            for row in rows
+        ],
+    )
+
+    return {"categorized": len(rows), "seconds": seconds}
+
 
+def record_batch_failure(transcript_ids: list[int], error_msg: str) -> None:
+    """
+    Job 'failed' + DLQ para cada transcript do lote, numa transação nova (a
+    do lote já foi desfeita). retry_count_categorization limita quantas
+    vezes a varredura tenta de novo.
+    """
+    now = datetime.utcnow()
     with db_session() as db:
-        # 1) Buscar o transcript
-        transcript: Transcript = (
-            db.query(Transcript).filter(Transcript.id == transcript_id).first()
+        db.execute(
+            insert(Job),
+            [
+                {
+                    "job_type": "categorization",
+                    "resource_type": "transcript",
+                    "resource_id": transcript_id,
+                    "status": "failed",
+                    "error_message": error_msg,
+                    "created_at": now,
+                    "started_at": now,
+                    "finished_at": now,
+                }
+                for transcript_id in transcript_ids
+            ],
+        )
+        db.execute(
+            insert(DeadLetter),
+            [
+                {
+                    "stage": "categorization",
+                    "resource_type": "transcript",
+                    "resource_id": transcript_id,
+                    "reason": "categorization_exception",
+                    "error_payload": {"error": error_msg},
+                }
+                for transcript_id in transcript_ids
+            ],
+        )
+        url_ids = (
+            select(Video.url_id)
+            .join(Transcript, Transcript.video_id == Video.id)
+            .where(Transcript.id.in_(transcript_ids))
         )
-        if not transcript:
-            print(f"[categorize_transcript] Transcript id={transcript_id} não encontrado.")
-            return None
-
-        # 2) Buscar Video e Url relacionados
-        video: Video = db.query(Video).filter(Video.id == transcript.video_id).first()
-        if not video:
-            print(
-                f"[categorize_transcript] Video id={transcript.video_id} "
-                f"não encontrado para transcript_id={transcript.id}"
-            )
-            return None
-
-        url: Url = db.query(Url).filter(Url.id == video.url_id).first()
-
-        # 3) Criar Job
-        job = Job(
-            job_type="categorization",
-            resource_type="transcript",
-            resource_id=transcript.id,
-            status="running",
-            created_at=datetime.utcnow(),
-            started_at=datetime.utcnow(),
+        db.execute(
+            update(Url)
+            .where(Url.id.in_(url_ids))
+            .values(retry_count_categorization=Url.retry_count_categorization + 1)
         )
-        db.add(job)
-
-        try:
-            # ─────────────────────────────────────────────
-            # LÓGICA DE CATEGORIZAÇÃO (FAKE / PLACEHOLDER)
-            # ─────────────────────────────────────────────
-            text = transcript.full_text or ""
-            main_category, sub_category, tags = simple_categorization_logic(text)
-
-            # 4) Criar ou atualizar VideoMetadata
-            metadata: Optional[VideoMetadata] = (
-                db.query(VideoMetadata)
-                .filter(VideoMetadata.video_id == video.id)
-                .first()
-            )
-
-            if metadata is None:
-                metadata = VideoMetadata(
-                    video_id=video.id,
-                    main_category=main_category,
-                    sub_category=sub_category,
-                    tags=tags,
-                    model_name="rule_based_placeholder",
-                    model_version="v0",
-                    status="ready",
-                )
-                db.add(metadata)
-            else:
-                metadata.main_category = main_category
-                metadata.sub_category = sub_category
-                metadata.tags = tags
-                metadata.model_name = "rule_based_placeholder"
-                metadata.model_version = "v0"
-                metadata.status = "ready"
-                db.add(metadata)
-
-            # 5) Atualizar URL para 'categorized'
-            if url:
-                url.status = "categorized"
-                db.add(url)
-
-            # 6) Finalizar Job
-            job.status = "success"
-            job.finished_at = datetime.utcnow()
-            db.add(job)
-
-            print(
-                f"[categorize_transcript] Sucesso para transcript_id={transcript.id}, "
-                f"video_id={video.id}, main_category={main_category!r}"
-            )
-            return metadata.id
-
-        except Exception as e:
-            error_msg = str(e)
-            print(
-                f"[categorize_transcript] ERRO para transcript_id={transcript.id}: "
-                f"{error_msg}"
-            )
-
-            # Atualiza Job
-            job.status = "failed"
-            job.error_message = error_msg
-            job.finished_at = datetime.utcnow()
-            db.add(job)
-
-            # Registra na DLQ
-            dlq_entry = DeadLetter(
-                stage="categorization",
-                resource_type="transcript",
-                resource_id=transcript.id,
-                reason="categorization_exception",
-                error_payload={"error": error_msg},
-            )
-            db.add(dlq_entry)
-
-            # Não mexemos no status da URL aqui (pode ficar 'transcribed')
-            raise
 
+
+def run_batch(transcript_ids: list[int]) -> dict:
+    try:
+        with db_session() as db:
+            return categorize_transcripts(db, transcript_ids)
+    except Exception as e:
+        error_msg = str(e)
+        print(f"[categorization] ERRO no lote de {len(transcript_ids)} transcripts: {error_msg}")
+        record_batch_failure(transcript_ids, error_msg)
+        return {"categorized": 0, "failed": len(transcript_ids), "seconds": 0.0}
+
+
+# ─────────────────────────────────────────────
+#  Tasks
+# ─────────────────────────────────────────────
+
+@celery_app.task(name="app.workers.tasks_categorization.categorize_buffered")
+def categorize_buffered(drain_partial: bool = False) -> dict:
+    """
+    Esvazia o buffer em lotes de CATEGORIZATION_BATCH_SIZE.
+
+    - disparada pelo buffer cheio: processa só lotes completos (o resto
+      espera juntar mais)
+    - disparada pelo beat (drain_partial=True): processa tudo, inclusive o
+      último lote incompleto, e depois varre as Urls esquecidas em
+      'transcribed'
+    """
+    batch_size = settings.categorization_batch_size
+    client = get_redis()
+    # Libera o próximo disparo por buffer cheio
+    client.delete(CATEGORIZATION_FLUSH_KEY)
+
+    summary = {"batches": 0, "categorized": 0, "failed": 0, "swept": 0, "seconds": 0.0}
+
+    def run(transcript_ids: list[int]) -> None:
+        result = run_batch(transcript_ids)
+        summary["batches"] += 1
+        summary["categorized"] += result["categorized"]
+        summary["failed"] += result.get("failed", 0)
+        summary["seconds"] += result["seconds"]
+
+    while drain_partial or client.llen(CATEGORIZATION_BUFFER_KEY) >= batch_size:
+        transcript_ids = pop_buffered(client, batch_size)
+        if not transcript_ids:
+            break
+        run(transcript_ids)
+
+    if drain_partial:
+        with db_session() as db:
+            forgotten = find_uncategorized(db, batch_size)
+        if forgotten:
+            summary["swept"] = len(forgotten)
+            run(forgotten)
+
+    if summary["batches"]:
+        rate = summary["categorized"] / summary["seconds"] if summary["seconds"] else 0.0
+        print(
+            f"[categorization] {summary['categorized']} categorizados em "
+            f"{summary['batches']} lote(s) ({rate:.0f}/s), falhas={summary['failed']}, "
+            f"varredura={summary['swept']}"
+        )
+    return summary
+
+
+@celery_app.task(name="app.workers.tasks_categorization.categorize_transcript")
+def categorize_transcript(transcript_id: int) -> Optional[int]:
+    """
+    Categoriza um transcript avulso, fora do buffer (reprocessamento manual).
+    Mesmo caminho do lote; retorna o id do VideoMetadata.
+    """
+    try:
+        with db_session() as db:
+            summary = categorize_transcripts(db, [transcript_id])
+            if not summary["categorized"]:
+                print(f"[categorize_transcript] Transcript id={transcript_id} não encontrado.")
+                return None
+
+            metadata_id = db.execute(
+                select(VideoMetadata.id)
+                .join(Transcript, Transcript.video_id == VideoMetadata.video_id)
+                .where(Transcript.id == transcript_id)
+            ).scalar_one()
+    except Exception as e:
+        print(f"[categorize_transcript] ERRO para transcript_id={transcript_id}: {e}")
+        record_batch_failure([transcript_id], str(e))
+        raise
+
+    print(f"[categorize_transcript] Sucesso para transcript_id={transcript_id}")
+    return metadata_id
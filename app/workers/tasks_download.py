@@ -1,8 +1,10 @@
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional
-import subprocess
+from typing import Iterator, Optional
 from pathlib import Path
-from uuid import uuid4
+
+from sqlalchemy import update
 
 from app.workers.celery_app import celery_app
 from app.db.task_session import db_session
@@ -10,21 +12,176 @@ from app.db.models_urls import Url
 from app.db.models_videos import Video
 from app.db.models_jobs import Job
 from app.db.models_dlq import DeadLetter
+from app.media.audio import TRANSCRIPTION_AUDIO_FORMAT, encode_transcription_audio
+from app.media.hls import UnsupportedPlaylistError, download_hls
+from app.media.process import (
+    MediaRunResult,
+    ProgressCallback,
+    probe_duration,
+    run_ffmpeg,
+    throughput_metrics,
+)
+from app.media.telemetry import ProgressReporter
+from app.media.storage import new_temp_path, partial_work_dir, resolve_path, store_file
 from app.config import settings
 
 
+# Intervalo do heartbeat de um download em andamento (ver
+# download_heartbeat); DOWNLOAD_LEASE_SECONDS precisa passar com folga
+DOWNLOAD_HEARTBEAT_SECONDS = 60
+
+# Status a partir dos quais um download pode começar. 'downloading' fica de
+# fora: outro worker está baixando (ou morreu, e o lease resolve)
+DOWNLOAD_STARTABLE_STATUSES = ("pending_ingest", "queued", "download_failed")
+
+
+def start_download(db, url_id: int) -> bool:
+    """
+    Passa a Url para 'downloading' (UPDATE condicional: só um worker
+    consegue). Quem chama commita antes de começar o download, para o
+    feeder contar o download em andamento e o lease de 'queued' não
+    devolver a Url ao pool no meio dele.
+    """
+    result = db.execute(
+        update(Url)
+        .where(Url.id == url_id, Url.status.in_(DOWNLOAD_STARTABLE_STATUSES))
+        .values(status="downloading", updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return bool(result.rowcount)
+
+
+@contextmanager
+def download_heartbeat(url_id: int) -> Iterator[None]:
+    """
+    Enquanto o download roda, renova Url.updated_at a cada
+    DOWNLOAD_HEARTBEAT_SECONDS numa transação curta (o lease de
+    'downloading', ver release_stale_downloads). Se o worker morre, a Url
+    para de ser renovada e é dada como falha.
+    """
+    stop = threading.Event()
+
+    def beat() -> None:
+        while not stop.wait(DOWNLOAD_HEARTBEAT_SECONDS):
+            try:
+                with db_session() as db:
+                    db.execute(
+                        update(Url)
+                        .where(Url.id == url_id, Url.status == "downloading")
+                        .values(updated_at=datetime.utcnow())
+                    )
+            except Exception as e:
+                print(f"[download_video] aviso: falha no heartbeat de url_id={url_id}: {e}")
+
+    thread = threading.Thread(target=beat, name=f"download-heartbeat-{url_id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def download_with_ffmpeg(
+    raw_url: str,
+    output_path: Path,
+    audio_output: bool = False,
+    on_progress: Optional[ProgressCallback] = None,
+) -> MediaRunResult:
+    """
+    Caminho legado: ffmpeg baixa o .m3u8 sozinho (um segmento por vez).
+    Usado com HLS_DOWNLOADER=ffmpeg ou quando o downloader nativo não
+    suporta o playlist (ex.: segmentos criptografados).
+    """
+    if audio_output:
+        return encode_transcription_audio(raw_url, output_path, on_progress)
+
+    args = [
+        "-y",
+        "-i",
+        raw_url,
+        "-c",
+        "copy",
+        str(output_path),
+    ]
+    return run_ffmpeg(args, on_progress=on_progress)
+
+
 @celery_app.task(name="app.workers.tasks_download.download_video")
 def download_video(url_id: int) -> Optional[int]:
     """
-    Task de download de vídeo.
+    Task de download de vídeo (ver _download_video).
+    """
+    try:
+        return _download_video(url_id)
+    except Exception as e:
+        record_download_failure(url_id, str(e))
+        raise
+
+
+def record_download_failure(url_id: int, error_msg: str) -> None:
+    """
+    Job 'failed' + DLQ e Url em 'download_failed', numa transação nova (a
+    do download já foi desfeita). O feeder devolve a Url à fila até
+    DOWNLOAD_MAX_RETRIES tentativas (requeue_failed_downloads).
+    """
+    now = datetime.utcnow()
+    with db_session() as db:
+        db.add(
+            Job(
+                job_type="download",
+                resource_type="url",
+                resource_id=url_id,
+                status="failed",
+                error_message=error_msg,
+                created_at=now,
+                started_at=now,
+                finished_at=now,
+            )
+        )
+        db.add(
+            DeadLetter(
+                stage="download",
+                resource_type="url",
+                resource_id=url_id,
+                reason="download_exception",
+                error_payload={"error": error_msg},
+            )
+        )
+        db.execute(
+            update(Url)
+            .where(Url.id == url_id)
+            .values(
+                status="download_failed",
+                retry_count_download=Url.retry_count_download + 1,
+                last_error=error_msg,
+                updated_at=now,
+            )
+        )
+
+
+def _download_video(url_id: int) -> Optional[int]:
+    """
+    Download de vídeo.
 
     Fluxo:
     - Busca a URL no banco
-    - Cria um Job de tipo 'download'
     - Se já existir vídeo armazenado para essa URL, reutiliza (idempotência)
-    - Senão, baixa o vídeo com ffmpeg, salva em disco e cria registro em Video
-    - Atualiza status da Url e do Job
-    - Em caso de erro, registra em DLQ e marca Url como 'download_failed'
+    - Senão, passa a Url para 'downloading' numa transação curta e commita
+      antes de baixar; um heartbeat renova o lease enquanto o download roda
+    - Cria um Job de tipo 'download'
+    - Senão, baixa o HLS (downloader nativo, segmentos em paralelo; ou
+      ffmpeg), salva em disco e cria registro em Video
+    - O arquivo é guardado pelo hash do conteúdo (app/media/storage.py):
+      o mesmo VSL vindo de outra URL não é gravado de novo
+    - O download HLS nativo é retomável: os segmentos ficam em
+      partial/<url_id> até o fim, e um retry só baixa os que faltam
+    - Com DOWNLOAD_MODE=audio, grava direto o mp3 pronto para transcrição
+      (numa passada, sem guardar o mp4); o Video fica com format "mp3"
+    - Atualiza status da Url e do Job; o progresso do ffmpeg vai para o
+      Redis enquanto roda e o throughput final para Job.metrics
+    - Em caso de erro a transação é desfeita; download_video registra a
+      falha (DLQ, Url em 'download_failed') numa transação nova
     """
 
     with db_session() as db:
@@ -34,18 +191,7 @@ def download_video(url_id: int) -> Optional[int]:
             print(f"[download_video] URL id={url_id} não encontrada.")
             return None
 
-        # 2) Criar Job
-        job = Job(
-            job_type="download",
-            resource_type="url",
-            resource_id=url.id,
-            status="running",
-            created_at=datetime.utcnow(),
-            started_at=datetime.utcnow(),
-        )
-        db.add(job)
-
-        # 2.1) Verificar se já existe Video armazenado para essa URL
+        # 1.1) Verificar se já existe Video armazenado para essa URL
         existing_video: Optional[Video] = (
             db.query(Video)
             .filter(
@@ -65,85 +211,142 @@ def download_video(url_id: int) -> Optional[int]:
             url.status = "downloaded"
             db.add(url)
 
-            job.status = "success"
-            job.finished_at = datetime.utcnow()
-            db.add(job)
+            existing_video.last_accessed_at = datetime.utcnow()
+            db.add(existing_video)
+
+            db.add(
+                Job(
+                    job_type="download",
+                    resource_type="url",
+                    resource_id=url.id,
+                    status="success",
+                    created_at=datetime.utcnow(),
+                    started_at=datetime.utcnow(),
+                    finished_at=datetime.utcnow(),
+                )
+            )
 
             return existing_video.id
 
-        # 3) Atualizar status da URL para 'downloading'
-        url.status = "downloading"
-        db.add(url)
+        # 1.2) Passar a URL para 'downloading' (commitado no fim deste bloco)
+        if not start_download(db, url.id):
+            print(
+                f"[download_video] url_id={url.id} está '{url.status}'; "
+                f"outro worker já está baixando ou a mensagem é repetida. Pulando."
+            )
+            return None
+
+    with db_session() as db:
+        url = db.query(Url).filter(Url.id == url_id).one()
+
+        # 2) Criar Job
+        job = Job(
+            job_type="download",
+            resource_type="url",
+            resource_id=url.id,
+            status="running",
+            created_at=datetime.utcnow(),
+            started_at=datetime.utcnow(),
+        )
+        db.add(job)
+
+        output_path: Optional[Path] = None
+        reporter = ProgressReporter("download", url.id)
 
         try:
             # ─────────────────────────────────────────────
-            # LÓGICA REAL DE DOWNLOAD COM FFMPEG
+            # LÓGICA REAL DE DOWNLOAD (HLS NATIVO OU FFMPEG)
             # ─────────────────────────────────────────────
 
-            # 1) Garantir que a pasta de storage existe
-            storage_dir = Path(settings.video_storage_path)
-            storage_dir.mkdir(parents=True, exist_ok=True)
-
-            # 2) Gerar um nome de arquivo único
-            file_name = f"{uuid4().hex}.mp4"
-            output_path = storage_dir / file_name
-
-            # 3) Montar comando ffmpeg para baixar o .m3u8 e salvar como .mp4
-            cmd = [
-                "ffmpeg",
-                "-y",
-                "-i",
-                url.raw_url,
-                "-c",
-                "copy",
-                str(output_path),
-            ]
-
-            print(f"[download_video] Iniciando ffmpeg para url_id={url.id}")
-            subprocess.run(
-                cmd,
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-            print(f"[download_video] ffmpeg finalizado para url_id={url.id}")
+            # 1-2) Arquivo temporário dentro do storage; o nome final só é
+            #      conhecido depois do download (hash do conteúdo)
+            audio_output = settings.download_mode == "audio"
+            file_format = TRANSCRIPTION_AUDIO_FORMAT if audio_output else "mp4"
+            output_path = new_temp_path(file_format)
 
-            # 4) Calcular tamanho do arquivo
-            filesize_bytes = None
+            # O heartbeat renova o lease de 'downloading' enquanto baixa
+            with download_heartbeat(url.id):
+                # 3) Baixar o .m3u8 e salvar como .mp4 (ou .mp3 no modo áudio)
+                if settings.hls_downloader == "native":
+                    try:
+                        print(f"[download_video] Iniciando download HLS nativo para url_id={url.id}")
+                        stats = download_hls(
+                            url.raw_url,
+                            output_path,
+                            # No modo áudio não faz sentido baixar vídeo em alta
+                            rendition_policy="transcribe" if audio_output else None,
+                            audio_output=audio_output,
+                            work_dir=partial_work_dir(url.id),
+                            on_progress=reporter,
+                        )
+                        job.metrics = {
+                            **throughput_metrics(stats.bytes, stats.seconds, stats.playlist_duration),
+                            "downloader": "native",
+                            "segments": stats.segments,
+                            "resumed_segments": stats.resumed_segments,
+                        }
+                        print(
+                            f"[download_video] HLS nativo finalizado para url_id={url.id}: "
+                            f"{stats.segments} segmentos ({stats.resumed_segments} retomados), "
+                            f"{stats.bytes} bytes em {stats.seconds:.1f}s "
+                            f"(policy={settings.hls_rendition_policy}, audio_only={stats.audio_only})"
+                        )
+                    except UnsupportedPlaylistError as e:
+                        print(
+                            f"[download_video] Playlist não suportado pelo downloader nativo "
+                            f"({e}); usando ffmpeg para url_id={url.id}"
+                        )
+                        result = download_with_ffmpeg(url.raw_url, output_path, audio_output, reporter)
+                        job.metrics = {**result.as_metrics(), "downloader": "ffmpeg"}
+                else:
+                    print(f"[download_video] Iniciando ffmpeg para url_id={url.id}")
+                    result = download_with_ffmpeg(url.raw_url, output_path, audio_output, reporter)
+                    job.metrics = {**result.as_metrics(), "downloader": "ffmpeg"}
+                    print(
+                        f"[download_video] ffmpeg finalizado para url_id={url.id}: "
+                        f"{result.total_size} bytes em {result.elapsed_seconds:.1f}s "
+                        f"(realtime_factor={result.realtime_factor})"
+                    )
+
+            # 4) Mover para o endereço de conteúdo (sha256, sharded).
+            #    Se o mesmo conteúdo já existe, o temporário é descartado.
+            #    O lock do storage_key fica com esta transação até o commit
+            #    do Video (ver app/media/storage.py)
+            storage_key, deduplicated = store_file(db, output_path, file_format)
+            stored_path = resolve_path(storage_key)
+
+            filesize_bytes = stored_path.stat().st_size
             duration_seconds = None
 
-            if output_path.exists():
-                filesize_bytes = output_path.stat().st_size
+            same_content: Optional[Video] = None
+            if deduplicated:
+                same_content = (
+                    db.query(Video)
+                    .filter(Video.storage_key == storage_key)
+                    .order_by(Video.id.desc())
+                    .first()
+                )
+                print(
+                    f"[download_video] Conteúdo já armazenado ({storage_key}); "
+                    f"url_id={url.id} vira só um registro de metadados"
+                )
 
+            if same_content is not None and same_content.duration_seconds is not None:
+                duration_seconds = same_content.duration_seconds
+            else:
                 # Tentar pegar duração com ffprobe (opcional, mas útil)
                 try:
-                    probe_cmd = [
-                        "ffprobe",
-                        "-v",
-                        "error",
-                        "-show_entries",
-                        "format=duration",
-                        "-of",
-                        "default=noprint_wrappers=1:nokey=1",
-                        str(output_path),
-                    ]
-                    probe_result = subprocess.run(
-                        probe_cmd,
-                        check=True,
-                        capture_output=True,
-                        text=True,
-                    )
-                    duration_str = probe_result.stdout.strip()
-                    if duration_str:
-                        duration_seconds = int(float(duration_str))
+                    probed = probe_duration(str(stored_path))
+                    if probed is not None:
+                        duration_seconds = int(probed)
                 except Exception as e:
                     print(f"[download_video] aviso: falha ao obter duração: {e}")
 
             # 5) Criar registro do vídeo no banco
             video = Video(
                 url_id=url.id,
-                storage_key=str(output_path),
-                format="mp4",
+                storage_key=storage_key,
+                format=file_format,
                 filesize_bytes=filesize_bytes,
                 duration_seconds=duration_seconds,
                 status="stored",
@@ -165,28 +368,13 @@ def download_video(url_id: int) -> Optional[int]:
             return video.id
 
         except Exception as e:
-            # Em caso de erro, registramos tudo
-            error_msg = str(e)
-            print(f"[download_video] ERRO para url_id={url.id}: {error_msg}")
-
-            # Atualiza URL
-            url.status = "download_failed"
-            db.add(url)
-
-            # Atualiza Job
-            job.status = "failed"
-            job.error_message = error_msg
-            job.finished_at = datetime.utcnow()
-            db.add(job)
-
-            # Registra na DLQ
-            dlq_entry = DeadLetter(
-                stage="download",
-                resource_type="url",
-                resource_id=url.id,
-                reason="download_exception",
-                error_payload={"error": error_msg},
-            )
-            db.add(dlq_entry)
-
+            # Não deixa o temporário parcial para trás (os segmentos já
+            # baixados ficam em partial/<url_id> para o retry). O db_session
+            # desfaz esta transação; a falha é gravada em download_video
+            if output_path is not None and output_path.exists():
+                output_path.unlink()
+            print(f"[download_video] ERRO para url_id={url_id}: {e}")
             raise
+
+        finally:
+            reporter.clear()
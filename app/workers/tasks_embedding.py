@@ -0,0 +1,96 @@
+"""
+Estágio de embeddings (busca por VSLs parecidos, app/similarity).
+
+Roda pelo beat a cada EMBEDDING_INTERVAL_SECONDS: procura transcrições
+prontas ainda sem vetor do EMBEDDER atual e vetoriza em lotes de
+EMBEDDING_TRANSCRIPTS_PER_BATCH, com um commit por lote. O banco é a fila:
+nada se perde se o worker cair, e trocar de modelo faz todo o acervo ser
+vetorizado de novo aos poucos. A API enxerga os vetores novos na próxima
+atualização do índice.
+"""
+
+import time
+
+from app.workers.celery_app import celery_app
+from app.db.task_session import db_session
+from app.db.models_transcripts import Transcript
+from app.similarity.embedders import get_embedder
+from app.similarity.store import find_unembedded, save_embeddings
+from app.workers.tasks_feeder import get_redis, release_lock
+from app.config import settings
+
+
+# Uma rodada por vez, mesmo com vários workers de embedding
+EMBEDDING_LOCK_KEY = "vsl:embedding:lock"
+# O TTL é renovado a cada lote, então só precisa cobrir um lote (e a carga
+# do modelo na primeira rodada do processo)
+EMBEDDING_LOCK_MIN_TTL_SECONDS = 600
+
+
+def refresh_lock(lock, ttl: int) -> bool:
+    """
+    Renova o TTL do lock. False se ele expirou e outro worker já o pegou:
+    a rodada deve parar (a outra segue de onde esta parou).
+    """
+    from redis.exceptions import LockError
+
+    try:
+        lock.extend(ttl, replace_ttl=True)
+        return True
+    except LockError as e:
+        print(f"[lock] aviso: lock {lock.name!r} perdido no meio da rodada: {e}")
+        return False
+
+
+@celery_app.task(name="app.workers.tasks_embedding.embed_pending_transcripts")
+def embed_pending_transcripts() -> dict:
+    client = get_redis()
+    # Lock com token: o release (compare-and-delete) de uma rodada cujo TTL
+    # expirou não apaga o lock de outra
+    lock_ttl = max(settings.embedding_interval_seconds * 10, EMBEDDING_LOCK_MIN_TTL_SECONDS)
+    lock = client.lock(EMBEDDING_LOCK_KEY, timeout=lock_ttl, blocking=False)
+    if not lock.acquire():
+        return {"skipped": True, "reason": "outra rodada em execução"}
+
+    try:
+        embedder = get_embedder()
+        batch_size = settings.embedding_transcripts_per_batch
+        embedded = 0
+        start = time.monotonic()
+
+        while embedded < settings.embedding_max_per_run:
+            if not refresh_lock(lock, lock_ttl):
+                break
+
+            with db_session() as db:
+                pending = find_unembedded(db, embedder.name, batch_size)
+                if not pending:
+                    break
+
+                transcript_ids = [transcript_id for transcript_id, _ in pending]
+                texts = dict(
+                    db.query(Transcript.id, Transcript.full_text)
+                    .filter(Transcript.id.in_(transcript_ids))
+                    .all()
+                )
+                vectors = embedder.embed([texts.get(transcript_id) or "" for transcript_id in transcript_ids])
+                save_embeddings(
+                    db,
+                    embedder.name,
+                    settings.embedding_storage_dtype,
+                    transcript_ids,
+                    [video_id for _, video_id in pending],
+                    vectors,
+                )
+            embedded += len(pending)
+
+        seconds = time.monotonic() - start
+        if embedded:
+            print(
+                f"[embed_pending_transcripts] {embedded} transcrições vetorizadas com "
+                f"{embedder.name} em {seconds:.1f}s ({embedded / seconds:.1f}/s)"
+            )
+        return {"model": embedder.name, "embedded": embedded, "seconds": seconds}
+
+    finally:
+        release_lock(lock)
@@ -0,0 +1,279 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, select, update
+
+from app.workers.celery_app import celery_app, QUEUE_DOWNLOAD, QUEUE_TRANSCRIPTION
+from app.db.task_session import db_session
+from app.db.models_urls import Url
+from app.db.models_videos import Video
+from app.workers.pipeline_orchestrator import dispatch_url_pipelines
+from app.workers.tasks_ingest import process_pending_urls, release_expired_leases
+from app.workers.tasks_transcription import transcribe_video
+from app.config import settings
+
+
+# Lock para que só um feeder rode por vez, mesmo com beat em vários nós
+FEEDER_LOCK_KEY = "vsl:feeder:lock"
+# O TTL só vale se o feeder morrer segurando o lock; precisa passar com
+# folga da rodada mais lenta (claim + publicação de feeder_max_batch chains)
+FEEDER_LOCK_MIN_TTL_SECONDS = 300
+
+
+def stage_limits() -> dict[str, dict]:
+    """
+    Para cada estágio: quais status de Url contam como "em andamento"
+    naquele estágio e qual o watermark (máximo em andamento).
+    """
+    return {
+        "download": {
+            "statuses": ("queued", "downloading"),
+            "watermark": settings.feeder_download_watermark,
+        },
+        "transcription": {
+            "statuses": ("downloaded",),
+            "watermark": settings.feeder_transcription_watermark,
+        },
+    }
+
+
+def watched_queues() -> list[str]:
+    """
+    Filas do broker cuja profundidade limita o feeder.
+    """
+    return [QUEUE_DOWNLOAD, QUEUE_TRANSCRIPTION]
+
+
+def get_redis():
+    import redis
+
+    return redis.Redis.from_url(settings.redis_url)
+
+
+def release_lock(lock) -> None:
+    """
+    Solta um redis.lock.Lock. O release só apaga a chave se o token ainda
+    for o nosso (compare-and-delete em Lua); se o TTL já expirou e outro
+    processo pegou o lock, não mexe nele.
+    """
+    from redis.exceptions import LockError
+
+    try:
+        lock.release()
+    except LockError as e:
+        print(f"[lock] aviso: lock {lock.name!r} expirou antes do fim da rodada: {e}")
+
+
+def broker_queue_depth(client, queues: list[str]) -> int:
+    """
+    No broker Redis do Celery cada fila é uma lista com o mesmo nome,
+    então LLEN dá o número de mensagens aguardando worker.
+    """
+    pipe = client.pipeline()
+    for queue in queues:
+        pipe.llen(queue)
+    return sum(pipe.execute())
+
+
+def in_flight_by_stage(db) -> dict[str, int]:
+    limits = stage_limits()
+    statuses = [status for stage in limits.values() for status in stage["statuses"]]
+
+    counts = dict(
+        db.query(Url.status, func.count(Url.id))
+        .filter(Url.status.in_(statuses))
+        .group_by(Url.status)
+        .all()
+    )
+
+    return {
+        name: sum(counts.get(status, 0) for status in stage["statuses"])
+        for name, stage in limits.items()
+    }
+
+
+def requeue_failed_downloads(db, limit: int) -> list[int]:
+    """
+    Devolve à fila de download até `limit` Urls em 'download_failed' que
+    ainda têm tentativas (retry_count_download abaixo de
+    DOWNLOAD_MAX_RETRIES): voltam para 'queued' com claimed_at (o lease da
+    ingestão vale para elas também) e retorna os url_ids a despachar depois
+    do commit. As que esgotaram as tentativas ficam paradas (ver DLQ).
+    """
+    if limit <= 0:
+        return []
+
+    url_ids = list(
+        db.execute(
+            select(Url.id)
+            .where(
+                Url.status == "download_failed",
+                Url.retry_count_download < settings.download_max_retries,
+            )
+            .order_by(Url.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars()
+    )
+    if not url_ids:
+        return []
+
+    now = datetime.utcnow()
+    db.execute(
+        update(Url)
+        .where(Url.id.in_(url_ids))
+        .values(status="queued", claimed_at=now, updated_at=now)
+    )
+    return url_ids
+
+
+def requeue_failed_transcriptions(db, limit: int) -> list[int]:
+    """
+    Devolve à fila de transcrição até `limit` Urls em 'transcription_failed'
+    que ainda têm tentativas (retry_count_transcription abaixo de
+    TRANSCRIPTION_MAX_RETRIES): voltam para 'downloaded' e retorna o
+    video_id (o Video armazenado mais recente de cada Url) a despachar
+    depois do commit. As que esgotaram as tentativas ficam paradas (ver
+    DLQ).
+
+    Url sem Video armazenado (nunca teve, ou foi removido pela evicção) não
+    tem o que transcrever: vai para 'download_failed', e o retry de
+    download baixa de novo.
+    """
+    if limit <= 0:
+        return []
+
+    url_ids = list(
+        db.execute(
+            select(Url.id)
+            .where(
+                Url.status == "transcription_failed",
+                Url.retry_count_transcription < settings.transcription_max_retries,
+            )
+            .order_by(Url.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).scalars()
+    )
+    if not url_ids:
+        return []
+
+    video_by_url = dict(
+        db.execute(
+            select(Video.url_id, func.max(Video.id))
+            .where(Video.url_id.in_(url_ids), Video.status == "stored")
+            .group_by(Video.url_id)
+        ).all()
+    )
+    without_video = [url_id for url_id in url_ids if url_id not in video_by_url]
+
+    if video_by_url:
+        db.execute(
+            update(Url).where(Url.id.in_(list(video_by_url))).values(status="downloaded")
+        )
+    if without_video:
+        db.execute(
+            update(Url)
+            .where(Url.id.in_(without_video))
+            .values(status="download_failed", last_error="Sem vídeo armazenado para transcrever")
+        )
+    return list(video_by_url.values())
+
+
+def compute_top_up(
+    in_flight: dict[str, int],
+    queue_depth: int,
+) -> int:
+    """
+    Quantas URLs novas cabem agora: o menor espaço livre entre todos os
+    estágios e a fila do broker, limitado por feeder_max_batch.
+    """
+    limits = stage_limits()
+    room = [
+        limits[name]["watermark"] - count for name, count in in_flight.items()
+    ]
+    room.append(settings.feeder_broker_queue_watermark - queue_depth)
+    room.append(settings.feeder_max_batch)
+    return max(0, min(room))
+
+
+@celery_app.task(name="app.workers.tasks_feeder.feed_pipeline")
+def feed_pipeline() -> dict:
+    """
+    Feeder contínuo com backpressure (substitui o cron diário de 200 URLs).
+
+    Roda a cada INGEST_FEEDER_INTERVAL_SECONDS pelo beat:
+    - mede a profundidade das filas no broker
+    - devolve as Urls com lease vencido ('queued' sem worker, 'downloading'
+      sem heartbeat, 'downloaded' sem transcrição) antes de contar o que
+      está em andamento
+    - conta quantas URLs estão em andamento em cada estágio
+    - devolve ao download as Urls em 'download_failed' e à transcrição as
+      Urls em 'transcription_failed' com tentativas sobrando (sem isso elas
+      nunca saem do lugar)
+    - completa até o watermark chamando process_pending_urls(n)
+
+    Assim os workers ficam sempre ocupados, sem despejar centenas de
+    milhares de chains no Redis: o ritmo acompanha a capacidade online.
+    """
+    client = get_redis()
+
+    # Se outro feeder estiver rodando, pulamos esta rodada. Lock com token:
+    # uma rodada cujo TTL expirou não apaga o lock da rodada seguinte
+    lock_ttl = max(settings.ingest_feeder_interval_seconds * 10, FEEDER_LOCK_MIN_TTL_SECONDS)
+    lock = client.lock(FEEDER_LOCK_KEY, timeout=lock_ttl, blocking=False)
+    if not lock.acquire():
+        return {"skipped": True, "reason": "outro feeder em execução"}
+
+    try:
+        queue_depth = broker_queue_depth(client, watched_queues())
+
+        with db_session() as db:
+            released = release_expired_leases(db)
+            in_flight = in_flight_by_stage(db)
+            # Retries entram antes de URLs novas, no espaço livre do estágio
+            broker_room = settings.feeder_broker_queue_watermark - queue_depth
+            retry_video_ids = requeue_failed_transcriptions(
+                db,
+                min(settings.feeder_transcription_watermark - in_flight["transcription"], broker_room),
+            )
+            retry_url_ids = requeue_failed_downloads(
+                db,
+                min(
+                    settings.feeder_download_watermark - in_flight["download"],
+                    broker_room - len(retry_video_ids),
+                ),
+            )
+
+        for video_id in retry_video_ids:
+            transcribe_video.delay(video_id)
+        if retry_url_ids:
+            dispatch_url_pipelines(retry_url_ids)
+        in_flight["transcription"] += len(retry_video_ids)
+        in_flight["download"] += len(retry_url_ids)
+        queue_depth += len(retry_video_ids) + len(retry_url_ids)
+
+        top_up = compute_top_up(in_flight, queue_depth)
+
+        summary: dict[str, Optional[object]] = {
+            "queue_depth": queue_depth,
+            "in_flight": in_flight,
+            "released_stale": released,
+            "top_up": top_up,
+            "download_retries": len(retry_url_ids),
+            "transcription_retries": len(retry_video_ids),
+        }
+
+        if top_up > 0:
+            # Chamada síncrona: reaproveita claim atômico + lease da ingestão
+            summary["ingest"] = process_pending_urls(top_up)
+
+        print(
+            f"[feed_pipeline] fila={queue_depth} em_andamento={in_flight} "
+            f"top_up={top_up} leases_vencidos={released} retries_download={len(retry_url_ids)} "
+            f"retries_transcricao={len(retry_video_ids)}"
+        )
+        return summary
+
+    finally:
+        release_lock(lock)
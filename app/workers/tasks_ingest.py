@@ -1,16 +1,127 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 
+from sqlalchemy import or_, select, update
+
 from app.workers.celery_app import celery_app
 from app.db.task_session import db_session
 from app.db.models_urls import Url
-from app.workers.pipeline_orchestrator import start_url_pipeline
+from app.workers.pipeline_orchestrator import dispatch_url_pipelines
+from app.config import settings
 
 
 # Número máximo de URLs para processar por rodada
 DEFAULT_BATCH_SIZE = 50
 
 
+def release_stale_claims(db, lease_seconds: int) -> int:
+    """
+    Devolve para 'pending_ingest' as URLs que estão 'queued' há mais tempo
+    que o lease (o dispatch se perdeu, o broker caiu, etc.).
+
+    Só olha para 'queued': o download_video commita 'downloading' numa
+    transação própria antes de começar a baixar, e daí em diante vale o
+    lease de release_stale_downloads. 'queued' sem claimed_at (linhas
+    anteriores à coluna, ou gravadas por fora do claim) também volta:
+    senão ficaria presa para sempre.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    result = db.execute(
+        update(Url)
+        .where(
+            Url.status == "queued",
+            or_(Url.claimed_at.is_(None), Url.claimed_at < cutoff),
+        )
+        .values(status="pending_ingest", claimed_at=None, updated_at=datetime.utcnow())
+    )
+    return result.rowcount or 0
+
+
+def release_stale_downloads(db, lease_seconds: int) -> int:
+    """
+    Urls em 'downloading' cujo heartbeat (updated_at, renovado por
+    download_heartbeat) parou há mais que o lease: o worker morreu no meio.
+    Vão para 'download_failed' contando uma tentativa, e o feeder as
+    devolve à fila (requeue_failed_downloads).
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=lease_seconds)
+    result = db.execute(
+        update(Url)
+        .where(Url.status == "downloading", Url.updated_at < cutoff)
+        .values(
+            status="download_failed",
+            retry_count_download=Url.retry_count_download + 1,
+            last_error=f"Download sem heartbeat há mais de {lease_seconds}s (worker caiu?)",
+            updated_at=now,
+        )
+    )
+    return result.rowcount or 0
+
+
+def release_stale_transcriptions(db, lease_seconds: int) -> int:
+    """
+    Urls em 'downloaded' (updated_at: fim do download ou último requeue)
+    há mais que o lease sem terminar a transcrição: a mensagem se perdeu ou
+    o worker morreu. Vão para 'transcription_failed' contando uma
+    tentativa, e o feeder as devolve à fila (requeue_failed_transcriptions).
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=lease_seconds)
+    result = db.execute(
+        update(Url)
+        .where(Url.status == "downloaded", Url.updated_at < cutoff)
+        .values(
+            status="transcription_failed",
+            retry_count_transcription=Url.retry_count_transcription + 1,
+            last_error=f"Transcrição sem resultado há mais de {lease_seconds}s",
+            updated_at=now,
+        )
+    )
+    return result.rowcount or 0
+
+
+def release_expired_leases(db) -> dict[str, int]:
+    """
+    Todos os leases de Url. O feeder roda isto antes de contar o que está
+    em andamento: Urls presas não podem ocupar o watermark.
+    """
+    return {
+        "queued": release_stale_claims(db, settings.ingest_claim_lease_seconds),
+        "downloading": release_stale_downloads(db, settings.download_lease_seconds),
+        "downloaded": release_stale_transcriptions(db, settings.transcription_lease_seconds),
+    }
+
+
+def claim_pending_urls(db, max_items: int) -> list[int]:
+    """
+    Reserva atomicamente até max_items URLs 'pending_ingest'.
+
+    SELECT ... FOR UPDATE SKIP LOCKED + UPDATE ... RETURNING num único
+    statement: dois schedulers rodando ao mesmo tempo (beat em outro nó,
+    /admin/run_ingest_now durante o cron) nunca pegam a mesma URL.
+    """
+    pending_ids = (
+        select(Url.id)
+        .where(Url.status == "pending_ingest")
+        .order_by(Url.id.asc())
+        .limit(max_items)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+
+    now = datetime.utcnow()
+    rows = db.execute(
+        update(Url)
+        .where(Url.id.in_(pending_ids))
+        .values(status="queued", claimed_at=now, updated_at=now)
+        .returning(Url.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    return sorted(row[0] for row in rows)
+
+
 @celery_app.task(name="app.workers.tasks_ingest.process_pending_urls")
 def process_pending_urls(batch_size: Optional[int] = None) -> dict:
     """
@@ -18,58 +129,47 @@ def process_pending_urls(batch_size: Optional[int] = None) -> dict:
     para cada uma delas, em lotes controlados.
 
     - NÃO cria URLs (isso é feito pela API /urls/bulk ou /urls).
-    - Apenas lê as pendentes e chama start_url_pipeline.delay(url.id).
-    - Atualiza status da URL para 'queued' antes de disparar o pipeline.
+    - Devolve para o pool URLs 'queued' com lease vencido.
+    - Reserva as pendentes atomicamente (SKIP LOCKED), marcando como 'queued'.
+    - Faz COMMIT da reserva e só depois publica as chains do lote inteiro
+      de uma vez (dispatch_url_pipelines), sem task intermediária por URL.
 
     Retorna um pequeno resumo:
     {
       "batch_size": 50,
       "picked": 10,
-      "started_pipelines": 10
+      "started_pipelines": 10,
+      "released_stale": 0,
+      "pipelines": [{"url_id": 1, "pipeline_final_task_id": "..."}, ...]
     }
     """
     max_items = batch_size or DEFAULT_BATCH_SIZE
 
-    picked_urls = []
-    started_count = 0
-
     with db_session() as db:
-        # Buscar URLs pendentes, limitando o lote
-        pending = (
-            db.query(Url)
-            .filter(Url.status == "pending_ingest")
-            .order_by(Url.id.asc())
-            .limit(max_items)
-            .all()
-        )
+        released = release_stale_claims(db, settings.ingest_claim_lease_seconds)
+        if released:
+            print(f"[process_pending_urls] {released} URLs com lease vencido voltaram para o pool")
+
+        claimed_ids = claim_pending_urls(db, max_items)
 
-        if not pending:
-            return {
-                "batch_size": max_items,
-                "picked": 0,
-                "started_pipelines": 0,
-                "message": "Nenhuma URL com status 'pending_ingest' encontrada."
-            }
-
-        for url in pending:
-            # Marca como 'queued' para evitar que outra rodada pegue de novo
-            url.status = "queued"
-            url.updated_at = datetime.utcnow()
-            db.add(url)
-            picked_urls.append(url)
-
-        # Faz o commit dessa atualização de status antes de disparar pipelines
-        # para garantir que outra chamada não pegue as mesmas URLs.
-        db.flush()
-
-        # Agora dispara o pipeline para cada URL
-        for url in picked_urls:
-            start_url_pipeline.delay(url.id)
-            started_count += 1
+    # Aqui a reserva já foi commitada pelo db_session: mesmo que o dispatch
+    # falhe no meio, as URLs não disparadas voltam ao pool quando o lease vencer.
+    if not claimed_ids:
+        return {
+            "batch_size": max_items,
+            "picked": 0,
+            "started_pipelines": 0,
+            "released_stale": released,
+            "message": "Nenhuma URL com status 'pending_ingest' encontrada."
+        }
+
+    # Agora publica as chains do lote inteiro numa única conexão
+    pipelines = dispatch_url_pipelines(claimed_ids)
 
     return {
         "batch_size": max_items,
-        "picked": len(picked_urls),
-        "started_pipelines": started_count,
+        "picked": len(claimed_ids),
+        "started_pipelines": len(pipelines),
+        "released_stale": released,
+        "pipelines": pipelines,
     }
-
@@ -0,0 +1,50 @@
+from app.workers.celery_app import celery_app
+from app.db.task_session import db_session
+from app.media.lifecycle import (
+    enforce_audio_temp_quota,
+    enforce_video_quota,
+    purge_storage_keys,
+    reconcile_storage,
+)
+
+
+@celery_app.task(name="app.workers.tasks_storage.enforce_storage_quotas")
+def enforce_storage_quotas() -> dict:
+    """
+    Task periódica: aplica as quotas de VIDEO_STORAGE_PATH e AUDIO_TEMP_PATH.
+
+    Vídeos só são removidos se o transcript já estiver pronto; o Video
+    correspondente passa para status 'deleted' e o arquivo só é apagado
+    depois do commit.
+    """
+    with db_session() as db:
+        videos = enforce_video_quota(db)
+
+    videos["freed_bytes"] = purge_storage_keys(videos.pop("evicted_storage_keys"))
+
+    audio = enforce_audio_temp_quota()
+
+    print(
+        f"[enforce_storage_quotas] vídeos: {videos['evicted_keys']} removidos, "
+        f"{videos['freed_bytes']} bytes liberados; áudio temp: "
+        f"{audio['removed_files']} arquivos removidos"
+    )
+    return {"videos": videos, "audio_temp": audio}
+
+
+@celery_app.task(name="app.workers.tasks_storage.reconcile_storage_task")
+def reconcile_storage_task() -> dict:
+    """
+    Task periódica: compara arquivos no disco com os Video do banco,
+    apaga órfãos e marca como 'deleted' os Video cujo arquivo sumiu.
+    """
+    with db_session() as db:
+        summary = reconcile_storage(db)
+
+    print(
+        f"[reconcile_storage] {summary['orphans_removed']} órfãos removidos "
+        f"({summary['orphan_bytes']} bytes), "
+        f"{summary['videos_marked_deleted']} vídeos marcados como 'deleted', "
+        f"{summary['partials_removed']} downloads parciais expirados removidos"
+    )
+    return summary
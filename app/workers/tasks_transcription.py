@@ -1,24 +1,129 @@
+import time
 from datetime import datetime
 from typing import Optional
 from pathlib import Path
 from uuid import uuid4
-import subprocess
 
-from app.workers.whisper_client import WhisperTranscriber
-from app.workers.celery_app import celery_app
+from celery.signals import worker_process_init, worker_ready
+from sqlalchemy import select, update
+
+from app.workers.celery_app import QUEUE_TRANSCRIPTION, celery_app
 from app.db.task_session import db_session
 from app.db.models_videos import Video
 from app.db.models_transcripts import Transcript
 from app.db.models_urls import Url
 from app.db.models_jobs import Job
 from app.db.models_dlq import DeadLetter
+from app.media.audio import TRANSCRIPTION_AUDIO_FORMAT, encode_transcription_audio
+from app.media.fingerprint import audio_fingerprint
+from app.media.lifecycle import cleanup_temp_audio
+from app.media.process import throughput_metrics
+from app.media.storage import resolve_path
+from app.media.telemetry import ProgressReporter
+from app.search.cache import invalidate_search_cache
+from app.transcription.cache import find_transcript_by_fingerprint, save_audio_fingerprint
+from app.transcription.chunked import transcribe_chunked
+from app.transcription.engines import TranscriptionEngine, get_engine
+from app.transcription.segments import TimedSegment, copy_segments, save_segments
+from app.workers.tasks_categorization import buffer_for_categorization
 from app.config import settings
 
 
+def _warm_up_engine() -> None:
+    if not settings.transcription_engine_warmup:
+        return
+
+    # Só em workers que consomem a fila de transcrição (o perfil download
+    # não precisa de cliente do Whisper nem de modelo carregado)
+    consume_from = celery_app.amqp.queues.consume_from
+    if consume_from and QUEUE_TRANSCRIPTION not in consume_from:
+        return
+
+    try:
+        engine = get_engine()
+        print(f"[transcription] Motor {engine.name} pronto neste processo")
+    except Exception as e:
+        # A task tenta de novo (e registra o erro) na primeira transcrição
+        print(f"[transcription] aviso: falha ao preparar motor de transcrição: {e}")
+
+
+@worker_process_init.connect
+def warm_up_engine_in_child(**kwargs) -> None:
+    # Pools prefork (cada processo filho tem o seu motor) e solo
+    _warm_up_engine()
+
+
+@worker_ready.connect
+def warm_up_engine_in_worker(sender=None, **kwargs) -> None:
+    # Pools threads/gevent/eventlet: as tasks rodam no próprio processo do
+    # worker, que não recebe worker_process_init
+    pool_module = type(getattr(sender, "pool", None)).__module__
+    if pool_module.endswith((".prefork", ".solo")):
+        return
+    _warm_up_engine()
+
+
 @celery_app.task(name="app.workers.tasks_transcription.transcribe_video")
 def transcribe_video(video_id: int) -> Optional[int]:
     """
-    Task de transcrição de vídeo.
+    Task de transcrição de vídeo (ver _transcribe_video). Depois do commit,
+    o transcript entra no buffer da categorização em lote.
+    """
+    try:
+        transcript_id = _transcribe_video(video_id)
+    except Exception as e:
+        record_transcription_failure(video_id, str(e))
+        raise
+
+    if transcript_id is not None and settings.categorization_enabled:
+        buffer_for_categorization([transcript_id])
+    return transcript_id
+
+
+def record_transcription_failure(video_id: int, error_msg: str) -> None:
+    """
+    Job 'failed' + DLQ e Url em 'transcription_failed', numa transação nova
+    (a da transcrição já foi desfeita). O feeder devolve a Url à fila até
+    TRANSCRIPTION_MAX_RETRIES tentativas (requeue_failed_transcriptions).
+    """
+    now = datetime.utcnow()
+    with db_session() as db:
+        db.add(
+            Job(
+                job_type="transcription",
+                resource_type="video",
+                resource_id=video_id,
+                status="failed",
+                error_message=error_msg,
+                created_at=now,
+                started_at=now,
+                finished_at=now,
+            )
+        )
+        db.add(
+            DeadLetter(
+                stage="transcription",
+                resource_type="video",
+                resource_id=video_id,
+                reason="transcription_exception",
+                error_payload={"error": error_msg},
+            )
+        )
+        db.execute(
+            update(Url)
+            .where(Url.id == select(Video.url_id).where(Video.id == video_id).scalar_subquery())
+            .values(
+                status="transcription_failed",
+                retry_count_transcription=Url.retry_count_transcription + 1,
+                last_error=error_msg,
+                updated_at=now,
+            )
+        )
+
+
+def _transcribe_video(video_id: int) -> Optional[int]:
+    """
+    Transcrição de vídeo.
 
     Fluxo:
     - Busca o Video no banco
@@ -26,10 +131,18 @@ def transcribe_video(video_id: int) -> Optional[int]:
     - Se já existir Transcript pronto para o vídeo, reutiliza (idempotência)
     - Senão:
         - Extrai áudio do vídeo com ffmpeg (gera .mp3 em AUDIO_TEMP_PATH)
-        - Chama Whisper para transcrever
-        - Cria Transcript no banco
+        - Calcula a impressão digital perceptual do áudio; se outro vídeo
+          com o mesmo áudio (mesmo re-encodado) já tem transcrição, copia
+          (source_transcript_id) sem chamar o motor
+        - Transcreve com o motor de TRANSCRIPTION_ENGINE (Whisper API,
+          whisper local na CPU ou stub; ver app/transcription/engines.py).
+          Na API, áudios longos vão em pedaços paralelos
+          (app/transcription/chunked.py)
+        - Cria Transcript no banco, com os segmentos com tempo em
+          transcript_segments
     - Atualiza Url para 'transcribed'
-    - Em erro, registra em DLQ e marca Job como 'failed'
+    - Em erro, a transação é desfeita e transcribe_video registra a falha
+      (record_transcription_failure)
     """
 
     with db_session() as db:
@@ -85,76 +198,159 @@ def transcribe_video(video_id: int) -> Optional[int]:
         try:
             # ─────────────────────────────────────────────
             # EXTRAIR ÁUDIO COM FFMPEG (MP3 COMPRIMIDO)
+            # (pulado quando o download já gravou só o áudio)
             # ─────────────────────────────────────────────
 
-            video_path = Path(video.storage_key)
+            video_path = resolve_path(video.storage_key)
 
             if not video_path.exists():
                 raise FileNotFoundError(f"Arquivo de vídeo não encontrado: {video_path}")
+            # Uso do arquivo (LRU da eviction, app/media/lifecycle.py)
+            video.last_accessed_at = datetime.utcnow()
 
-            # Garante diretório de áudio temporário
-            audio_dir = Path(settings.audio_temp_path)
-            audio_dir.mkdir(parents=True, exist_ok=True)
-
-            # Gera nome de arquivo de áudio único
-            audio_file = audio_dir / f"{uuid4().hex}.mp3"
-
-            # Comando ffmpeg para extrair o áudio em MP3 comprimido
-            cmd = [
-                "ffmpeg",
-                "-y",
-                "-i",
-                str(video_path),
-                "-vn",              # sem vídeo
-                "-acodec",
-                "libmp3lame",
-                "-b:a",
-                "48k",              # bitrate de 48 kbps (ou 32k se quiser ainda menor)
-                "-ac",
-                "1",                # mono
-                str(audio_file),
-            ]
-
-            print(f"[transcribe_video] Extraindo áudio para video_id={video.id}")
-            subprocess.run(
-                cmd,
-                check=True,
-                capture_output=True,
-                text=True,
-            )
-            print(f"[transcribe_video] Áudio extraído: {audio_file}")
+            if video.format == TRANSCRIPTION_AUDIO_FORMAT:
+                # DOWNLOAD_MODE=audio: o download já gravou o áudio pronto
+                audio_file = video_path
+                print(f"[transcribe_video] Usando áudio já pronto para video_id={video.id}")
+            else:
+                # Garante diretório de áudio temporário
+                audio_dir = Path(settings.audio_temp_path)
+                audio_dir.mkdir(parents=True, exist_ok=True)
+
+                # Gera nome de arquivo de áudio único
+                audio_file = audio_dir / f"{uuid4().hex}.{TRANSCRIPTION_AUDIO_FORMAT}"
+
+                # ffmpeg extrai o áudio em MP3 comprimido (ver app/media/audio.py)
+                print(f"[transcribe_video] Extraindo áudio para video_id={video.id}")
+                reporter = ProgressReporter("transcription", video.id, video.duration_seconds)
+                try:
+                    result = encode_transcription_audio(str(video_path), audio_file, reporter)
+                finally:
+                    reporter.clear()
+                job.metrics = {"audio_extract": result.as_metrics()}
+                print(
+                    f"[transcribe_video] Áudio extraído: {audio_file} "
+                    f"({result.elapsed_seconds:.1f}s, realtime_factor={result.realtime_factor})"
+                )
 
             # ─────────────────────────────────────────────
-            # CHAMAR WHISPER DE VERDADE
+            # CACHE POR IMPRESSÃO DIGITAL DO ÁUDIO
+            # (mesmo VSL já transcrito vindo de outra URL)
             # ─────────────────────────────────────────────
-            try:
-                transcriber = WhisperTranscriber()
-                print(f"[transcribe_video] Chamando Whisper para audio={audio_file}")
-                text = transcriber.transcribe_file(audio_file)
+            cached: Optional[Transcript] = None
+            fingerprint_cache = "miss"
+            if settings.transcript_fingerprint_cache_enabled:
+                try:
+                    fingerprint = audio_fingerprint(audio_file)
+                    if fingerprint.usable:
+                        # Savepoint: um erro aqui não pode abortar a
+                        # transação da transcrição
+                        with db.begin_nested():
+                            save_audio_fingerprint(db, video.id, fingerprint)
+                            cached = find_transcript_by_fingerprint(
+                                db, fingerprint, exclude_video_id=video.id
+                            )
+                        video.audio_fingerprint = fingerprint.digest
+                    else:
+                        # Curto demais ou só silêncio: o digest seria igual
+                        # ao de qualquer outro áudio assim
+                        fingerprint_cache = "skipped"
+                        print(
+                            f"[transcribe_video] Áudio sem conteúdo suficiente para "
+                            f"impressão digital (video_id={video.id}); sem cache"
+                        )
+                except Exception as fingerprint_error:
+                    # Sem impressão digital só perdemos o cache
+                    print(
+                        f"[transcribe_video] aviso: falha ao calcular impressão "
+                        f"digital: {fingerprint_error}"
+                    )
+                job.metrics = {
+                    **(job.metrics or {}),
+                    "fingerprint_cache": "hit" if cached is not None else fingerprint_cache,
+                }
+
+            language: Optional[str] = None
+            source_transcript_id: Optional[int] = None
+            segments: list[TimedSegment] = []
+
+            if cached is not None:
                 print(
-                    f"[transcribe_video] Whisper retornou {len(text)} caracteres de texto"
-                )
-                engine_name = "whisper-1"
-            except Exception as whisper_error:
-                # Se der erro na API, registramos e caímos num texto de erro,
-                # mas não derrubamos o job inteiro (a decisão é sua)
-                print(f"[transcribe_video] ERRO na chamada Whisper: {whisper_error}")
-                text = (
-                    f"[ERRO WHISPER] Falha ao transcrever audio {audio_file}: "
-                    f"{whisper_error}"
+                    f"[transcribe_video] Mesmo áudio já transcrito "
+                    f"(transcript_id={cached.id}); copiando para video_id={video.id}"
                 )
-                engine_name = "whisperai_error"
+                text = cached.full_text
+                engine_name = cached.engine
+                language = cached.language
+                # Sempre aponta para a transcrição original, não para outra cópia
+                source_transcript_id = cached.source_transcript_id or cached.id
+            else:
+                # ─────────────────────────────────────────────
+                # TRANSCREVER (MOTOR CONFIGURÁVEL)
+                # ─────────────────────────────────────────────
+                engine: Optional[TranscriptionEngine] = None
+                try:
+                    # Instância por processo (modelo local fica carregado)
+                    engine = get_engine()
+                    print(
+                        f"[transcribe_video] Transcrevendo com {engine.name} "
+                        f"audio={audio_file}"
+                    )
+                    transcribe_started = time.monotonic()
+                    if engine.parallel_chunks:
+                        # Áudios longos: pedaços cortados em silêncios, em paralelo
+                        transcription = transcribe_chunked(engine, audio_file, video.duration_seconds)
+                    else:
+                        transcription = engine.transcribe_file(audio_file)
+                    text, segments = transcription.text, transcription.segments
+                    job.metrics = {
+                        **(job.metrics or {}),
+                        "transcribe": throughput_metrics(
+                            audio_file.stat().st_size,
+                            time.monotonic() - transcribe_started,
+                            video.duration_seconds or 0,
+                        ),
+                    }
+                    print(
+                        f"[transcribe_video] {engine.name} retornou {len(text)} caracteres de texto "
+                        f"em {len(segments)} segmentos"
+                    )
+                    engine_name = engine.name
+                except Exception as engine_error:
+                    # Se der erro no motor, registramos e caímos num texto de erro,
+                    # mas não derrubamos o job inteiro (a decisão é sua)
+                    print(f"[transcribe_video] ERRO no motor de transcrição: {engine_error}")
+                    segments = []
+                    text = (
+                        f"[ERRO TRANSCRIÇÃO] Falha ao transcrever audio {audio_file}: "
+                        f"{engine_error}"
+                    )
+                    engine_name = (
+                        engine.error_name
+                        if engine is not None
+                        else f"{settings.transcription_engine}_error"
+                    )
 
             transcript = Transcript(
                 video_id=video.id,
                 engine=engine_name,
-                language=None,   # depois podemos passar idioma para Whisper e salvar aqui
+                language=language,   # depois podemos passar idioma para o motor e salvar aqui
                 full_text=text,
                 status="ready",
+                source_transcript_id=source_transcript_id,
             )
             db.add(transcript)
             db.flush()  # garante transcript.id
 
+            # Segmentos com tempo (busca com offset no vídeo)
+            if source_transcript_id is not None:
+                copy_segments(db, source_transcript_id, transcript.id)
+            else:
+                save_segments(db, transcript.id, segments)
+
+            # O mp3 temporário não serve mais para nada
+            cleanup_temp_audio(audio_file)
+
             # Atualizar URL como 'transcribed'
             if url:
                 url.status = "transcribed"
@@ -169,32 +365,13 @@ def transcribe_video(video_id: int) -> Optional[int]:
                 f"[transcribe_video] Sucesso para video_id={video.id}, "
                 f"transcript_id={transcript.id}"
             )
-            return transcript.id
+            new_transcript_id = transcript.id
 
         except Exception as e:
-            error_msg = str(e)
-            print(f"[transcribe_video] ERRO para video_id={video.id}: {error_msg}")
-
-            # Atualiza Job
-            job.status = "failed"
-            job.error_message = error_msg
-            job.finished_at = datetime.utcnow()
-            db.add(job)
-
-            # Registra na DLQ
-            dlq_entry = DeadLetter(
-                stage="transcription",
-                resource_type="video",
-                resource_id=video.id,
-                reason="transcription_exception",
-                error_payload={"error": error_msg},
-            )
-            db.add(dlq_entry)
-
-            # Opcional: marcar URL com status específico de falha
-            if url:
-                # podemos deixar como 'downloaded' para tentar de novo depois
-                url.status = "downloaded"
-                db.add(url)
-
+            print(f"[transcribe_video] ERRO para video_id={video.id}: {e}")
             raise
+
+    # Fora do db_session: o Transcript novo já foi commitado, então a busca
+    # pode passar a enxergá-lo.
+    invalidate_search_cache()
+    return new_transcript_id
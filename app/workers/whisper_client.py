@@ -1,41 +1,162 @@
-import os
+"""
+Cliente do Whisper (OpenAI).
+
+Um por processo do worker (ver get_engine em app/transcription/engines.py,
+aquecido no início do worker): o pool de conexões HTTP keep-alive é
+reaproveitado entre tasks, sem handshake TLS novo a cada transcrição.
+
+transcribe_many: modo assíncrono, vários arquivos em voo ao mesmo tempo
+num só processo (AsyncOpenAI num event loop dedicado, em uma thread).
+"""
+
+import asyncio
+import threading
 from pathlib import Path
 from typing import Optional
 
-from dotenv import load_dotenv
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from app.config import settings
+from app.transcription.segments import TranscriptionResult, segment_from_response
 
-load_dotenv()
+
+class _EventLoopThread:
+    """
+    Event loop rodando para sempre numa thread daemon. O cliente async (e o
+    seu pool de conexões) vive nesse loop e é reaproveitado entre chamadas.
+    """
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="whisper-async", daemon=True)
+        self.thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.whisper_max_connections,
+        max_keepalive_connections=settings.whisper_max_connections,
+        keepalive_expiry=settings.whisper_keepalive_seconds,
+    )
 
 
 class WhisperTranscriber:
     def __init__(self) -> None:
-        api_key = os.getenv("OPENAI_API_KEY")
+        api_key = settings.openai_api_key
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY não está definido no .env")
 
-        self.client = OpenAI(api_key=api_key)
-        self.model = os.getenv("OPENAI_WHISPER_MODEL", "whisper-1")
+        self.api_key = api_key
+        self.model = settings.openai_whisper_model
+
+        self.http_client = httpx.Client(
+            limits=_http_limits(),
+            timeout=settings.whisper_timeout_seconds,
+        )
+        self.client = OpenAI(
+            api_key=api_key,
+            http_client=self.http_client,
+            max_retries=settings.whisper_max_retries,
+        )
+
+        # Criados sob demanda, só se transcribe_many for usado
+        self._loop_thread: Optional[_EventLoopThread] = None
+        self._async_client: Optional[AsyncOpenAI] = None
+        self._async_lock = threading.Lock()
+
+    def _params(self, f, language: Optional[str]) -> dict:
+        params = {
+            "model": self.model,
+            "file": f,
+            # verbose_json traz os segmentos com início/fim
+            "response_format": "verbose_json",
+            "timestamp_granularities": ["segment"],
+        }
+        if language:
+            params["language"] = language
+        return params
 
-    def transcribe_file(self, audio_path: Path, language: Optional[str] = None) -> str:
+    @staticmethod
+    def _result(response) -> TranscriptionResult:
+        items = getattr(response, "segments", None) or []
+        segments = [segment for segment in map(segment_from_response, items) if segment is not None]
+        # O objeto de resposta tem o campo 'text'
+        return TranscriptionResult(response.text, segments)
+
+    def transcribe_file(self, audio_path: Path, language: Optional[str] = None) -> TranscriptionResult:
         """
-        Envia um arquivo de áudio para o Whisper e retorna o texto transcrito.
+        Envia um arquivo de áudio para o Whisper e retorna o texto transcrito
+        com os segmentos (início/fim de cada trecho).
         """
         if not audio_path.exists():
             raise FileNotFoundError(f"Arquivo de áudio não existe: {audio_path}")
 
         with audio_path.open("rb") as f:
-            params = {
-                "model": self.model,
-                "file": f,
-            }
-            if language:
-                params["language"] = language
-
             # API nova de áudio/transcrição
-            response = self.client.audio.transcriptions.create(**params)
+            response = self.client.audio.transcriptions.create(**self._params(f, language))
 
-        # O objeto de resposta tem o campo 'text'
-        return response.text
+        return self._result(response)
+
+    # ─────────────────────────────────────────────
+    #  Modo assíncrono
+    # ─────────────────────────────────────────────
+
+    def _get_loop_thread(self) -> _EventLoopThread:
+        with self._async_lock:
+            if self._loop_thread is None:
+                self._loop_thread = _EventLoopThread()
+            return self._loop_thread
 
+    async def _get_async_client(self) -> AsyncOpenAI:
+        # Sempre chamado de dentro do loop dedicado (uma thread só)
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=httpx.AsyncClient(
+                    limits=_http_limits(),
+                    timeout=settings.whisper_timeout_seconds,
+                ),
+                max_retries=settings.whisper_max_retries,
+            )
+        return self._async_client
+
+    async def _transcribe_many(
+        self,
+        audio_paths: list[Path],
+        language: Optional[str],
+        concurrency: int,
+    ) -> list[TranscriptionResult]:
+        client = await self._get_async_client()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def transcribe_one(audio_path: Path) -> TranscriptionResult:
+            async with semaphore:
+                with audio_path.open("rb") as f:
+                    response = await client.audio.transcriptions.create(**self._params(f, language))
+                return self._result(response)
+
+        # gather preserva a ordem e propaga a primeira falha
+        return await asyncio.gather(*(transcribe_one(path) for path in audio_paths))
+
+    def transcribe_many(
+        self,
+        audio_paths: list[Path],
+        language: Optional[str] = None,
+        concurrency: Optional[int] = None,
+    ) -> list[TranscriptionResult]:
+        """
+        Transcreve vários arquivos com até `concurrency` requests em voo
+        (padrão: WHISPER_MAX_CONNECTIONS). Retorna os resultados na mesma ordem.
+        """
+        for audio_path in audio_paths:
+            if not audio_path.exists():
+                raise FileNotFoundError(f"Arquivo de áudio não existe: {audio_path}")
 
+        concurrency = concurrency or settings.whisper_max_connections
+        return self._get_loop_thread().run(
+            self._transcribe_many(audio_paths, language, concurrency)
+        )
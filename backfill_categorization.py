@@ -0,0 +1,206 @@
+"""
+Re-categoriza os transcripts depois de uma mudança na taxonomia
+(app/categorization/taxonomy.json ou CATEGORIZATION_TAXONOMY_PATH).
+
+- lê os transcripts em streaming (cursor no servidor, yield_per), em ordem
+  de id, pulando os vídeos cujo VideoMetadata.model_version já é a versão
+  atual da taxonomia
+- cada lote vai para um processo do pool, que categoriza e grava com um
+  upsert só (INSERT ... ON CONFLICT) na sua própria transação
+- o último id concluído vai para um checkpoint em disco: interrompido, o
+  backfill continua de onde parou (e, mesmo sem checkpoint, os vídeos já
+  na versão atual são pulados)
+
+Execute com:
+    python backfill_categorization.py [--processes N] [--batch-size N]
+                                      [--checkpoint ARQUIVO] [--restart]
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from multiprocessing import Pool
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from sqlalchemy import or_, select
+
+from app.categorization.engine import get_taxonomy
+from app.categorization.store import latest_per_video, mark_urls_categorized, upsert_video_metadata
+from app.db.models_metadata import VideoMetadata
+from app.db.models_transcripts import Transcript
+from app.db.models_videos import Video
+from app.db.session import engine
+from app.db.task_session import db_session
+
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHECKPOINT = "backfill_categorization.checkpoint.json"
+# Lotes em voo por processo: o streaming não lê muito à frente dos workers
+IN_FLIGHT_PER_PROCESS = 2
+REPORT_INTERVAL_SECONDS = 5.0
+
+
+class BackfillRow(NamedTuple):
+    id: int
+    video_id: int
+    full_text: Optional[str]
+    url_id: Optional[int]
+
+
+# ─────────────────────────────────────────────
+#  Checkpoint
+# ─────────────────────────────────────────────
+
+def load_checkpoint(path: Path, taxonomy_version: str) -> dict:
+    """
+    Checkpoint de outra versão da taxonomia não vale: recomeça do zero.
+    """
+    fresh = {"taxonomy_version": taxonomy_version, "last_transcript_id": 0, "rows": 0}
+    if not path.exists():
+        return fresh
+
+    checkpoint = json.loads(path.read_text())
+    if checkpoint.get("taxonomy_version") != taxonomy_version:
+        return fresh
+    return checkpoint
+
+
+def save_checkpoint(path: Path, checkpoint: dict) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(checkpoint))
+    os.replace(tmp_path, path)
+
+
+# ─────────────────────────────────────────────
+#  Workers do pool
+# ─────────────────────────────────────────────
+
+def init_worker() -> None:
+    # Conexões herdadas do processo pai (fork) não podem ser usadas aqui
+    engine.dispose(close=False)
+
+
+def categorize_partition(rows: list[tuple], taxonomy_version: str) -> int:
+    taxonomy = get_taxonomy()
+    if taxonomy.version != taxonomy_version:
+        raise RuntimeError(
+            f"taxonomia mudou durante o backfill ({taxonomy_version} -> {taxonomy.version})"
+        )
+
+    batch = latest_per_video(BackfillRow._make(row) for row in rows)
+    results = taxonomy.categorize_batch(row.full_text or "" for row in batch)
+
+    with db_session() as db:
+        upsert_video_metadata(db, [row.video_id for row in batch], results, taxonomy.version)
+        # Só promove quem ainda não tinha categoria; as demais já estão 'categorized'
+        mark_urls_categorized(
+            db, [row.url_id for row in batch if row.url_id is not None], only_transcribed=True
+        )
+    return len(batch)
+
+
+# ─────────────────────────────────────────────
+#  Streaming
+# ─────────────────────────────────────────────
+
+def outdated_transcripts_query(taxonomy_version: str, after_id: int):
+    return (
+        select(Transcript.id, Transcript.video_id, Transcript.full_text, Video.url_id)
+        .join(Video, Video.id == Transcript.video_id)
+        .outerjoin(VideoMetadata, VideoMetadata.video_id == Transcript.video_id)
+        .where(
+            Transcript.id > after_id,
+            Transcript.status == "ready",
+            or_(
+                VideoMetadata.model_version.is_(None),
+                VideoMetadata.model_version != taxonomy_version,
+            ),
+        )
+        .order_by(Transcript.id)
+    )
+
+
+def backfill_categorization(
+    processes: int,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    checkpoint_path: Path = Path(DEFAULT_CHECKPOINT),
+    restart: bool = False,
+) -> dict:
+    taxonomy_version = get_taxonomy().version
+    checkpoint = (
+        {"taxonomy_version": taxonomy_version, "last_transcript_id": 0, "rows": 0}
+        if restart
+        else load_checkpoint(checkpoint_path, taxonomy_version)
+    )
+    resumed_rows = checkpoint["rows"]
+
+    print(
+        f"[backfill_categorization] Taxonomia {taxonomy_version}, a partir de "
+        f"transcript_id>{checkpoint['last_transcript_id']}, {processes} processos, "
+        f"lotes de {batch_size}"
+    )
+
+    start = time.monotonic()
+    last_report = start
+    rows_done = 0
+    pending: deque = deque()
+
+    def complete_oldest() -> None:
+        nonlocal rows_done, last_report
+        last_id, async_result = pending.popleft()
+        rows_done += async_result.get()
+
+        # Os lotes terminam em ordem de id (fila FIFO): tudo até last_id está gravado
+        checkpoint["last_transcript_id"] = last_id
+        checkpoint["rows"] = resumed_rows + rows_done
+        save_checkpoint(checkpoint_path, checkpoint)
+
+        now = time.monotonic()
+        if now - last_report >= REPORT_INTERVAL_SECONDS:
+            last_report = now
+            print(
+                f"[backfill_categorization] {rows_done} re-categorizados "
+                f"({rows_done / (now - start):.0f} linhas/s, até id={last_id})"
+            )
+
+    with Pool(processes, initializer=init_worker) as pool, engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+            outdated_transcripts_query(taxonomy_version, checkpoint["last_transcript_id"])
+        )
+        for partition in result.partitions():
+            rows = [tuple(row) for row in partition]
+            pending.append(
+                (rows[-1][0], pool.apply_async(categorize_partition, (rows, taxonomy_version)))
+            )
+            if len(pending) >= processes * IN_FLIGHT_PER_PROCESS:
+                complete_oldest()
+
+        while pending:
+            complete_oldest()
+
+    seconds = time.monotonic() - start
+    return {
+        "taxonomy_version": taxonomy_version,
+        "rows": rows_done,
+        "total_rows": checkpoint["rows"],
+        "seconds": seconds,
+        "rows_per_second": rows_done / seconds if seconds else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--checkpoint", type=Path, default=Path(DEFAULT_CHECKPOINT))
+    parser.add_argument("--restart", action="store_true", help="ignora o checkpoint")
+    args = parser.parse_args()
+
+    summary = backfill_categorization(args.processes, args.batch_size, args.checkpoint, args.restart)
+    print(
+        f"Backfill concluído: {summary['rows']} re-categorizados em {summary['seconds']:.1f}s "
+        f"({summary['rows_per_second']:.0f} linhas/s), taxonomia {summary['taxonomy_version']}."
+    )
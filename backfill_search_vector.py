@@ -0,0 +1,63 @@
+"""
+Preenche transcripts.search_vector para transcrições que já existiam
+antes da busca full-text (o trigger só atua em INSERT/UPDATE novos).
+
+Roda em lotes por faixa de id, com commit a cada lote, então pode ser
+interrompido e executado de novo sem problema.
+
+Execute com:
+    python backfill_search_vector.py [tamanho_do_lote]
+"""
+
+import sys
+
+from sqlalchemy import text
+
+from app.db.session import engine
+
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+BACKFILL_SQL = text(
+    """
+    UPDATE transcripts
+    SET search_vector = to_tsvector('public.pt_unaccent', coalesce(full_text, ''))
+    WHERE id IN (
+        SELECT id FROM transcripts
+        WHERE search_vector IS NULL AND id > :last_id
+        ORDER BY id
+        LIMIT :batch_size
+    )
+    RETURNING id
+    """
+)
+
+
+def backfill_search_vector(batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    total = 0
+    last_id = 0
+
+    while True:
+        with engine.begin() as conn:
+            ids = [
+                row[0]
+                for row in conn.execute(
+                    BACKFILL_SQL, {"last_id": last_id, "batch_size": batch_size}
+                )
+            ]
+
+        if not ids:
+            break
+
+        total += len(ids)
+        last_id = max(ids)
+        print(f"[backfill_search_vector] {total} transcrições atualizadas (até id={last_id})")
+
+    return total
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BATCH_SIZE
+    updated = backfill_search_vector(size)
+    print(f"Backfill concluído: {updated} transcrições atualizadas.")
@@ -0,0 +1,93 @@
+"""
+Benchmark do índice de similaridade (app/similarity/index.py): latência
+de consulta por tamanho do corpus, força bruta vs. IVF, e o recall@k do
+IVF em relação à força bruta (exata).
+
+Não usa banco nem modelo: os vetores são sintéticos, agrupados em tópicos
+(como transcrições de nichos parecidos), com norma 1.
+
+Execute com:
+    python bench_similarity.py [tamanhos...]
+
+Exemplo:
+    python bench_similarity.py 1000 10000 100000 1000000
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.similarity.index import VectorIndex
+from app.similarity.store import encode_vector
+
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DIM = 384
+TOPICS = 500
+QUERIES = 200
+K = 10
+
+
+def make_vectors(rng: np.random.Generator, size: int, centers: np.ndarray) -> np.ndarray:
+    vectors = centers[rng.integers(0, len(centers), size)]
+    vectors = vectors + 0.6 * rng.standard_normal((size, DIM), dtype=np.float32) / np.sqrt(DIM)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def timed_queries(index: VectorIndex, queries: np.ndarray) -> tuple[list[list[int]], np.ndarray]:
+    results, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        neighbors = index.search(query, K)
+        latencies.append(time.perf_counter() - start)
+        results.append([neighbor.id for neighbor in neighbors])
+    return results, np.array(latencies) * 1000
+
+
+def bench(size: int, rng: np.random.Generator) -> None:
+    centers = rng.standard_normal((TOPICS, DIM), dtype=np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    vectors = make_vectors(rng, size, centers)
+    queries = make_vectors(rng, QUERIES, centers)
+
+    brute = VectorIndex(DIM, ivf_min_vectors=size + 1)
+    start = time.perf_counter()
+    brute.add(range(size), vectors)
+    brute_build = time.perf_counter() - start
+
+    ivf = VectorIndex(DIM, ivf_min_vectors=0, nprobe=settings.similarity_ivf_nprobe)
+    start = time.perf_counter()
+    ivf.add(range(size), vectors)
+    ivf_build = time.perf_counter() - start
+
+    exact, brute_ms = timed_queries(brute, queries)
+    approx, ivf_ms = timed_queries(ivf, queries)
+    recall = np.mean([len(set(a) & set(e)) / K for a, e in zip(approx, exact)])
+
+    float16_bytes = len(encode_vector(vectors[0], "float16")[0])
+    int8_bytes = len(encode_vector(vectors[0], "int8")[0])
+
+    print(f"\n=== {size} vetores x {DIM} dimensões ===")
+    print(
+        f"armazenamento: float16 {size * float16_bytes / 1e6:.1f} MB, "
+        f"int8 {size * int8_bytes / 1e6:.1f} MB; em memória (float32) "
+        f"{vectors.nbytes / 1e6:.1f} MB"
+    )
+    print(
+        f"força bruta: montagem {brute_build:.2f}s, "
+        f"p50 {np.percentile(brute_ms, 50):.2f} ms, p95 {np.percentile(brute_ms, 95):.2f} ms"
+    )
+    print(
+        f"IVF ({ivf.stats()['lists']} listas, nprobe {ivf.nprobe}): montagem {ivf_build:.2f}s, "
+        f"p50 {np.percentile(ivf_ms, 50):.2f} ms, p95 {np.percentile(ivf_ms, 95):.2f} ms, "
+        f"recall@{K} {recall:.3f}"
+    )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    rng = np.random.default_rng(42)
+    for size in sizes:
+        bench(size, rng)
@@ -0,0 +1,108 @@
+"""
+Benchmark da ingestão em lote de URLs: caminho antigo (uma query + um
+flush por URL) vs. caminho set-based (app/ingest/bulk_urls.py).
+
+Cada rodada acontece numa transação que é desfeita no final (rollback),
+então o banco não fica com lixo. ~10% das URLs de cada payload são
+repetidas, para exercitar a deduplicação.
+
+Execute com:
+    python bench_urls_bulk.py [tamanhos...]
+
+Exemplo:
+    python bench_urls_bulk.py 1000 10000 100000
+"""
+
+import sys
+import time
+from datetime import date, datetime
+from uuid import uuid4
+
+from app.db.session import SessionLocal
+from app.db.models_urls import Url
+from app.ingest.bulk_urls import DEFAULT_CHUNK_SIZE, ingest_urls
+
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+def make_payload(size: int) -> list[str]:
+    run_id = uuid4().hex[:8]
+    unique = [
+        f"https://bench.invalid/{run_id}/{i}/main.m3u8"
+        for i in range(size - size // 10)
+    ]
+    return unique + unique[: size // 10]
+
+
+def legacy_insert_urls(db, urls_input: list[str]) -> tuple[int, int]:
+    """
+    Reprodução do create_urls_bulk original: SELECT + flush por URL.
+    """
+    inserted = duplicates = 0
+    for raw in urls_input:
+        existing = (
+            db.query(Url)
+            .filter(Url.raw_url == raw)
+            .order_by(Url.id.desc())
+            .first()
+        )
+        if existing:
+            duplicates += 1
+            continue
+
+        now = datetime.utcnow()
+        db.add(
+            Url(
+                raw_url=raw,
+                type="m3u8",
+                status="pending_ingest",
+                batch_date=date.today(),
+                created_at=now,
+                updated_at=now,
+            )
+        )
+        db.flush()
+        inserted += 1
+    return inserted, duplicates
+
+
+def set_based_insert_urls(db, urls_input: list[str]) -> tuple[int, int]:
+    inserted = duplicates = 0
+    for chunk_results in ingest_urls(db, urls_input, chunk_size=DEFAULT_CHUNK_SIZE):
+        for item in chunk_results:
+            if item.created:
+                inserted += 1
+            else:
+                duplicates += 1
+    return inserted, duplicates
+
+
+def run(label: str, fn, payload: list[str]) -> float:
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        inserted, duplicates = fn(db, payload)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.rollback()
+        db.close()
+
+    print(
+        f"  {label:<10} {elapsed:>9.3f}s  "
+        f"{len(payload) / elapsed:>10.0f} urls/s  "
+        f"(inserted={inserted}, duplicates={duplicates})"
+    )
+    return elapsed
+
+
+def main(sizes: list[int]) -> None:
+    for size in sizes:
+        print(f"{size} URLs:")
+        legacy = run("legacy", legacy_insert_urls, make_payload(size))
+        set_based = run("set-based", set_based_insert_urls, make_payload(size))
+        print(f"  speedup    {legacy / set_based:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -6,7 +6,9 @@ import { searchVsls } from "./lib/searchService";
 function SwipePage() {
   const [searchTerm, setSearchTerm] = useState("");
   const [results, setResults] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [errorMessage, setErrorMessage] = useState("");
 
   const navigate = useNavigate();
@@ -21,6 +23,7 @@ function SwipePage() {
 
     if (term === "") {
       setResults([]);
+      setNextCursor(null);
       setErrorMessage("");
       setIsLoading(false);
       return;
@@ -33,15 +36,17 @@ function SwipePage() {
       setErrorMessage("");
 
       try {
-        const vsls = await searchVsls(term);
+        const page = await searchVsls(term);
 
         if (!cancelled) {
-          setResults(vsls);
+          setResults(page.results);
+          setNextCursor(page.nextCursor);
         }
       } catch (err) {
         console.error(err);
         if (!cancelled) {
           setResults([]);
+          setNextCursor(null);
           setErrorMessage(
             "There was an error while searching. Please try again."
           );
@@ -60,6 +65,21 @@ function SwipePage() {
     };
   }, [searchTerm]);
 
+  const handleLoadMore = async () => {
+    if (!nextCursor || isLoadingMore) return;
+
+    setIsLoadingMore(true);
+    try {
+      const page = await searchVsls(searchTerm, nextCursor);
+      setResults((prev) => [...prev, ...page.results]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const handleCardClick = (vsl) => {
     navigate(`/vsl/${vsl.id}`, { state: { vsl } });
   };
@@ -150,11 +170,32 @@ function SwipePage() {
                   title={vsl.title}
                   videoPath={vsl.video_path}
                   snippet={vsl.transcript_snippet}
+                  highlights={vsl.highlights}
                   onClick={() => handleCardClick(vsl)}
                 />
               ))}
             </div>
           )}
+
+          {!isLoading && !errorMessage && nextCursor && (
+            <div style={{ display: "flex", justifyContent: "center" }}>
+              <button
+                type="button"
+                onClick={handleLoadMore}
+                disabled={isLoadingMore}
+                style={{
+                  padding: "10px 18px",
+                  borderRadius: "8px",
+                  border: "1px solid #444",
+                  background: "#111",
+                  color: "white",
+                  cursor: "pointer",
+                }}
+              >
+                {isLoadingMore ? "Loading…" : "Load more"}
+              </button>
+            </div>
+          )}
         </section>
       </main>
     </div>
@@ -1,6 +1,7 @@
-import React, { useState } from "react";
+import React, { useState, useEffect } from "react";
 import { useLocation, useNavigate } from "react-router-dom";
 import VslExpandedView from "./components/VslExpandedView";
+import { fetchTranscript } from "./lib/searchService";
 
 function VslPage() {
   const location = useLocation();
@@ -8,11 +9,31 @@ function VslPage() {
   const vsl = location.state?.vsl;
 
   const [snackbarOpen, setSnackbarOpen] = useState(false);
+  const [transcriptFull, setTranscriptFull] = useState("");
+
+  // A busca só traz o snippet; o texto completo é buscado aqui sob demanda
+  useEffect(() => {
+    if (!vsl?.id) return;
+
+    let cancelled = false;
+
+    fetchTranscript(vsl.id)
+      .then((data) => {
+        if (!cancelled) {
+          setTranscriptFull(data.full_text || "");
+        }
+      })
+      .catch((err) => console.error("Failed to load transcript:", err));
+
+    return () => {
+      cancelled = true;
+    };
+  }, [vsl?.id]);
 
   const handleCopyTranscript = async () => {
-    if (!vsl?.transcript_full) return;
+    if (!transcriptFull) return;
     try {
-      await navigator.clipboard.writeText(vsl.transcript_full);
+      await navigator.clipboard.writeText(transcriptFull);
       setSnackbarOpen(true);
       setTimeout(() => setSnackbarOpen(false), 4000);
     } catch (err) {
@@ -132,7 +153,8 @@ function VslPage() {
         <VslExpandedView
           title={vsl.title}
           videoPath={vsl.video_path}
-          transcript={vsl.transcript_full}
+          transcript={transcriptFull}
+          hits={vsl.hits}
           onCopyTranscript={handleCopyTranscript}
         />
       </main>
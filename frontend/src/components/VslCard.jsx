@@ -1,7 +1,40 @@
 // frontend/src/components/VslCard.jsx
 import React from "react";
 
-function VslCard({ title, videoPath, snippet, onClick }) {
+// Quebra o snippet em pedaços normais e destacados a partir dos offsets
+// [start, end) que a API devolve em `highlights`.
+function renderSnippet(snippet, highlights) {
+  const text = snippet || "";
+  if (!highlights || highlights.length === 0) {
+    return text;
+  }
+
+  const parts = [];
+  let cursor = 0;
+
+  highlights.forEach(({ start, end }, index) => {
+    if (start > cursor) {
+      parts.push(text.slice(cursor, start));
+    }
+    parts.push(
+      <mark
+        key={index}
+        style={{ backgroundColor: "#f5d90a", color: "#000", padding: "0 2px" }}
+      >
+        {text.slice(start, end)}
+      </mark>
+    );
+    cursor = end;
+  });
+
+  if (cursor < text.length) {
+    parts.push(text.slice(cursor));
+  }
+
+  return parts;
+}
+
+function VslCard({ title, videoPath, snippet, highlights, onClick }) {
   return (
     <div
       onClick={onClick}
@@ -44,7 +77,7 @@ function VslCard({ title, videoPath, snippet, onClick }) {
           lineHeight: "1.5",
         }}
       >
-        {snippet}
+        {renderSnippet(snippet, highlights)}
       </p>
     </div>
   );
@@ -1,7 +1,25 @@
 // frontend/src/components/VslExpandedView.jsx
-import React from "react";
+import React, { useRef } from "react";
+
+// 754.2 -> "12:34"
+function formatTime(seconds) {
+  const total = Math.floor(seconds);
+  const minutes = Math.floor(total / 60);
+  const secs = String(total % 60).padStart(2, "0");
+  return `${minutes}:${secs}`;
+}
+
+function VslExpandedView({ title, videoPath, transcript, hits, onCopyTranscript }) {
+  const videoRef = useRef(null);
+
+  // Pula o player para o momento em que o termo buscado é falado
+  const handleHitClick = (hit) => {
+    const video = videoRef.current;
+    if (!video) return;
+    video.currentTime = hit.start_seconds;
+    video.play().catch(() => {});
+  };
 
-function VslExpandedView({ title, videoPath, transcript, onCopyTranscript }) {
   const safeText = transcript || "";
   const displayedText = safeText ? `${safeText} [...]` : "";
 
@@ -22,6 +40,7 @@ function VslExpandedView({ title, videoPath, transcript, onCopyTranscript }) {
     >
       {/* Vídeo Player */}
       <video
+        ref={videoRef}
         src={videoPath}
         controls
         style={{
@@ -32,6 +51,36 @@ function VslExpandedView({ title, videoPath, transcript, onCopyTranscript }) {
         }}
       />
 
+      {/* Momentos em que o termo buscado aparece */}
+      {hits && hits.length > 0 && (
+        <div
+          style={{
+            display: "flex",
+            flexWrap: "wrap",
+            gap: "8px",
+            marginBottom: "16px",
+          }}
+        >
+          {hits.map((hit, index) => (
+            <button
+              key={index}
+              onClick={() => handleHitClick(hit)}
+              style={{
+                padding: "4px 10px",
+                borderRadius: "999px",
+                border: "1px solid #f5d90a",
+                background: "transparent",
+                color: "#f5d90a",
+                fontSize: "0.85rem",
+                cursor: "pointer",
+              }}
+            >
+              {formatTime(hit.start_seconds)}
+            </button>
+          ))}
+        </div>
+      )}
+
       {/* Título */}
       <h2
         style={{
@@ -1,14 +1,23 @@
 // Serviço de busca de VSLs
 // AGORA: chama a API real do FastAPI em http://localhost:8000/api/search
 
-export async function searchVsls(term) {
+const API_BASE = "http://localhost:8000";
+
+// Busca paginada: devolve { results, nextCursor }.
+// Para a próxima página, chame de novo passando o nextCursor recebido.
+export async function searchVsls(term, cursor = null) {
   const query = term.trim();
 
   if (!query) {
-    return [];
+    return { results: [], nextCursor: null };
+  }
+
+  const params = new URLSearchParams({ q: query });
+  if (cursor) {
+    params.set("cursor", cursor);
   }
 
-  const url = `http://localhost:8000/api/search?q=${encodeURIComponent(query)}`;
+  const url = `${API_BASE}/api/search?${params.toString()}`;
 
   const response = await fetch(url);
 
@@ -19,5 +28,19 @@ export async function searchVsls(term) {
   const data = await response.json();
 
   // Garantimos que sempre retornamos um array
-  return Array.isArray(data.results) ? data.results : [];
+  return {
+    results: Array.isArray(data.results) ? data.results : [],
+    nextCursor: data.next_cursor || null,
+  };
+}
+
+// Texto completo de uma transcrição (a busca só traz o snippet)
+export async function fetchTranscript(transcriptId) {
+  const response = await fetch(`${API_BASE}/api/transcripts/${transcriptId}`);
+
+  if (!response.ok) {
+    throw new Error(`Erro ao buscar transcrição: ${response.status}`);
+  }
+
+  return response.json();
 }
@@ -7,12 +7,15 @@ Execute com:
 
 from app.db.session import engine
 from app.db.base import Base
+from app.db.ddl import apply_post_create_ddl
 import app.db.models  # garante que todos os models sejam importados
 
 
 def init_db():
     print("Criando tabelas no banco...")
     Base.metadata.create_all(bind=engine)
+    print("Aplicando DDL complementar (extensões, triggers, índices)...")
+    apply_post_create_ddl(engine)
     print("Tabelas criadas com sucesso!")
 
 
@@ -0,0 +1,25 @@
+"""
+Sobe um worker Celery com o perfil de um estágio do pipeline
+(ver app/workers/profiles.py).
+
+Execute com:
+    python run_worker.py download
+    python run_worker.py transcription
+    python run_worker.py categorization
+    python run_worker.py ingest
+    python run_worker.py all        # dev: todas as filas num worker só
+"""
+
+import sys
+
+from app.workers.celery_app import celery_app
+from app.workers.profiles import PROFILES, worker_argv
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in PROFILES:
+        print(f"Uso: python run_worker.py <{'|'.join(PROFILES)}> [loglevel]")
+        sys.exit(1)
+
+    loglevel = sys.argv[2] if len(sys.argv) > 2 else "info"
+    celery_app.worker_main(worker_argv(sys.argv[1], loglevel))
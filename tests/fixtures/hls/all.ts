@@ -0,0 +1,3 @@
+HLS fixture segment 0 payload.
+#HLS fixture segment 1 payload.
+#HLS fixture segment 2, a bit longer....
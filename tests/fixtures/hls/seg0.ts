@@ -0,0 +1,2 @@
+HLS fixture segment 0 payload.
+#
\ No newline at end of file
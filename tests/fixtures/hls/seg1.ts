@@ -0,0 +1,2 @@
+HLS fixture segment 1 payload.
+#
\ No newline at end of file
@@ -0,0 +1 @@
+HLS fixture segment 2, a bit longer....
@@ -0,0 +1,202 @@
+"""
+Downloader HLS (app/media/hls.py) contra um servidor HTTP local servindo
+tests/fixtures/hls, com falhas injetadas por caminho:
+
+- media.m3u8: três segmentos (seg0.ts, seg1.ts, seg2.ts)
+- byterange.m3u8: os mesmos três, como EXT-X-BYTERANGE de all.ts
+"""
+
+import re
+import threading
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from app.media import hls
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "hls"
+SEGMENT_NAMES = ("seg0.ts", "seg1.ts", "seg2.ts")
+RANGE_RE = re.compile(r"bytes=(\d+)-(\d+)")
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serve FIXTURES com suporte a Range (206). Falhas por caminho, em
+    server.faults[path] (consumidas uma por request):
+    - "503" / "403": responde com esse status
+    - "ignore_range": responde 200 com o arquivo inteiro
+    - "truncate": 206 com metade do trecho pedido
+    """
+
+    def do_GET(self) -> None:
+        self.server.requests[self.path] += 1
+        faults = self.server.faults[self.path]
+        fault = faults.pop(0) if faults else None
+
+        path = FIXTURES / self.path.lstrip("/")
+        if not path.is_file():
+            self.send_error(404)
+            return
+        if fault in ("503", "403"):
+            self.send_error(int(fault))
+            return
+
+        data = path.read_bytes()
+        match = RANGE_RE.fullmatch(self.headers.get("Range", ""))
+        if not match or fault == "ignore_range":
+            self._send(200, data)
+            return
+
+        start, end = int(match.group(1)), int(match.group(2))
+        body = data[start : end + 1]
+        if fault == "truncate":
+            body = body[: len(body) // 2]
+        self._send(206, body, {"Content-Range": f"bytes {start}-{end}/{len(data)}"})
+
+    def _send(self, status: int, body: bytes, headers: Optional[dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    httpd.faults = defaultdict(list)
+    httpd.requests = Counter()
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}/"
+
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        thread.join()
+
+
+@pytest.fixture
+def client():
+    with hls.build_http_client(concurrency=3, timeout_seconds=5.0) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(hls.time, "sleep", lambda seconds: None)
+
+
+def load_playlist(client, server, name: str) -> hls.MediaPlaylist:
+    url = server.base_url + name
+    return hls.parse_media_playlist(hls.fetch_text(client, url), url)
+
+
+def expected_track() -> bytes:
+    return b"".join((FIXTURES / name).read_bytes() for name in SEGMENT_NAMES)
+
+
+def test_download_concatenates_segments_in_order(client, server, tmp_path):
+    playlist = load_playlist(client, server, "media.m3u8")
+
+    track, total_bytes, resumed = hls.download_media_playlist(
+        client, playlist, tmp_path, concurrency=3, retries=0
+    )
+
+    assert track.read_bytes() == expected_track()
+    assert total_bytes == len(expected_track())
+    assert resumed == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == [track.name]
+
+
+def test_retryable_status_is_retried(client, server, tmp_path):
+    server.faults["/seg1.ts"] = ["503", "503"]
+    playlist = load_playlist(client, server, "media.m3u8")
+
+    written = hls.fetch_segment(client, playlist.segments[1], tmp_path / "1.seg", retries=2)
+
+    assert written == (FIXTURES / "seg1.ts").stat().st_size
+    assert (tmp_path / "1.seg").read_bytes() == (FIXTURES / "seg1.ts").read_bytes()
+    assert server.requests["/seg1.ts"] == 3
+
+
+def test_non_retryable_status_fails_without_retry(client, server, tmp_path):
+    server.faults["/seg1.ts"] = ["403"]
+    playlist = load_playlist(client, server, "media.m3u8")
+
+    with pytest.raises(hls.SegmentDownloadError, match="HTTP 403"):
+        hls.fetch_segment(client, playlist.segments[1], tmp_path / "1.seg", retries=3)
+
+    assert server.requests["/seg1.ts"] == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_segment_leaves_no_part_and_resume_fetches_only_missing(client, server, tmp_path):
+    playlist = load_playlist(client, server, "media.m3u8")
+    server.faults["/seg1.ts"] = ["503", "503"]
+
+    with pytest.raises(hls.SegmentDownloadError):
+        hls.download_media_playlist(client, playlist, tmp_path, concurrency=3, retries=1)
+
+    # Só segmentos completos, com o nome final; nenhum .part nem trilha
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["000000.seg", "000002.seg"]
+
+    track, total_bytes, resumed = hls.download_media_playlist(
+        client, playlist, tmp_path, concurrency=3, retries=1
+    )
+
+    assert track.read_bytes() == expected_track()
+    assert resumed == 2
+    assert total_bytes == (FIXTURES / "seg1.ts").stat().st_size
+    assert server.requests["/seg0.ts"] == 1
+    assert server.requests["/seg2.ts"] == 1
+    assert server.requests["/seg1.ts"] == 3
+
+
+def test_byte_range_segments(client, server, tmp_path):
+    playlist = load_playlist(client, server, "byterange.m3u8")
+    assert [s.byte_range for s in playlist.segments] == [(0, 32), (32, 32), (64, 40)]
+
+    track, total_bytes, _ = hls.download_media_playlist(
+        client, playlist, tmp_path, concurrency=3, retries=0
+    )
+
+    assert track.read_bytes() == (FIXTURES / "all.ts").read_bytes() == expected_track()
+    assert total_bytes == len(expected_track())
+
+
+def test_byte_range_ignored_by_server_is_unsupported(client, server, tmp_path):
+    server.faults["/all.ts"] = ["ignore_range"]
+    playlist = load_playlist(client, server, "byterange.m3u8")
+
+    with pytest.raises(hls.UnsupportedPlaylistError):
+        hls.fetch_segment(client, playlist.segments[1], tmp_path / "1.seg", retries=2)
+
+    # Não adianta tentar de novo: o servidor não suporta Range
+    assert server.requests["/all.ts"] == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_short_byte_range_body_is_retried(client, server, tmp_path):
+    playlist = load_playlist(client, server, "byterange.m3u8")
+    segment = playlist.segments[2]
+
+    server.faults["/all.ts"] = ["truncate"]
+    written = hls.fetch_segment(client, segment, tmp_path / "2.seg", retries=1)
+    assert written == 40
+    assert (tmp_path / "2.seg").read_bytes() == (FIXTURES / "seg2.ts").read_bytes()
+
+    server.faults["/all.ts"] = ["truncate", "truncate"]
+    with pytest.raises(hls.SegmentDownloadError, match="incompleto"):
+        hls.fetch_segment(client, segment, tmp_path / "2b.seg", retries=1)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2.seg"]